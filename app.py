@@ -1,12 +1,11 @@
 import streamlit as st
+import html
 import time
-from helper_functions.topic_tags import topic_tags_of_the_concern
 from helper_functions.emoji import emotion_to_emoji
 import os
-import random
-import pandas as pd
-import plotly.express as px
-from helper_functions.priority import priority_of_the_concern
+from helper_functions.dashboard_rendering import (
+    EMOTION_STYLESHEET, EmotionCounts, ChartThrottle, RenderMetrics, bar_figure, pie_figure, figure_bytes,
+)
 import json
 
 with open("./frontend/heading.txt", "r", encoding="utf-8") as f:
@@ -40,46 +39,51 @@ with col2:
     if st.button("🤖 Interactive AI Bot (click to view)", use_container_width=True):
         st.session_state.button_pressed = "bot"
 
-emotion_colors = {
-    "excitement": "#FF4500","pride": "#800080", "joy": "#BFFF00","approval": "#4CAF50","admiration": "#F4C542",
-    "desire": "#FF69B4","love": "#E91E63","optimism": "#A8E6CF","amusement": "#FFA500","caring": "#5DADE2",
-    "realization": "#3498DB","gratitude": "#5CFF3B","curiosity": "#9B59B6","relief": "#82E0AA","surprise": "#FF7F50","neutral": "#BDC3C7",
-    "nervousness": "#F39C12","confusion": "#7F8C8D","remorse": "#8E44AD","anger": "#E74C3C","annoyance": "#E67E22",
-    "grief": "#2C3E50","fear": "#4B0082","embarrassment": "#FAD7A0","disapproval": "#C0392B","disgust": "#556B2F",
-    "disappointment": "#5D6D7E","sadness": "#3498DB"
-}
-
-emotion_colors_record = {
-    "excitement": 0,"pride": 0,"joy": 0,"approval": 0,"admiration": 0,
-    "desire": 0,"love": 0,"optimism": 0,"amusement": 0,"caring": 0,
-    "realization": 0,"gratitude": 0,"curiosity": 0,"relief": 0,"surprise": 0,"neutral": 0,
-    "nervousness": 0,"confusion": 0,"remorse": 0,"anger": 0,"annoyance": 0,
-    "grief": 0,"fear": 0,"embarrassment": 0,"disapproval": 0,"disgust": 0,
-    "disappointment": 0,"sadness": 0
-}
-
-df = pd.DataFrame(list(emotion_colors_record.items()), columns=['Emotion', 'Count'])
-
-def draw_bar_chart(df):
-    df["Color"] = df['Emotion'].map(emotion_colors)
-    fig = px.bar(df,
-                 x='Emotion', 
-                 y='Count',
-                 color='Emotion',
-                 color_discrete_map=emotion_colors)
-    fig.update_layout(xaxis_tickangle=-45)
+def draw_bar_chart(counts):
+    fig = bar_figure(counts)
     st.plotly_chart(fig, use_container_width=True)
+    return figure_bytes(fig)
 
-def draw_pie_chart(df):
-    df["Color"] = df['Emotion'].map(emotion_colors)
-    fig = px.pie(df, 
-                 names='Emotion', 
-                 values='Count',
-                 color='Emotion',
-                 color_discrete_map=emotion_colors,
-                 hole=0.4)
-    fig.update_traces(textposition='inside', textinfo='percent+label')
+def draw_pie_chart(counts):
+    fig = pie_figure(counts)
     st.plotly_chart(fig, use_container_width=True)
+    return figure_bytes(fig)
+
+def render_ticket(data):
+    """
+    Render one classified ticket; styles come from EMOTION_STYLESHEET, emitted
+    once per page. Returns the bytes of HTML sent.
+    """
+    sentiment_analysis_result = data["sentiment"].capitalize()
+    emotion = sentiment_analysis_result.lower()
+    priority, topic = data["priority"], data["topic"]
+
+    sections = [
+        f'''
+            <div class="emotion-box emotion-{emotion}">
+                <div class="emotion-label">📋 Customer Concern Subject:</div>
+                <div>{data["subject"]}</div>
+            </div>
+            ''',
+        f'''
+            <div class="emotion-box emotion-scrollbar emotion-{emotion}" style="max-height: 200px; overflow-y: auto;">
+                <div class="emotion-label">💬 Customer Body:</div>
+                <div>{data["body"]}</div>
+            </div>
+            ''',
+        f'''
+            <div class="emotion-box emotion-{emotion}">
+                <div class="emotion-label">🏷️ Top Tags:</div>
+                <div>{topic}</div>
+            </div>
+            ''',
+    ]
+    title = f"### Customer ID: {data['id']} | Sentiment: {sentiment_analysis_result} | Emotion: {emotion_to_emoji(sentiment_analysis_result)} | Priority: {priority}"
+    with st.expander(title, expanded=False):
+        for section in sections:
+            st.markdown(section, unsafe_allow_html=True)
+    return len(title) + sum(len(section) for section in sections)
+
 
 rag_topics = ['How-to', 'Product', 'Connector', 'Lineage', 'Connector', 'API/SDK', 'SSO', 'Glossary', 'Best practices', 'Sensitive data']
 
@@ -87,43 +91,46 @@ if st.session_state.button_pressed == "dashboard":
 
     st.markdown("### 📁 Upload Sample Tickets File")
     uploaded_file = st.file_uploader(
-        "Choose a JSON file containing sample tickets", 
-        type=['json'],
+        "Choose a JSON, JSON Lines or CSV file containing sample tickets", 
+        type=['json', 'jsonl', 'csv'],
         help="Upload the sample_tickets file to begin classification"
     )
 
-    customer_data = []
+    # Tickets are streamed from the file by the background job, never loaded whole
+    ticket_source, ticket_source_name = None, None
+    use_ticket_db = os.path.isfile("customer_concern.db") and st.checkbox(
+        "🗄️ Classify the full ticket history from the database instead",
+        help="Reads every ticket loaded with sql_db.sql_data_inseration, page by page",
+    )
 
-    if uploaded_file is not None:
-        try: 
-            customer_data = json.load(uploaded_file)
-            st.success(f"✅ Successfully loaded {len(customer_data)} tickets from {uploaded_file.name}")
-        except json.JSONDecodeError:
-            st.error("❌ Error: Invalid JSON file. Please check your file format.")
-        except Exception as e:
-            st.error(f"❌ Error loading file: {str(e)}")
+    if use_ticket_db:
+        from sql_db.ticket_repository import get_ticket_repository
+        ticket_source, ticket_source_name = get_ticket_repository(), "customer_concern.db"
+        st.success(f"✅ Streaming {ticket_source.count()} tickets from customer_concern.db")
+    elif uploaded_file is not None:
+        ticket_source, ticket_source_name = uploaded_file.getvalue(), uploaded_file.name
+        st.success(f"✅ Streaming tickets from {uploaded_file.name}")
     else:
         
         st.info("👆 Please upload a sample tickets JSON file to start the classification dashboard.")
         
-        try:
-            with open("./json_files_data/data.json", "r", encoding="utf-8") as f:
-                customer_data = json.load(f)
+        if os.path.isfile("./json_files_data/data.json"):
+            ticket_source = ticket_source_name = "./json_files_data/data.json"
             st.warning("⚠️ Using default sample data. Upload your own file for custom analysis.")
-        except FileNotFoundError:
+        else:
             st.warning("⚠️ No default data available. Please upload a sample tickets file.")
-            customer_data = []
 
 
     with open("./frontend/classification_dashboard.txt", "r", encoding="utf-8") as f:
         classification_dashboard = f.read()
     st.markdown(classification_dashboard, unsafe_allow_html=True)
+    st.markdown(EMOTION_STYLESHEET, unsafe_allow_html=True)
     
     st.markdown('<div class="dashboard-header">📊 Classification Dashboard</div>', unsafe_allow_html=True)
         
     with st.container():
         
-        from helper_functions.sentiment_analysis import sentiment_analysis
+        from helper_functions.classification_jobs import submit_job, job_status, job_results, sentiment_counts, JOB_POLL_SECONDS
         
         chart_col1, chart_col2 = st.columns(2)
         
@@ -131,154 +138,84 @@ if st.session_state.button_pressed == "dashboard":
             bar_chart_placeholder = st.empty()
         with chart_col2:
             pie_chart_placeholder = st.empty()
-        
-        emotion_colors_record = {key: 0 for key in emotion_colors_record}
-        
+
         progress_bar = st.progress(0)
-        for i, data in enumerate(customer_data):
-            sentiment_analysis_result = sentiment_analysis(data['body'])
-            emotion_colors_record[sentiment_analysis_result.lower()] += 1
-            sentiment_analysis_result = sentiment_analysis_result.capitalize()
-            progress_bar.progress((i + 1) / len(customer_data))
-            updated_df = pd.DataFrame(list(emotion_colors_record.items()), columns=['Emotion', 'Count'])
-            
-            with bar_chart_placeholder.container():
-                updated_df["Color"] = updated_df['Emotion'].map(emotion_colors)
-                fig_bar = px.bar(updated_df,
-                                x='Emotion', 
-                                y='Count',
-                                color='Emotion',
-                                color_discrete_map=emotion_colors)
-                fig_bar.update_layout(xaxis_tickangle=-45)
-                st.plotly_chart(fig_bar, use_container_width=True)
-            
-            with pie_chart_placeholder.container():
-                updated_df["Color"] = updated_df['Emotion'].map(emotion_colors)
-                fig_pie = px.pie(updated_df, 
-                                names='Emotion', 
-                                values='Count',
-                                color='Emotion',
-                                color_discrete_map=emotion_colors,
-                                hole=0.4)
-                fig_pie.update_traces(textposition='inside', textinfo='percent+label')
-                st.plotly_chart(fig_pie, use_container_width=True)
-
-            emotion_color = emotion_colors.get(sentiment_analysis_result.lower(), "#BDC3C7")
-            
-            emotion_css = f"""
-            <style>
-            .emotion-{sentiment_analysis_result.lower()}-header {{
-                background: linear-gradient(135deg, {emotion_color} 0%, {emotion_color}CC 100%);
-                border-radius: 12px;
-                padding: 18px;
-                color: white;
-                font-weight: bold;
-                margin: 15px 0;
-                box-shadow: 0 4px 15px {emotion_color}33;
-                transition: all 0.3s ease;
-                text-shadow: 0 2px 4px rgba(0, 0, 0, 0.3);
-            }}
-            
-            .emotion-{sentiment_analysis_result.lower()}-header:hover {{
-                transform: translateY(-2px);
-                box-shadow: 0 6px 20px {emotion_color}44;
-            }}
-            
-            .emotion-{sentiment_analysis_result.lower()}-box {{
-                background: linear-gradient(145deg, {emotion_color}11, {emotion_color}22);
-                border-left: 5px solid {emotion_color};
-                border-radius: 12px;
-                padding: 20px;
-                margin: 15px 0;
-                box-shadow: 0 4px 12px {emotion_color}22;
-                transition: all 0.3s ease;
-                position: relative;
-                overflow: hidden;
-            }}
-            
-            .emotion-{sentiment_analysis_result.lower()}-box:before {{
-                content: '';
-                position: absolute;
-                top: 0;
-                left: 0;
-                width: 100%;
-                height: 2px;
-                background: linear-gradient(90deg, transparent, {emotion_color}66, transparent);
-            }}
-            
-            .emotion-{sentiment_analysis_result.lower()}-box:hover {{
-                transform: translateY(-3px);
-                box-shadow: 0 8px 20px {emotion_color}33;
-            }}
-            
-            .emotion-{sentiment_analysis_result.lower()}-label {{
-                font-weight: bold;
-                color: {emotion_color};
-                margin-bottom: 12px;
-                font-size: 1.1rem;
-                display: flex;
-                align-items: center;
-                gap: 8px;
-                text-shadow: 0 1px 2px rgba(0, 0, 0, 0.1);
-            }}
-            
-            .emotion-{sentiment_analysis_result.lower()}-scrollbar::-webkit-scrollbar {{
-                width: 6px;
-            }}
-            
-            .emotion-{sentiment_analysis_result.lower()}-scrollbar::-webkit-scrollbar-track {{
-                background: #f1f1f1;
-                border-radius: 10px;
-            }}
-            
-            .emotion-{sentiment_analysis_result.lower()}-scrollbar::-webkit-scrollbar-thumb {{
-                background: {emotion_color};
-                border-radius: 10px;
-            }}
-            
-            .emotion-{sentiment_analysis_result.lower()}-scrollbar::-webkit-scrollbar-thumb:hover {{
-                background: {emotion_color}DD;
-            }}
-            </style>
-            """
-            
-            st.markdown(emotion_css, unsafe_allow_html=True)
-            groq_api_key = os.environ.get("GROQ_API_KEY")
-            with st.expander(f"### Customer ID: {data['id']} | Sentiment: {sentiment_analysis_result} | Emotion: {emotion_to_emoji(sentiment_analysis_result)} | Priority: {priority_of_the_concern(data['body'], 'groq', groq_api_key)}", expanded=False):
-                groq_api_key = [os.environ.get("GROQ_API_KEY"), os.environ.get("GROQ_API_KEY_2")]
-                groq_api_key = random.choice(groq_api_key)
-                
-                st.markdown(
-                    f'''
-                    <div class="emotion-{sentiment_analysis_result.lower()}-box">
-                        <div class="emotion-{sentiment_analysis_result.lower()}-label">📋 Customer Concern Subject:</div>
-                        <div>{data["subject"]}</div>
-                    </div>
-                    ''',
-                    unsafe_allow_html=True
-                )
-                
-                st.markdown(
-                    f'''
-                    <div class="emotion-{sentiment_analysis_result.lower()}-box emotion-{sentiment_analysis_result.lower()}-scrollbar" style="max-height: 200px; overflow-y: auto;">
-                        <div class="emotion-{sentiment_analysis_result.lower()}-label">💬 Customer Body:</div>
-                        <div>{data["body"]}</div>
-                    </div>
-                    ''',
-                    unsafe_allow_html=True
-                )
-                st.markdown(
-                    f'''
-                    <div class="emotion-{sentiment_analysis_result.lower()}-box">
-                        <div class="emotion-{sentiment_analysis_result.lower()}-label">🏷️ Top Tags:</div>
-                        <div>{topic_tags_of_the_concern(data["body"], "groq", groq_api_key)}</div>
-                    </div>
-                    ''',
-                    unsafe_allow_html=True
+        job_status_placeholder = st.empty()
+        tickets_container = st.container()
+
+        if ticket_source is not None:
+            # Classification runs in a background worker keyed by the file hash; this
+            # script only polls the results table, so reruns never recompute a file.
+            job_id = submit_job(ticket_source, ticket_source_name)
+            rendered = 0
+            emotion_counts = EmotionCounts()
+            chart_throttle = ChartThrottle()
+            render_metrics = RenderMetrics()
+            render_metrics.bytes += len(EMOTION_STYLESHEET)
+            while True:
+                status = job_status(job_id)
+                job_finished = status["status"] != "running"
+
+                # Charts are redrawn every CHART_REDRAW_EVERY tickets / CHART_REDRAW_SECONDS, not per ticket
+                if chart_throttle.due(status["sentiment_done"], final=job_finished):
+                    started = time.perf_counter()
+                    emotion_counts.set(sentiment_counts(job_id))
+                    with bar_chart_placeholder.container():
+                        chart_bytes = draw_bar_chart(emotion_counts.counts)
+                    with pie_chart_placeholder.container():
+                        chart_bytes += draw_pie_chart(emotion_counts.counts)
+                    render_metrics.record(started, chart_bytes, chart_redraw=True)
+                    chart_throttle.drawn(status["sentiment_done"])
+
+                new_rows = job_results(job_id, start=rendered)
+                started = time.perf_counter()
+                with tickets_container:
+                    html_bytes = sum(render_ticket(row) for row in new_rows)
+                render_metrics.record(started, html_bytes)
+                rendered += len(new_rows)
+
+                progress_bar.progress(rendered / max(status["total"], 1))
+                job_status_placeholder.caption(
+                    f"⚙️ Job {job_id[:12]}: sentiment {status['sentiment_done']}/{status['total']}, "
+                    f"topic & priority {status['classified']}/{status['total']}"
+                    + (" (still reading the file)" if status["ingesting"] and not job_finished else "")
                 )
-
-
-            # time.sleep(5)
+                if job_finished and rendered >= status["classified"]:
+                    break
+                time.sleep(JOB_POLL_SECONDS)
+
+            metrics = render_metrics.per_ticket(rendered)
+            st.caption(
+                f"🖼️ Rendering: {metrics['render_ms_per_ticket']} ms and {metrics['kb_per_ticket']} KB per ticket, "
+                f"{metrics['chart_redraws']} chart redraws"
+            )
+
+            if status["status"] == "failed":
+                st.error(f"❌ Classification job failed: {status['error']}")
+            elif status["stats"]:
+                st.caption(f"📦 {status['total']} tickets classified with {status['stats']['llm_requests']} LLM requests")
+                if status["stats"].get("invalid"):
+                    st.warning(f"⚠️ Skipped {status['stats']['invalid']} tickets without a valid id, subject and body")
+
+        from helper_functions.llm_cache import get_llm_cache
+        if get_llm_cache() is not None:
+            cache_stats = get_llm_cache().stats()
+            st.caption(f"🗃️ LLM cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses, {cache_stats['entries']} entries")
+
+        from helper_functions.priority_rules import rule_stats
+        from helper_functions.priority import priority_outcome_stats
+        priority_stats = rule_stats()
+        if priority_stats["llm_fallback_share"] is not None:
+            outcomes = ", ".join(f"{name} {count}" for name, count in priority_outcome_stats().items() if count)
+            st.caption(f"🚦 Priority rules: {priority_stats['llm_fallback_share']:.0%} of tickets needed the LLM fallback ({outcomes})")
+
+        from helper_functions.topic_classifier import topic_classifier_stats
+        topic_stats = topic_classifier_stats()
+        if topic_stats["tickets"]:
+            st.caption(
+                f"🏷️ Local topic classifier: {topic_stats['escalation_rate']:.0%} escalated to the LLM, "
+                f"{topic_stats['local_ms_per_ticket']} ms/ticket local, {topic_stats['escalated_ms_per_ticket']} ms/ticket escalated"
+            )
 
 
 
@@ -383,7 +320,36 @@ elif st.session_state.button_pressed == "bot":
                 st.markdown('<div class="warning-box">⚠️ Please enter a valid concern or Ticket number.</div>', unsafe_allow_html=True)
             else:
                 
-                if "TICKET-" in user_input.upper():
+                if user_input.strip().lower().startswith("search:"):
+                    # "search: snowflake permissions" ranks past tickets instead of answering
+                    from sql_db.ticket_repository import get_ticket_repository, HIGHLIGHT_START, HIGHLIGHT_END
+
+                    def marked(text):
+                        return html.escape(text or "").replace(HIGHLIGHT_START, "<mark>").replace(HIGHLIGHT_END, "</mark>")
+
+                    query = user_input.strip()[len("search:"):].strip()
+                    ticket_repository = get_ticket_repository()
+                    if not query:
+                        st.markdown('<div class="warning-box">⚠️ Add some words after "search:".</div>', unsafe_allow_html=True)
+                    elif not ticket_repository.has_search_index():
+                        st.markdown('<div class="warning-box">⚠️ No search index yet. Run python -m sql_db.sql_data_inseration to build it.</div>', unsafe_allow_html=True)
+                    else:
+                        started = time.perf_counter()
+                        matches = ticket_repository.search(query)
+                        st.caption(f"🔎 {len(matches)} matching past tickets in {1000 * (time.perf_counter() - started):.1f} ms")
+                        for match in matches:
+                            st.markdown(
+                                f'<div class="analysis-card"><h3>🎫 {html.escape(match["id"])}: {marked(match["subject_highlight"])}</h3>'
+                                f'<p>{marked(match["snippet"])}</p>'
+                                f'<strong>Sentiment:</strong> {match["sentiment"] or "not analysed"} {emotion_to_emoji(match["sentiment"]) if match["sentiment"] else ""} · '
+                                f'<strong>Priority:</strong> {match["priority"] or "not analysed"} · '
+                                f'<strong>Topics:</strong> {match["topics"] or "not analysed"}</div>',
+                                unsafe_allow_html=True,
+                            )
+                        if not matches:
+                            st.markdown('<div class="warning-box">❌ No past tickets match that search.</div>', unsafe_allow_html=True)
+
+                elif "TICKET-" in user_input.upper():
                     st.markdown('<div class="ticket-info">🎫 Fetching details for ticket number from sql DB...</div>', unsafe_allow_html=True)
                     
                     from sql_db.query_from_db import fetch_data_from_db
@@ -400,15 +366,22 @@ elif st.session_state.button_pressed == "bot":
                             
                             from helper_functions.internal_analysis import internal_analysis
                             analysis_results = internal_analysis(body)
-                            st.markdown(f'<div class="analysis-card"><strong>Sentiment:</strong> {analysis_results["sentiment"]} {analysis_results["emoji"]}</div>', unsafe_allow_html=True)
-                            st.markdown(f'<div class="analysis-card"><strong>Priority:</strong> {analysis_results["priority"]}</div>', unsafe_allow_html=True)
-                            st.markdown(f'<div class="analysis-card"><strong>Topics:</strong> {analysis_results["topics"]}</div>', unsafe_allow_html=True)
+                            st.markdown(f'<div class="analysis-card"><strong>Sentiment:</strong> {analysis_results["sentiment"] or "⏱️ Unavailable"} {analysis_results["emoji"]}</div>', unsafe_allow_html=True)
+                            st.markdown(f'<div class="analysis-card"><strong>Priority:</strong> {analysis_results["priority"] or "⏱️ Unavailable"}</div>', unsafe_allow_html=True)
+                            st.markdown(f'<div class="analysis-card"><strong>Topics:</strong> {analysis_results["topics"] or "⏱️ Unavailable"}</div>', unsafe_allow_html=True)
+                            st.caption("⏱️ Stage timings: " + ", ".join(f"{stage} {seconds:.2f}s" for stage, seconds in analysis_results["timings"].items() if seconds is not None))
 
-                            if any(topic in analysis_results["topics"] for topic in ['How-to', 'Product', 'Connector', 'Lineage', 'Connector', 'API/SDK', 'SSO', 'Glossary', 'Best practices', 'Sensitive data']):
+                            if any(topic in (analysis_results["topics"] or "") for topic in ['How-to', 'Product', 'Connector', 'Lineage', 'Connector', 'API/SDK', 'SSO', 'Glossary', 'Best practices', 'Sensitive data']):
                             # if any(topic in rag_topics for topic in analysis_results["topics"]):
-                                from helper_functions.query_from_db_llm import llm_generation, show_metadata
-
-                                results, context, source_urls = show_metadata(body)
+                                from helper_functions.query_from_db_llm import llm_generation_stream, show_metadata, semantic_lookup, remember_answer
+
+                                query_embedding, cached_answer = semantic_lookup(body, llm="gemini")
+                                if cached_answer:
+                                    results, context, source_urls = None, cached_answer["context"], cached_answer["source_urls"]
+                                else:
+                                    results, context, source_urls = show_metadata(body, query_embedding)
+                                    st.caption("🔎 Retrieval: " + ", ".join(f"{name[:-2]} {1000 * seconds:.0f} ms" for name, seconds in results["timings"].items())
+                                               + f" · context {results['context_stats']['tokens']} tokens from {results['context_stats']['used']}/{results['context_stats']['chunks']} chunks")
                                 st.markdown("### 🗄️ Context from Pinecone Database:")
                                 with st.expander("🔗 Source URLs", expanded=False):
                                     for i, url in enumerate(source_urls, start=1):
@@ -417,9 +390,25 @@ elif st.session_state.button_pressed == "bot":
                                 with st.expander("🗄️ Context from Pinecone Database", expanded=False):
                                     st.markdown(f'{context}</div>', unsafe_allow_html=True)
                                 
-                                llm_generation_response = llm_generation(body, context, llm="gemini")
                                 st.markdown('<div class="ai-response"><h3>🤖 AI Response:</h3>', unsafe_allow_html=True)
-                                st.markdown(f'{llm_generation_response}</div>', unsafe_allow_html=True)
+                                if cached_answer:
+                                    st.caption(f"♻️ Answer reused from a similar earlier question (similarity {cached_answer['similarity']:.2f})")
+                                    st.markdown(f'{cached_answer["answer"]}</div>', unsafe_allow_html=True)
+                                else:
+                                    # Rendered as it is generated; the sources and context above are already on screen
+                                    answer_stream = None
+                                    try:
+                                        answer_stream = llm_generation_stream(body, context, llm="gemini")
+                                        st.write_stream(answer_stream)
+                                    except Exception as e:
+                                        st.markdown(f'<div class="error-box">❌ No answer could be generated: {html.escape(str(e))}</div>', unsafe_allow_html=True)
+                                    st.markdown('</div>', unsafe_allow_html=True)
+                                    response = answer_stream.response if answer_stream is not None else None
+                                    if response is not None and response.text.strip():
+                                        st.caption(f"⚡ First token after {response.ttft_s:.2f}s, full answer in {response.latency_s:.2f}s")
+                                        remember_answer(body, query_embedding, results, context, source_urls, response.text, llm="gemini")
+                                    elif response is not None:
+                                        st.markdown('<div class="warning-box">⚠️ The model returned an empty answer. Please try rephrasing the question.</div>', unsafe_allow_html=True)
                             
                             else:
                                 st.markdown('<div class="warning-box">⚠️ This ticket is unrelated to product usage or how-to questions. The concern has been referred to the support team for further assistance.</div>', unsafe_allow_html=True)
@@ -432,16 +421,23 @@ elif st.session_state.button_pressed == "bot":
                         
                         from helper_functions.internal_analysis import internal_analysis
                         analysis_results = internal_analysis(user_input)
-                        st.markdown(f'<div class="analysis-card"><strong>Sentiment:</strong> {analysis_results["sentiment"]} {analysis_results["emoji"]}</div>', unsafe_allow_html=True)
-                        st.markdown(f'<div class="analysis-card"><strong>Priority:</strong> {analysis_results["priority"]}</div>', unsafe_allow_html=True)
-                        st.markdown(f'<div class="analysis-card"><strong>Topics:</strong> {analysis_results["topics"]}</div>', unsafe_allow_html=True)
+                        st.markdown(f'<div class="analysis-card"><strong>Sentiment:</strong> {analysis_results["sentiment"] or "⏱️ Unavailable"} {analysis_results["emoji"]}</div>', unsafe_allow_html=True)
+                        st.markdown(f'<div class="analysis-card"><strong>Priority:</strong> {analysis_results["priority"] or "⏱️ Unavailable"}</div>', unsafe_allow_html=True)
+                        st.markdown(f'<div class="analysis-card"><strong>Topics:</strong> {analysis_results["topics"] or "⏱️ Unavailable"}</div>', unsafe_allow_html=True)
+                        st.caption("⏱️ Stage timings: " + ", ".join(f"{stage} {seconds:.2f}s" for stage, seconds in analysis_results["timings"].items() if seconds is not None))
                         
-                        if any(topic in analysis_results["topics"] for topic in ['How-to', 'Product', 'Connector', 'Lineage', 'Connector', 'API/SDK', 'SSO', 'Glossary', 'Best practices', 'Sensitive data']):
+                        if any(topic in (analysis_results["topics"] or "") for topic in ['How-to', 'Product', 'Connector', 'Lineage', 'Connector', 'API/SDK', 'SSO', 'Glossary', 'Best practices', 'Sensitive data']):
                         # if any(topic in rag_topics for topic in analysis_results["topics"]):
                        
-                            from helper_functions.query_from_db_llm import llm_generation, show_metadata
+                            from helper_functions.query_from_db_llm import llm_generation_stream, show_metadata, semantic_lookup, remember_answer
 
-                            results, context, source_urls = show_metadata(user_input)
+                            query_embedding, cached_answer = semantic_lookup(user_input, llm="gemini")
+                            if cached_answer:
+                                results, context, source_urls = None, cached_answer["context"], cached_answer["source_urls"]
+                            else:
+                                results, context, source_urls = show_metadata(user_input, query_embedding)
+                                st.caption("🔎 Retrieval: " + ", ".join(f"{name[:-2]} {1000 * seconds:.0f} ms" for name, seconds in results["timings"].items())
+                                           + f" · context {results['context_stats']['tokens']} tokens from {results['context_stats']['used']}/{results['context_stats']['chunks']} chunks")
                             st.markdown("### 🗄️ Context from Pinecone Database:")
                             with st.expander("🔗 Source URLs", expanded=False):
                                 for i, url in enumerate(source_urls, start=1):
@@ -450,9 +446,25 @@ elif st.session_state.button_pressed == "bot":
                             with st.expander("🗄️ Context from Pinecone Database", expanded=False):
                                 st.markdown(f'{context}</div>', unsafe_allow_html=True)
                                 
-                            llm_generation_response = llm_generation(user_input, context, llm="gemini")
                             st.markdown('<div class="ai-response"><h3>🤖 AI Response:</h3>', unsafe_allow_html=True)
-                            st.markdown(f'{llm_generation_response}</div>', unsafe_allow_html=True)
+                            if cached_answer:
+                                st.caption(f"♻️ Answer reused from a similar earlier question (similarity {cached_answer['similarity']:.2f})")
+                                st.markdown(f'{cached_answer["answer"]}</div>', unsafe_allow_html=True)
+                            else:
+                                # Rendered as it is generated; the sources and context above are already on screen
+                                answer_stream = None
+                                try:
+                                    answer_stream = llm_generation_stream(user_input, context, llm="gemini")
+                                    st.write_stream(answer_stream)
+                                except Exception as e:
+                                    st.markdown(f'<div class="error-box">❌ No answer could be generated: {html.escape(str(e))}</div>', unsafe_allow_html=True)
+                                st.markdown('</div>', unsafe_allow_html=True)
+                                response = answer_stream.response if answer_stream is not None else None
+                                if response is not None and response.text.strip():
+                                    st.caption(f"⚡ First token after {response.ttft_s:.2f}s, full answer in {response.latency_s:.2f}s")
+                                    remember_answer(user_input, query_embedding, results, context, source_urls, response.text, llm="gemini")
+                                elif response is not None:
+                                    st.markdown('<div class="warning-box">⚠️ The model returned an empty answer. Please try rephrasing the question.</div>', unsafe_allow_html=True)
                         else:
                             st.markdown('<div class="warning-box">⚠️ This ticket is unrelated to product usage or how-to questions. The concern has been referred to the support team for further assistance.</div>', unsafe_allow_html=True)
 
@@ -0,0 +1,191 @@
+import os
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+from helper_functions.llm_gateway import PROVIDERS, generate
+from helper_functions.llm_cache import get_llm_cache
+from helper_functions.priority import normalise_priority, priority_of_the_concern
+from helper_functions.priority_rules import match_priority_batch
+from helper_functions.topic_classifier import TOPIC_LABELS, TOPIC_CLASSIFIER_ENABLED, TOPIC_CONFIDENCE_THRESHOLD, get_topic_classifier
+from helper_functions.topic_tags import topic_tags_of_the_concern
+from prompts.prompt_batch_classification import SYSTEM_PROMPT_BATCH_CLASSIFICATION
+
+load_dotenv()
+
+# Prompt tokens per batch request (~4 characters per token) and a hard cap on tickets per batch
+BATCH_TOKEN_BUDGET = int(os.getenv("BATCH_TOKEN_BUDGET", "4000"))
+BATCH_MAX_TICKETS = int(os.getenv("BATCH_MAX_TICKETS", "40"))
+BATCH_RETRIES = int(os.getenv("BATCH_RETRIES", "2"))
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "4"))
+
+_TOPIC_OF = {label.lower(): label for label in TOPIC_LABELS}
+
+
+def plan_batches(items, token_budget=BATCH_TOKEN_BUDGET, max_tickets=BATCH_MAX_TICKETS):
+    """
+    Split [{"id", "body"}] into consecutive batches whose serialised size stays
+    within `token_budget`. A ticket larger than the budget gets a batch of its own.
+    """
+    batches, batch, batch_tokens = [], [], 0
+    for item in items:
+        tokens = len(json.dumps(item, ensure_ascii=False)) // 4 + 1
+        if batch and (batch_tokens + tokens > token_budget or len(batch) >= max_tickets):
+            batches.append(batch)
+            batch, batch_tokens = [], 0
+        batch.append(item)
+        batch_tokens += tokens
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def parse_batch_response(text, expected_ids):
+    """
+    Read the {id, topic, priority} array out of an LLM reply, tolerating code
+    fences and surrounding prose. Ids are read as integers ("3" counts as 3).
+    Items with an unknown id, an unknown topic or an unusable priority are
+    dropped; returns {id: (topic, priority)}.
+    """
+    start, end = text.find("["), text.rfind("]")
+    if start == -1 or end <= start:
+        return {}
+    try:
+        items = json.loads(text[start:end + 1])
+    except json.JSONDecodeError:
+        return {}
+
+    parsed = {}
+    for item in items if isinstance(items, list) else []:
+        if not isinstance(item, dict):
+            continue
+        try:
+            item_id = int(item.get("id"))
+        except (TypeError, ValueError):
+            continue
+        if item_id not in expected_ids:
+            continue
+        topic = _TOPIC_OF.get(str(item.get("topic", "")).strip().lower())
+        priority = normalise_priority(str(item.get("priority", "")))
+        if topic is not None and priority is not None:
+            parsed[item_id] = (topic, priority)
+    return parsed
+
+
+def _cache_provider(llm_choice):
+    return f"{llm_choice}:batch"
+
+
+def _cache_model(llm_choice):
+    # The model actually called, so a model change in PROVIDERS does not replay old answers
+    return PROVIDERS[llm_choice].model
+
+
+def _classify_batch(batch, llm_choice):
+    prompt = json.dumps(batch, ensure_ascii=False)
+    try:
+        response = generate(llm_choice, prompt, SYSTEM_PROMPT_BATCH_CLASSIFICATION)
+    except Exception as e:
+        print(f"Batch classification request of {len(batch)} tickets failed: {e}")
+        return {}
+    return parse_batch_response(response.text, {item["id"] for item in batch})
+
+
+def classify_tickets_batch(tickets, llm_choice="groq"):
+    """
+    Topic tag and priority for every ticket with as few LLM requests as possible.
+
+    Priority keyword rules and the local topic classifier are applied first.
+    The remaining tickets are looked up in the LLM cache and the rest are packed
+    into token-budgeted multi-ticket requests. Items missing from a reply are
+    re-batched up to BATCH_RETRIES times, then classified one by one.
+
+    Returns ([{"topic", "priority"}] in input order, stats).
+    """
+    started = time.perf_counter()
+    bodies = [ticket["body"] for ticket in tickets]
+    results = [{"topic": None, "priority": priority} for priority, _ in match_priority_batch(bodies)]
+
+    classifier = get_topic_classifier() if TOPIC_CLASSIFIER_ENABLED else None
+    if classifier is not None:
+        for result, (label, confidence) in zip(results, classifier.predict_batch(bodies)):
+            if confidence >= TOPIC_CONFIDENCE_THRESHOLD:
+                result["topic"] = label
+
+    stats = {"tickets": len(tickets), "llm_requests": 0, "cached": 0, "retried_items": 0, "single_fallbacks": 0}
+    llm_cache = get_llm_cache()
+    pending = []
+    for i, result in enumerate(results):
+        if result["topic"] is not None and result["priority"] is not None:
+            continue
+        hit = llm_cache.get(_cache_provider(llm_choice), _cache_model(llm_choice), SYSTEM_PROMPT_BATCH_CLASSIFICATION, bodies[i]) if llm_cache else None
+        if hit is not None:
+            topic, priority = json.loads(hit[0])
+            result["topic"] = result["topic"] or topic
+            result["priority"] = result["priority"] or priority
+            stats["cached"] += 1
+        else:
+            pending.append({"id": i, "body": bodies[i]})
+
+    for attempt in range(BATCH_RETRIES + 1):
+        if not pending:
+            break
+        if attempt:
+            stats["retried_items"] += len(pending)
+        batches = plan_batches(pending)
+        stats["llm_requests"] += len(batches)
+        with ThreadPoolExecutor(max_workers=BATCH_CONCURRENCY) as executor:
+            replies = list(executor.map(lambda batch: _classify_batch(batch, llm_choice), batches))
+
+        answered = {}
+        for parsed in replies:
+            answered.update(parsed)
+        for i, (topic, priority) in answered.items():
+            results[i]["topic"] = results[i]["topic"] or topic
+            results[i]["priority"] = results[i]["priority"] or priority
+            if llm_cache is not None:
+                llm_cache.put(_cache_provider(llm_choice), _cache_model(llm_choice), SYSTEM_PROMPT_BATCH_CLASSIFICATION, bodies[i],
+                              json.dumps([topic, priority]))
+        pending = [item for item in pending if item["id"] not in answered]
+
+    for item in pending:
+        i = item["id"]
+        stats["single_fallbacks"] += 1
+        results[i]["topic"] = results[i]["topic"] or topic_tags_of_the_concern(bodies[i], llm_choice, None)
+        results[i]["priority"] = results[i]["priority"] or priority_of_the_concern(bodies[i], llm_choice, None)
+
+    stats["seconds"] = round(time.perf_counter() - started, 2)
+    print(f"Batch classification: {stats}")
+    return results, stats
+
+
+def per_ticket_baseline(tickets, llm_choice="groq"):
+    """
+    The previous dashboard behaviour, one topic and one priority request per ticket.
+    """
+    started = time.perf_counter()
+    results = [
+        {"topic": topic_tags_of_the_concern(ticket["body"], llm_choice, None),
+         "priority": priority_of_the_concern(ticket["body"], llm_choice, None)}
+        for ticket in tickets
+    ]
+    rule_misses = sum(priority is None for priority, _ in match_priority_batch([ticket["body"] for ticket in tickets]))
+    return results, {
+        "tickets": len(tickets),
+        # Upper bound: cache hits and a confident local topic classifier skip some of these
+        "llm_requests": len(tickets) + rule_misses,
+        "seconds": round(time.perf_counter() - started, 2),
+    }
+
+
+if __name__ == "__main__":
+    import sys
+
+    tickets_path = sys.argv[1] if len(sys.argv) > 1 else "./json_files_data/data.json"
+    llm_choice = sys.argv[2] if len(sys.argv) > 2 else "fake"
+    with open(tickets_path, "r", encoding="utf-8") as f:
+        tickets = json.load(f)
+
+    _, baseline = per_ticket_baseline(tickets, llm_choice)
+    _, batched = classify_tickets_batch(tickets, llm_choice)
+    print(json.dumps({"per_ticket": baseline, "batched": batched}, indent=2))
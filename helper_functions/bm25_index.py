@@ -0,0 +1,229 @@
+import os
+import re
+import json
+import time
+import threading
+import numpy as np
+from collections import defaultdict
+from dotenv import load_dotenv
+from helper_functions.vector_store import VectorStore, vector_store_exists, current_index_version
+
+load_dotenv()
+
+PINECONE_DATA_PATH = "./preprocessed_data/pinecone_db_data.json"
+
+BM25_K1 = float(os.getenv("BM25_K1", "1.2"))
+BM25_B = float(os.getenv("BM25_B", "0.75"))
+
+# Identifiers are kept whole ("get_asset_by_guid", "azure-event-hub", "v1.2") and also split into their parts
+_TOKEN = re.compile(r"[A-Za-z0-9_]+(?:[.\-/][A-Za-z0-9_]+)*")
+_PART = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|[0-9]+")
+
+
+def tokenize(text):
+    """
+    Lowercased terms of `text`. A compound identifier yields itself and its
+    parts, so "AzureEventHub" matches both "azureeventhub" and "event hub".
+    """
+    terms = []
+    for token in _TOKEN.findall(text):
+        lowered = token.lower()
+        terms.append(lowered)
+        parts = _PART.findall(token)
+        if len(parts) > 1:
+            terms.extend(part.lower() for part in parts)
+    return terms
+
+
+class BM25Index:
+    """
+    In-memory inverted index over the RAG chunks. Every term maps to the rows
+    containing it and their precomputed BM25 weights (idf and length
+    normalisation folded in), so a query only adds up a few numpy arrays.
+
+    `query` returns {"matches": [...]} like LocalVectorIndex.query, with the
+    same chunk ids and metadata, so the results can be fused with dense ones.
+    """
+
+    def __init__(self, ids, metadata, k1=BM25_K1, b=BM25_B):
+        self.ids = list(ids)
+        self.metadata = metadata
+
+        postings = defaultdict(lambda: ([], []))
+        lengths = np.zeros(len(self.ids), dtype=np.float32)
+        for row in range(len(self.ids)):
+            terms = tokenize(metadata[row]["text"])
+            lengths[row] = len(terms)
+            counts = defaultdict(int)
+            for term in terms:
+                counts[term] += 1
+            for term, count in counts.items():
+                rows, tfs = postings[term]
+                rows.append(row)
+                tfs.append(count)
+
+        average_length = float(lengths.mean()) if len(lengths) else 0.0
+        norms = k1 * (1 - b + b * lengths / max(average_length, 1e-9))
+        n = len(self.ids)
+        self.postings = {}
+        for term, (rows, tfs) in postings.items():
+            rows = np.asarray(rows, dtype=np.int32)
+            tfs = np.asarray(tfs, dtype=np.float32)
+            idf = np.log(1 + (n - len(rows) + 0.5) / (len(rows) + 0.5))
+            self.postings[term] = (rows, (idf * tfs * (k1 + 1) / (tfs + norms[rows])).astype(np.float32))
+
+    @classmethod
+    def from_store(cls, store, **kwargs):
+        return cls(store.ids, store.metadata, **kwargs)
+
+    @classmethod
+    def from_records(cls, records, **kwargs):
+        return cls([record["id"] for record in records], [record["metadata"] for record in records], **kwargs)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def query(self, text, top_k=10, include_metadata=True):
+        scores = np.zeros(len(self.ids), dtype=np.float32)
+        for term in set(tokenize(text)):
+            posting = self.postings.get(term)
+            if posting is not None:
+                rows, weights = posting
+                scores[rows] += weights
+
+        matched = np.flatnonzero(scores)
+        k = min(top_k, len(matched))
+        if k == 0:
+            return {"matches": []}
+        top = matched[np.argpartition(-scores[matched], k - 1)[:k]]
+        top = top[np.argsort(-scores[top])]
+
+        matches = []
+        for row in top:
+            match = {"id": self.ids[row], "score": float(scores[row])}
+            if include_metadata:
+                match["metadata"] = self.metadata[row]
+            matches.append(match)
+        return {"matches": matches}
+
+
+# Only the index for the current chunks is kept; building it holds the lock so
+# concurrent sessions wait for one build instead of each running their own
+_bm25_index = None
+_bm25_version = None
+_bm25_lock = threading.Lock()
+
+
+def _chunks_version(path):
+    """
+    Version of the chunks BM25 is built from: the vector store's, else the JSON
+    export's modification time, else None.
+    """
+    version = current_index_version()
+    if version is None and os.path.isfile(path):
+        version = f"json:{os.path.getmtime(path)}"
+    return version
+
+
+def _build_bm25_index(path):
+    t1 = time.perf_counter()
+    if vector_store_exists():
+        index = BM25Index.from_store(VectorStore())
+    elif os.path.isfile(path):
+        with open(path, "r", encoding="utf-8") as f:
+            index = BM25Index.from_records(json.load(f))
+    else:
+        print("No local chunks for BM25 retrieval; run the embedding pipeline first")
+        return None
+    print(f"Built BM25 index over {len(index)} chunks with {len(index.postings)} terms in {time.perf_counter() - t1:.2f} seconds")
+    return index
+
+
+def load_bm25_index(path=PINECONE_DATA_PATH):
+    """
+    BM25 index over the chunks of the local vector store (or the Pinecone-format
+    JSON export), built once per process and rebuilt when the store's version
+    changes. None when neither exists; that is not cached.
+    """
+    global _bm25_index, _bm25_version
+    version = (_chunks_version(path), path)
+    with _bm25_lock:
+        if _bm25_index is None or _bm25_version != version:
+            # Let go of the old index before building its replacement
+            _bm25_index, _bm25_version = None, None
+            index = _build_bm25_index(path)
+            if index is not None:
+                _bm25_index, _bm25_version = index, version
+        return _bm25_index
+
+
+def reciprocal_rank_fusion(result_lists, top_k, k=60):
+    """
+    Merge ranked {"matches": [...]} results: every match scores the sum of
+    1 / (k + rank) over the lists it appears in. Keeps the first metadata seen
+    for an id and records each retriever's rank under "ranks".
+    """
+    fused = {}
+    for name, results in result_lists.items():
+        for rank, match in enumerate(results["matches"], start=1):
+            entry = fused.setdefault(match["id"], {"id": match["id"], "score": 0.0, "metadata": match["metadata"], "ranks": {}})
+            entry["score"] += 1.0 / (k + rank)
+            entry["ranks"][name] = rank
+    return {"matches": sorted(fused.values(), key=lambda match: -match["score"])[:top_k]}
+
+
+def evaluate(samples=200, top_k=5, query_words=12, seed=0):
+    """
+    Known-item recall@top_k of dense, BM25 and fused retrieval: each sampled
+    chunk is queried with `query_words` words from its middle and counts as
+    found when it comes back in the top_k.
+    """
+    import random
+    from helper_functions.embeddings_func import embedding_model
+    from helper_functions.query_from_db_llm import get_vector_index, HYBRID_CANDIDATES, RRF_K
+
+    index = load_bm25_index()
+    rows = random.Random(seed).sample(range(len(index)), min(samples, len(index)))
+    found = {"dense": 0, "bm25": 0, "hybrid": 0}
+    seconds = {"dense": 0.0, "bm25": 0.0}
+    for row in rows:
+        words = index.metadata[row]["text"].split()
+        start = max(0, len(words) // 2 - query_words // 2)
+        query = " ".join(words[start:start + query_words])
+
+        t1 = time.perf_counter()
+        dense = get_vector_index().query(embedding_model(query), top_k=HYBRID_CANDIDATES, include_metadata=True)
+        seconds["dense"] += time.perf_counter() - t1
+        t1 = time.perf_counter()
+        bm25 = index.query(query, top_k=HYBRID_CANDIDATES)
+        seconds["bm25"] += time.perf_counter() - t1
+        hybrid = reciprocal_rank_fusion({"dense": dense, "bm25": bm25}, top_k, k=RRF_K)
+
+        for name, results in (("dense", dense), ("bm25", bm25), ("hybrid", hybrid)):
+            found[name] += index.ids[row] in [match["id"] for match in results["matches"][:top_k]]
+    return {
+        "samples": len(rows),
+        "top_k": top_k,
+        "recall": {name: round(count / max(len(rows), 1), 3) for name, count in found.items()},
+        "ms_per_query": {name: round(1000 * total / max(len(rows), 1), 2) for name, total in seconds.items()},
+    }
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) < 2:
+        print('Usage: python -m helper_functions.bm25_index "query text" [top_k] | evaluate [samples] [top_k]')
+        sys.exit(2)
+    if sys.argv[1] == "evaluate":
+        print(json.dumps(evaluate(int(sys.argv[2]) if len(sys.argv) > 2 else 200,
+                                  int(sys.argv[3]) if len(sys.argv) > 3 else 5), indent=2))
+        sys.exit(0)
+    index = load_bm25_index()
+    if index is None:
+        sys.exit(1)
+    t1 = time.perf_counter()
+    results = index.query(sys.argv[1], top_k=int(sys.argv[2]) if len(sys.argv) > 2 else 10)
+    print(f"BM25 query in {1000 * (time.perf_counter() - t1):.2f} ms")
+    for match in results["matches"]:
+        print(f"{match['score']:.2f}  {match['metadata']['source']}  {match['metadata']['text'][:100]!r}")
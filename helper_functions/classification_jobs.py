@@ -0,0 +1,269 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from itertools import islice
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+from helper_functions.ticket_ingestion import iter_tickets, file_hash
+from sql_db.ticket_repository import TicketRepository
+from sql_db.sql_data_inseration import connect, save_analysis
+
+load_dotenv()
+
+JOBS_DB_PATH = os.getenv("JOBS_DB_PATH", "classification_jobs.db")
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+# Tickets written per incremental update of the results table
+JOB_CHUNK_SIZE = int(os.getenv("JOB_CHUNK_SIZE", "32"))
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "1"))
+DASHBOARD_BATCH_CLASSIFICATION = os.getenv("DASHBOARD_BATCH_CLASSIFICATION", "1") == "1"
+
+# Lives as long as the Streamlit server process, across reruns and sessions
+_executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix="classification-job")
+_futures = {}
+_futures_lock = threading.Lock()
+
+
+@contextmanager
+def _connect():
+    """
+    Short-lived connection per call, committed and closed on exit; the worker
+    threads and the Streamlit script thread never share one.
+    """
+    conn = sqlite3.connect(JOBS_DB_PATH, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS classification_jobs (
+        job_id TEXT PRIMARY KEY,
+        status TEXT,
+        total INTEGER,
+        stats TEXT,
+        error TEXT,
+        created_at REAL,
+        finished_at REAL
+    )
+    """)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS classification_results (
+        job_id TEXT,
+        position INTEGER,
+        ticket_id TEXT,
+        subject TEXT,
+        body TEXT,
+        sentiment TEXT,
+        priority TEXT,
+        topic TEXT,
+        PRIMARY KEY (job_id, position)
+    )
+    """)
+    try:
+        yield conn
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def _set_status(job_id, status, stats=None, error=None):
+    with _connect() as conn:
+        conn.execute(
+            "UPDATE classification_jobs SET status = ?, stats = COALESCE(?, stats), error = ?, finished_at = ? WHERE job_id = ?",
+            (status, json.dumps(stats) if stats is not None else None, error,
+             time.time() if status in ("done", "failed") else None, job_id),
+        )
+
+
+def _pending(job_id, column):
+    with _connect() as conn:
+        return conn.execute(
+            f"SELECT position, body FROM classification_results WHERE job_id = ? AND {column} IS NULL ORDER BY position",
+            (job_id,),
+        ).fetchall()
+
+
+def _classify_pending(job_id, stats):
+    """
+    Sentiment, then topic and priority, for every stored ticket that does not
+    have them yet, JOB_CHUNK_SIZE tickets per write.
+    """
+    from helper_functions.sentiment_analysis import sentiment_analysis_batch
+    from helper_functions.batch_classification import classify_tickets_batch, per_ticket_baseline
+
+    pending = _pending(job_id, "sentiment")
+    for start in range(0, len(pending), JOB_CHUNK_SIZE):
+        chunk = pending[start:start + JOB_CHUNK_SIZE]
+        labels = sentiment_analysis_batch([body for _, body in chunk], batch_size=JOB_CHUNK_SIZE)
+        with _connect() as conn:
+            conn.executemany(
+                "UPDATE classification_results SET sentiment = ? WHERE job_id = ? AND position = ?",
+                [(label, job_id, position) for (position, _), label in zip(chunk, labels)],
+            )
+
+    pending = _pending(job_id, "topic")
+    for start in range(0, len(pending), JOB_CHUNK_SIZE):
+        chunk = pending[start:start + JOB_CHUNK_SIZE]
+        tickets = [{"body": body} for _, body in chunk]
+        if DASHBOARD_BATCH_CLASSIFICATION:
+            results, chunk_stats = classify_tickets_batch(tickets, "groq")
+            for key in ("llm_requests", "cached", "single_fallbacks"):
+                stats[key] += chunk_stats.get(key, 0)
+        else:
+            # groq_api_key=None: the gateway schedules the calls over the Groq key pool
+            results, _ = per_ticket_baseline(tickets, "groq")
+        with _connect() as conn:
+            conn.executemany(
+                "UPDATE classification_results SET priority = ?, topic = ? WHERE job_id = ? AND position = ?",
+                [(result["priority"], result["topic"], job_id, position) for (position, _), result in zip(chunk, results)],
+            )
+
+
+def _save_to_ticket_db(job_id, repository, start):
+    """
+    Write the analysis of the completed tickets from position `start` on back
+    to the ticket database, so bot lookups and searches show it. Returns the
+    position to continue from.
+    """
+    results = job_results(job_id, start)
+    if results:
+        conn = connect(repository.db_path)
+        try:
+            save_analysis(conn, [(result["id"], result["sentiment"], result["priority"], result["topic"]) for result in results])
+        finally:
+            conn.close()
+    return start + len(results)
+
+
+def _run_job(job_id, source, name):
+    """
+    Stream tickets from `source` JOB_CHUNK_SIZE at a time; each chunk is stored
+    and run through every stage before the next one is read, so the first
+    results show up while a large file is still being ingested. Rows stored by
+    an earlier, interrupted run are not inserted again, and any of them still
+    missing a stage is picked up, so the job resumes where it stopped.
+    Tickets read from a TicketRepository get their analysis written back to it.
+    """
+    stats = {"llm_requests": 0, "cached": 0, "single_fallbacks": 0, "invalid": 0}
+    ingestion_stats = {}
+    try:
+        with _connect() as conn:
+            stored = conn.execute("SELECT COUNT(*) FROM classification_results WHERE job_id = ?", (job_id,)).fetchone()[0]
+
+        position = saved = 0
+        if isinstance(source, TicketRepository):
+            # Stored tickets were validated by the loader; paged through in id order
+            tickets = source.iter_tickets()
+        else:
+            tickets = iter_tickets(source, name=name, stats=ingestion_stats)
+        while True:
+            chunk = list(islice(tickets, JOB_CHUNK_SIZE))
+            if not chunk:
+                break
+            rows = [(job_id, p, ticket["id"], ticket["subject"], ticket["body"])
+                    for p, ticket in enumerate(chunk, start=position) if p >= stored]
+            position += len(chunk)
+            if rows:
+                with _connect() as conn:
+                    conn.executemany(
+                        "INSERT OR IGNORE INTO classification_results (job_id, position, ticket_id, subject, body) VALUES (?, ?, ?, ?, ?)",
+                        rows,
+                    )
+            _classify_pending(job_id, stats)
+            if isinstance(source, TicketRepository):
+                saved = _save_to_ticket_db(job_id, source, saved)
+
+        with _connect() as conn:
+            conn.execute("UPDATE classification_jobs SET total = ? WHERE job_id = ?", (position, job_id))
+        _classify_pending(job_id, stats)
+        if isinstance(source, TicketRepository):
+            _save_to_ticket_db(job_id, source, saved)
+        stats["invalid"] = ingestion_stats.get("invalid", 0)
+        _set_status(job_id, "done", stats=stats)
+    except Exception as e:
+        print(f"Classification job {job_id[:12]} failed: {e}")
+        stats["invalid"] = ingestion_stats.get("invalid", 0)
+        _set_status(job_id, "failed", stats=stats, error=str(e))
+    finally:
+        with _futures_lock:
+            _futures.pop(job_id, None)
+
+
+def submit_job(source, name=None):
+    """
+    Start classifying the tickets file `source` (path or bytes; JSON array,
+    JSON Lines or CSV), or every ticket in a TicketRepository, in the
+    background and return the job id, the hash of the file or the fingerprint
+    of the database. Tickets that are already classified, or being classified
+    by this process, are not submitted again.
+    """
+    job_id = source.fingerprint() if isinstance(source, TicketRepository) else file_hash(source)
+    with _futures_lock:
+        if job_id in _futures:
+            return job_id
+        with _connect() as conn:
+            row = conn.execute("SELECT status FROM classification_jobs WHERE job_id = ?", (job_id,)).fetchone()
+            if row is not None and row[0] == "done":
+                return job_id
+            if row is None:
+                conn.execute(
+                    "INSERT INTO classification_jobs (job_id, status, created_at) VALUES (?, 'running', ?)",
+                    (job_id, time.time()),
+                )
+            else:
+                # "running" left behind by a stopped server, or "failed": resume it
+                conn.execute("UPDATE classification_jobs SET status = 'running', error = NULL WHERE job_id = ?", (job_id,))
+        _futures[job_id] = _executor.submit(_run_job, job_id, source, name)
+    return job_id
+
+
+def job_status(job_id):
+    """
+    Status, tickets stored so far, per-stage progress and stats of a job, or
+    None if unknown. `ingesting` is True until the whole file has been read.
+    """
+    with _connect() as conn:
+        row = conn.execute(
+            "SELECT status, total, stats, error FROM classification_jobs WHERE job_id = ?", (job_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        stored, sentiment_done, classified = conn.execute(
+            "SELECT COUNT(*), COUNT(sentiment), COUNT(topic) FROM classification_results WHERE job_id = ?", (job_id,)
+        ).fetchone()
+    return {
+        "status": row[0],
+        "total": row[1] if row[1] is not None else stored,
+        "ingesting": row[1] is None,
+        "sentiment_done": sentiment_done,
+        "classified": classified,
+        "stats": json.loads(row[2]) if row[2] else None,
+        "error": row[3],
+    }
+
+
+def job_results(job_id, start=0, completed_only=True):
+    """
+    Result rows from position `start` on, in upload order. With completed_only,
+    stops at the first ticket that has not been through every stage yet.
+    """
+    with _connect() as conn:
+        rows = conn.execute(
+            "SELECT position, ticket_id, subject, body, sentiment, priority, topic FROM classification_results "
+            "WHERE job_id = ? AND position >= ? ORDER BY position",
+            (job_id, start),
+        ).fetchall()
+    results = []
+    for position, ticket_id, subject, body, sentiment, priority, topic in rows:
+        if completed_only and (sentiment is None or topic is None):
+            break
+        results.append({"position": position, "id": ticket_id, "subject": subject, "body": body,
+                        "sentiment": sentiment, "priority": priority, "topic": topic})
+    return results
+
+
+def sentiment_counts(job_id):
+    with _connect() as conn:
+        return dict(conn.execute(
+            "SELECT sentiment, COUNT(*) FROM classification_results WHERE job_id = ? AND sentiment IS NOT NULL GROUP BY sentiment",
+            (job_id,),
+        ).fetchall())
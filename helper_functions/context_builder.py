@@ -0,0 +1,197 @@
+import os
+import re
+import time
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Tokens of retrieved context per prompt (the old 6000-character cut was roughly 1500 tokens)
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1200"))
+# Word-shingle Jaccard similarity above which a chunk counts as a near-duplicate of one already packed
+CONTEXT_DUPLICATE_THRESHOLD = float(os.getenv("CONTEXT_DUPLICATE_THRESHOLD", "0.5"))
+# A chunk that does not fit is cut at a sentence end if at least this many tokens of budget remain
+CONTEXT_MIN_PARTIAL_TOKENS = int(os.getenv("CONTEXT_MIN_PARTIAL_TOKENS", "80"))
+
+SHINGLE_WORDS = 5
+# Chunks overlap by up to 200 characters (RecursiveCharacterTextSplitter chunk_overlap); shorter matches are coincidence
+MAX_OVERLAP_CHARS = 300
+MIN_OVERLAP_CHARS = 20
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+_tokenizer = None
+
+
+def _get_tokenizer():
+    """
+    The embedding model's Hugging Face tokenizer from ./model/, loaded once;
+    False when it is not available, in which case ~4 characters count as a token.
+    """
+    global _tokenizer
+    if _tokenizer is None:
+        try:
+            from transformers import AutoTokenizer
+            from helper_functions.model_loader import load_model
+            from helper_functions.embeddings_func import model_dir, model_folder_name
+
+            _tokenizer = load_model(f"{model_folder_name}:tokenizer", model_dir,
+                                    lambda directory: AutoTokenizer.from_pretrained(directory, local_files_only=True))
+        except Exception as e:
+            print(f"Context builder: no tokenizer available ({e}); estimating ~4 characters per token")
+            _tokenizer = False
+    return _tokenizer
+
+
+def count_tokens(texts):
+    """
+    Token counts of `texts`, tokenized in one batch.
+    """
+    texts = list(texts)
+    tokenizer = _get_tokenizer()
+    if not texts:
+        return []
+    if tokenizer is False:
+        return [len(text) // 4 + 1 for text in texts]
+    return [len(ids) for ids in tokenizer(texts, add_special_tokens=False)["input_ids"]]
+
+
+def _shingles(text):
+    words = text.lower().split()
+    return {hash(" ".join(words[i:i + SHINGLE_WORDS])) for i in range(max(1, len(words) - SHINGLE_WORDS + 1))}
+
+
+def _overlap(left, right):
+    """
+    Length of the longest tail of `left` that `right` starts with, or 0.
+    """
+    for k in range(min(MAX_OVERLAP_CHARS, len(left), len(right)), MIN_OVERLAP_CHARS - 1, -1):
+        if left.endswith(right[:k]):
+            return k
+    return 0
+
+
+def truncate_to_tokens(text, budget):
+    """
+    The longest run of whole sentences from the start of `text` within
+    `budget` tokens ("" if not even the first sentence fits).
+    """
+    if count_tokens([text])[0] <= budget:
+        return text
+    sentences = _SENTENCE_END.split(text)
+    kept, used = [], 0
+    for sentence, tokens in zip(sentences, count_tokens(sentences)):
+        if used + tokens > budget:
+            break
+        kept.append(sentence)
+        used += tokens
+    return " ".join(kept)
+
+
+def build_context(matches, token_budget=CONTEXT_TOKEN_BUDGET, duplicate_threshold=CONTEXT_DUPLICATE_THRESHOLD):
+    """
+    Pack retrieved chunks (matches with metadata text/source, best first)
+    into `token_budget` tokens:
+
+    - near-duplicates of an already packed chunk (shingle Jaccard) are dropped
+    - text a chunk shares with a packed neighbour of the same source (the
+      splitter's overlap) is cut, and the two are kept next to each other
+    - chunks are taken in rank order while they fit; the first one that does
+      not is cut at a sentence end if enough budget is left
+
+    The "Source:" headers and separators count against the budget too, so the
+    returned context needs no further truncation.
+
+    Returns (context grouped by source URL, source URLs used, stats).
+    """
+    started = time.perf_counter()
+    candidates = [match["metadata"] for match in matches]
+    tokens_in = sum(count_tokens(candidate["text"] for candidate in candidates))
+
+    groups = {}
+    packed_shingles = []
+    used = 0
+    stats = {"chunks": len(candidates), "used": 0, "duplicates": 0, "overlap_chars": 0, "partial": 0, "over_budget": 0}
+    for candidate in candidates:
+        text, source = candidate["text"].strip(), candidate["source"]
+        shingles = _shingles(text)
+        if any(len(shingles & other) / len(shingles | other) >= duplicate_threshold for other in packed_shingles):
+            stats["duplicates"] += 1
+            continue
+
+        group = groups.get(source, [])
+        # Separator (and "Source:" header for a new group) this chunk adds to the context
+        overhead = count_tokens(["\n" if group else ("\n\n" if groups else "") + f"Source: {source}\n"])[0]
+        position = len(group)
+        for i, neighbour in enumerate(group):
+            head = _overlap(neighbour, text)
+            if head:
+                text, position = text[head:].lstrip(), i + 1
+                stats["overlap_chars"] += head
+                break
+            tail = _overlap(text, neighbour)
+            if tail:
+                text, position = text[:-tail].rstrip(), i
+                stats["overlap_chars"] += tail
+                break
+        if not text:
+            stats["duplicates"] += 1
+            continue
+
+        tokens = count_tokens([text])[0] + overhead
+        if used + tokens > token_budget:
+            remaining = token_budget - used - overhead
+            text = truncate_to_tokens(text, remaining) if remaining >= CONTEXT_MIN_PARTIAL_TOKENS else ""
+            if not text:
+                stats["over_budget"] += 1
+                continue
+            tokens = count_tokens([text])[0] + overhead
+            stats["partial"] += 1
+
+        groups.setdefault(source, group).insert(position, text)
+        packed_shingles.append(shingles)
+        used += tokens
+        stats["used"] += 1
+
+    context = "\n\n".join(f"Source: {source}\n" + "\n".join(texts) for source, texts in groups.items())
+    stats.update({"tokens_in": tokens_in, "tokens": used, "ms": round(1000 * (time.perf_counter() - started), 2)})
+    return context, list(groups), stats
+
+
+def benchmark(tickets_path="./json_files_data/data.json", top_k=10):
+    """
+    Retrieve top_k chunks per sample ticket with the BM25 index (no embedding
+    model needed) and compare the old join + context[:6000] with build_context:
+    prompt tokens, duplicated text and how many chunks make it in whole.
+    """
+    import json
+    from helper_functions.bm25_index import load_bm25_index
+
+    index = load_bm25_index()
+    with open(tickets_path, "r", encoding="utf-8") as f:
+        tickets = json.load(f)
+
+    report = {"tickets": len(tickets), "old_tokens": 0, "new_tokens": 0, "old_whole_chunks": 0,
+              "new_whole_chunks": 0, "duplicates_dropped": 0, "overlap_chars_cut": 0, "build_ms": 0.0}
+    for ticket in tickets:
+        matches = index.query(ticket["body"], top_k=top_k)["matches"]
+        if not matches:
+            continue
+
+        old_context = "\n\n".join(match["metadata"]["text"] for match in matches)[:6000]
+        context, _, stats = build_context(matches)
+        report["old_tokens"] += count_tokens([old_context])[0]
+        report["new_tokens"] += stats["tokens"]
+        report["old_whole_chunks"] += sum(match["metadata"]["text"] in old_context for match in matches)
+        report["new_whole_chunks"] += stats["used"] - stats["partial"]
+        report["duplicates_dropped"] += stats["duplicates"]
+        report["overlap_chars_cut"] += stats["overlap_chars"]
+        report["build_ms"] += stats["ms"]
+    report["build_ms"] = round(report["build_ms"] / max(len(tickets), 1), 2)
+    return report
+
+
+if __name__ == "__main__":
+    import sys
+    import json
+
+    print(json.dumps(benchmark(*(sys.argv[1:2])), indent=2))
@@ -0,0 +1,260 @@
+import os
+import re
+import json
+import time
+import plotly.graph_objects as go
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Redraw the charts every CHART_REDRAW_EVERY tickets or CHART_REDRAW_SECONDS, whichever comes first
+CHART_REDRAW_EVERY = int(os.getenv("CHART_REDRAW_EVERY", "25"))
+CHART_REDRAW_SECONDS = float(os.getenv("CHART_REDRAW_SECONDS", "2"))
+
+EMOTION_COLORS = {
+    "excitement": "#FF4500","pride": "#800080", "joy": "#BFFF00","approval": "#4CAF50","admiration": "#F4C542",
+    "desire": "#FF69B4","love": "#E91E63","optimism": "#A8E6CF","amusement": "#FFA500","caring": "#5DADE2",
+    "realization": "#3498DB","gratitude": "#5CFF3B","curiosity": "#9B59B6","relief": "#82E0AA","surprise": "#FF7F50","neutral": "#BDC3C7",
+    "nervousness": "#F39C12","confusion": "#7F8C8D","remorse": "#8E44AD","anger": "#E74C3C","annoyance": "#E67E22",
+    "grief": "#2C3E50","fear": "#4B0082","embarrassment": "#FAD7A0","disapproval": "#C0392B","disgust": "#556B2F",
+    "disappointment": "#5D6D7E","sadness": "#3498DB"
+}
+EMOTIONS = list(EMOTION_COLORS)
+_EMOTION_INDEX = {emotion: i for i, emotion in enumerate(EMOTIONS)}
+
+# Alpha suffixes the ticket styles blend the emotion colour with
+_ALPHAS = ("", "11", "22", "33", "44", "66", "CC", "DD")
+
+# Shared rules; every emotion only sets its --emotion-color* variables
+_EMOTION_RULES = """
+.emotion-header {
+    background: linear-gradient(135deg, var(--emotion-color) 0%, var(--emotion-colorCC) 100%);
+    border-radius: 12px;
+    padding: 18px;
+    color: white;
+    font-weight: bold;
+    margin: 15px 0;
+    box-shadow: 0 4px 15px var(--emotion-color33);
+    transition: all 0.3s ease;
+    text-shadow: 0 2px 4px rgba(0, 0, 0, 0.3);
+}
+.emotion-header:hover {
+    transform: translateY(-2px);
+    box-shadow: 0 6px 20px var(--emotion-color44);
+}
+.emotion-box {
+    background: linear-gradient(145deg, var(--emotion-color11), var(--emotion-color22));
+    border-left: 5px solid var(--emotion-color);
+    border-radius: 12px;
+    padding: 20px;
+    margin: 15px 0;
+    box-shadow: 0 4px 12px var(--emotion-color22);
+    transition: all 0.3s ease;
+    position: relative;
+    overflow: hidden;
+}
+.emotion-box:before {
+    content: '';
+    position: absolute;
+    top: 0;
+    left: 0;
+    width: 100%;
+    height: 2px;
+    background: linear-gradient(90deg, transparent, var(--emotion-color66), transparent);
+}
+.emotion-box:hover {
+    transform: translateY(-3px);
+    box-shadow: 0 8px 20px var(--emotion-color33);
+}
+.emotion-label {
+    font-weight: bold;
+    color: var(--emotion-color);
+    margin-bottom: 12px;
+    font-size: 1.1rem;
+    display: flex;
+    align-items: center;
+    gap: 8px;
+    text-shadow: 0 1px 2px rgba(0, 0, 0, 0.1);
+}
+.emotion-scrollbar::-webkit-scrollbar {
+    width: 6px;
+}
+.emotion-scrollbar::-webkit-scrollbar-track {
+    background: #f1f1f1;
+    border-radius: 10px;
+}
+.emotion-scrollbar::-webkit-scrollbar-thumb {
+    background: var(--emotion-color);
+    border-radius: 10px;
+}
+.emotion-scrollbar::-webkit-scrollbar-thumb:hover {
+    background: var(--emotion-colorDD);
+}
+"""
+
+
+def _emotion_variables(emotion, color):
+    return f".emotion-{emotion} {{ " + " ".join(f"--emotion-color{alpha}: {color}{alpha};" for alpha in _ALPHAS) + " }"
+
+
+# One stylesheet for all 28 emotions, emitted once per page instead of once per ticket
+EMOTION_STYLESHEET = (
+    "<style>\n"
+    + "\n".join(_emotion_variables(emotion, color) for emotion, color in EMOTION_COLORS.items())
+    + _EMOTION_RULES
+    + "</style>"
+)
+
+
+def legacy_ticket_css(emotion):
+    """
+    The per-ticket <style> block the dashboard used to emit, for the benchmark.
+    """
+    color = EMOTION_COLORS.get(emotion, "#BDC3C7")
+    css = re.sub(r"var\(--emotion-color(\w*)\)", lambda m: color + m.group(1), _EMOTION_RULES)
+    css = re.sub(r"\.emotion-(header|box|label|scrollbar)", lambda m: f".emotion-{emotion}-{m.group(1)}", css)
+    return f"<style>{css}</style>"
+
+
+class EmotionCounts:
+    """
+    Sentiment counts in a fixed array ordered like EMOTIONS.
+    """
+
+    def __init__(self):
+        self.counts = [0] * len(EMOTIONS)
+
+    def set(self, counts_by_label):
+        self.counts = [0] * len(EMOTIONS)
+        for label, count in counts_by_label.items():
+            self.counts[_EMOTION_INDEX[label.lower()]] = count
+
+    def add(self, label, count=1):
+        self.counts[_EMOTION_INDEX[label.lower()]] += count
+
+    @property
+    def total(self):
+        return sum(self.counts)
+
+
+_EMOTION_COLOR_LIST = [EMOTION_COLORS[emotion] for emotion in EMOTIONS]
+
+
+def bar_figure(counts):
+    fig = go.Figure(go.Bar(x=EMOTIONS, y=counts, marker_color=_EMOTION_COLOR_LIST))
+    fig.update_layout(xaxis_tickangle=-45, xaxis_title="Emotion", yaxis_title="Count")
+    return fig
+
+
+def pie_figure(counts):
+    fig = go.Figure(go.Pie(labels=EMOTIONS, values=counts, marker_colors=_EMOTION_COLOR_LIST, hole=0.4, sort=False))
+    fig.update_traces(textposition='inside', textinfo='percent+label')
+    return fig
+
+
+class ChartThrottle:
+    """
+    Decides when the charts are worth redrawing: after `every` more tickets,
+    after `interval_s` seconds with new tickets, or once at the end.
+    """
+
+    def __init__(self, every=CHART_REDRAW_EVERY, interval_s=CHART_REDRAW_SECONDS):
+        self.every = every
+        self.interval_s = interval_s
+        self.drawn_at_count = None
+        self.drawn_at_time = 0.0
+
+    def due(self, count, final=False):
+        if count == self.drawn_at_count:
+            return False
+        if final or self.drawn_at_count is None:
+            return True
+        return count - self.drawn_at_count >= self.every or time.monotonic() - self.drawn_at_time >= self.interval_s
+
+    def drawn(self, count):
+        self.drawn_at_count = count
+        self.drawn_at_time = time.monotonic()
+
+
+class RenderMetrics:
+    """
+    Wall time spent rendering and approximate bytes pushed to the browser
+    (chart JSON plus HTML/CSS strings).
+    """
+
+    def __init__(self):
+        self.seconds = 0.0
+        self.bytes = 0
+        self.chart_redraws = 0
+
+    def record(self, started, payload_bytes, chart_redraw=False):
+        self.seconds += time.perf_counter() - started
+        self.bytes += payload_bytes
+        self.chart_redraws += chart_redraw
+
+    def per_ticket(self, tickets):
+        tickets = max(tickets, 1)
+        return {
+            "chart_redraws": self.chart_redraws,
+            "render_ms_per_ticket": round(1000 * self.seconds / tickets, 2),
+            "kb_per_ticket": round(self.bytes / 1024 / tickets, 2),
+        }
+
+
+def figure_bytes(fig):
+    return len(fig.to_json())
+
+
+def benchmark(tickets=200, every=CHART_REDRAW_EVERY):
+    """
+    Build (without a browser) what the old per-ticket loop and the throttled
+    renderer would send for `tickets` tickets, and compare time and bytes.
+    """
+    import pandas as pd
+    import plotly.express as px
+
+    labels = [EMOTIONS[(i * 7) % len(EMOTIONS)] for i in range(tickets)]
+
+    started = time.perf_counter()
+    legacy_bytes = 0
+    record = {emotion: 0 for emotion in EMOTIONS}
+    for label in labels:
+        record[label] += 1
+        df = pd.DataFrame(list(record.items()), columns=['Emotion', 'Count'])
+        fig_bar = px.bar(df, x='Emotion', y='Count', color='Emotion', color_discrete_map=EMOTION_COLORS)
+        fig_bar.update_layout(xaxis_tickangle=-45)
+        fig_pie = px.pie(df, names='Emotion', values='Count', color='Emotion', color_discrete_map=EMOTION_COLORS, hole=0.4)
+        fig_pie.update_traces(textposition='inside', textinfo='percent+label')
+        legacy_bytes += figure_bytes(fig_bar) + figure_bytes(fig_pie) + len(legacy_ticket_css(label))
+    legacy_seconds = time.perf_counter() - started
+
+    metrics = RenderMetrics()
+    started = time.perf_counter()
+    metrics.record(started, len(EMOTION_STYLESHEET))
+    counts = EmotionCounts()
+    throttle = ChartThrottle(every=every, interval_s=float("inf"))
+    for i, label in enumerate(labels, start=1):
+        counts.add(label)
+        if throttle.due(i, final=i == tickets):
+            t1 = time.perf_counter()
+            metrics.record(t1, figure_bytes(bar_figure(counts.counts)) + figure_bytes(pie_figure(counts.counts)), chart_redraw=True)
+            throttle.drawn(i)
+    incremental_seconds = time.perf_counter() - started
+
+    return {
+        "tickets": tickets,
+        "legacy": {"render_ms_per_ticket": round(1000 * legacy_seconds / tickets, 2),
+                   "kb_per_ticket": round(legacy_bytes / 1024 / tickets, 2)},
+        "incremental": {**metrics.per_ticket(tickets),
+                        "render_ms_per_ticket": round(1000 * incremental_seconds / tickets, 2)},
+    }
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) >= 2 and sys.argv[1] == "benchmark":
+        print(json.dumps(benchmark(int(sys.argv[2]) if len(sys.argv) > 2 else 200), indent=2))
+    else:
+        print("Usage: python -m helper_functions.dashboard_rendering benchmark [tickets]")
+        sys.exit(2)
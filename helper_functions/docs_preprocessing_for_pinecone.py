@@ -1,8 +1,9 @@
 import json
 import numpy as np
-from uuid import uuid4
 from tqdm import tqdm
-from helper_functions.embeddings_func import embedding_model
+from helper_functions.embedding_pipeline import EMBEDDING_BATCH_SIZE, EMBEDDING_WORKERS, embed_in_batches
+from helper_functions.vector_store import VectorStore, ensure_vector_store, save_vector_store_from_records
+from helper_functions.index_manifest import chunk_id, load_manifest, record_embedding_run, save_manifest
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 
 with open("preprocessed_data/docs.atlan.com_preprocessed.json", "r", encoding="utf-8") as file:
@@ -18,40 +19,49 @@ splitter = RecursiveCharacterTextSplitter(
     chunk_overlap=200
 )
 
-def pinecone_data_setup(documents):
-    pinecone_vectors = []
-    
+def iter_chunks(documents):
+    """
+    Yield (chunk_id, url, chunk) for every distinct chunk of `documents`.
+    """
+    seen = set()
     for doc in tqdm(documents, desc="Processing documents"):
-        chunks = splitter.split_text(doc["text"])
-        
-        for chunk in tqdm(chunks, desc="Creating embeddings", leave=False):
-            embedding = embedding_model(chunk)
-            
-            # Convert numpy array to Python list for JSON serialization
-            if isinstance(embedding, np.ndarray):
-                embedding = embedding.tolist()
-            
-            vector_data = {
-                "id": uuid4().hex,
-                "values": embedding,
-                "metadata": {
-                    "source": doc["url"],
-                    "text": chunk
-                }
-            }
-            pinecone_vectors.append(vector_data)
-    
-    return pinecone_vectors
+        for chunk in splitter.split_text(doc["text"]):
+            vector_id = chunk_id(doc["url"], chunk)
+            if vector_id in seen:
+                continue
+            seen.add(vector_id)
+            yield vector_id, doc["url"], chunk
 
-def create_pinecone_data_format():
-    pinecone_data = pinecone_data_setup(final_docs)
+def pinecone_data_setup(documents, batch_size=EMBEDDING_BATCH_SIZE, workers=EMBEDDING_WORKERS, previous_vectors=None):
+    """
+    Build Pinecone-format records for `documents`. Chunks whose id is already in
+    `previous_vectors` ({id: embedding}) reuse that embedding; only the rest are embedded.
+    """
+    previous_vectors = previous_vectors or {}
+    chunks = list(iter_chunks(documents))
+    embeddings_by_id = {}
 
-    with open("./preprocessed_data/pinecone_db_data.json", "w", encoding="utf-8") as file:
-        json.dump(pinecone_data, file, indent=4)
+    new_chunks = [chunk for chunk in chunks if chunk[0] not in previous_vectors]
+    for batch, embeddings in embed_in_batches(new_chunks, text_of=lambda item: item[2],
+                                              batch_size=batch_size, workers=workers, total=len(new_chunks)):
+        for (vector_id, _, _), embedding in zip(batch, embeddings):
+            embeddings_by_id[vector_id] = embedding
 
-    print(f"Generated {len(pinecone_data)} vectors for Pinecone")
+    pinecone_vectors = []
+    for vector_id, url, chunk in chunks:
+        vector_data = {
+            "id": vector_id,
+            "values": embeddings_by_id[vector_id] if vector_id in embeddings_by_id else previous_vectors[vector_id],
+            "metadata": {
+                "source": url,
+                "text": chunk
+            }
+        }
+        pinecone_vectors.append(vector_data)
+    
+    return pinecone_vectors
 
-# Alternative approach using custom JSON encoder
+# Custom JSON encoder for the optional JSON export
 class NumpyEncoder(json.JSONEncoder):
     def default(self, obj):
         if isinstance(obj, np.ndarray):
@@ -62,11 +72,31 @@ class NumpyEncoder(json.JSONEncoder):
             return float(obj)
         return super().default(obj)
 
-def create_pinecone_data_format():
-    pinecone_data = pinecone_data_setup(final_docs)
+def create_pinecone_data_format(write_json=False):
+    """
+    Re-embed only new or changed chunks, reusing the vectors already in the
+    vector store, and record the delta in the index manifest.
+    """
+    previous_vectors = {}
+    # A deployment with only pinecone_db_data.json reuses those embeddings too
+    if ensure_vector_store():
+        store = VectorStore()
+        previous_vectors = {store.id(row): np.array(store.vectors[row]) for row in range(len(store))}
+        del store
+
+    pinecone_data = pinecone_data_setup(final_docs, previous_vectors=previous_vectors)
+
+    dimension = len(next(iter(previous_vectors.values()))) if previous_vectors else None
+    save_vector_store_from_records(pinecone_data, dimension=dimension)
 
-    with open("./preprocessed_data/pinecone_db_data.json", "w", encoding="utf-8") as file:
-        json.dump(pinecone_data, file, indent=4, cls=NumpyEncoder)
+    manifest = load_manifest()
+    delta = record_embedding_run(manifest, {record["id"]: record["metadata"]["source"] for record in pinecone_data})
+    save_manifest(manifest)
 
-    print(f"Generated {len(pinecone_data)} vectors for Pinecone")
+    if write_json:
+        with open("./preprocessed_data/pinecone_db_data.json", "w", encoding="utf-8") as file:
+            json.dump(pinecone_data, file, cls=NumpyEncoder)
 
+    print(f"Generated {len(pinecone_data)} vectors for Pinecone: "
+          f"{len(delta['added'])} new, {len(delta['unchanged'])} unchanged, {len(delta['removed'])} removed")
+    return delta
@@ -0,0 +1,81 @@
+import os
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from collections import deque
+from itertools import islice
+from tqdm import tqdm
+from dotenv import load_dotenv
+from helper_functions.embeddings_func import embed_texts, get_embedding_model
+
+load_dotenv()
+
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "256"))
+# 0 embeds in this process; N > 0 fans out to N worker processes, one model each
+EMBEDDING_WORKERS = int(os.getenv("EMBEDDING_WORKERS", "0"))
+
+
+def _worker_init(threads_per_worker):
+    import torch
+    torch.set_num_threads(threads_per_worker)
+    get_embedding_model()
+
+
+def _worker_embed(texts):
+    return embed_texts(texts, batch_size=len(texts))
+
+
+def _batches(items, batch_size):
+    items = iter(items)
+    while True:
+        batch = list(islice(items, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def embed_in_batches(items, text_of=lambda item: item, batch_size=EMBEDDING_BATCH_SIZE, workers=EMBEDDING_WORKERS, total=None):
+    """
+    Stream `items` through the embedding model in large batches.
+
+    Yields (batch_items, embeddings) in input order, where embeddings is a float32
+    matrix with one row per item. With workers > 0 the batches are spread over a
+    process pool with one model per worker; at most 2 * workers batches are in
+    flight, so memory stays bounded however long `items` is.
+    """
+    t1 = time.perf_counter()
+    embedded = 0
+
+    with tqdm(total=total, desc="Creating embeddings", unit="chunks") as pbar:
+        if workers <= 0:
+            for batch in _batches(items, batch_size):
+                embeddings = embed_texts([text_of(item) for item in batch], batch_size=batch_size)
+                embedded += len(batch)
+                pbar.update(len(batch))
+                pbar.set_postfix(chunks_per_sec=f"{embedded / (time.perf_counter() - t1):.1f}")
+                yield batch, embeddings
+        else:
+            threads_per_worker = max(1, (os.cpu_count() or 1) // workers)
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_worker_init,
+                initargs=(threads_per_worker,),
+            ) as executor:
+                in_flight = deque()
+                for batch in _batches(items, batch_size):
+                    in_flight.append((batch, executor.submit(_worker_embed, [text_of(item) for item in batch])))
+                    while len(in_flight) >= 2 * workers:
+                        done_batch, future = in_flight.popleft()
+                        embedded += len(done_batch)
+                        pbar.update(len(done_batch))
+                        pbar.set_postfix(chunks_per_sec=f"{embedded / (time.perf_counter() - t1):.1f}")
+                        yield done_batch, future.result()
+                while in_flight:
+                    done_batch, future = in_flight.popleft()
+                    embedded += len(done_batch)
+                    pbar.update(len(done_batch))
+                    yield done_batch, future.result()
+
+    elapsed = time.perf_counter() - t1
+    print(f"Embedded {embedded} chunks in {elapsed:.2f} seconds ({embedded / max(elapsed, 1e-9):.1f} chunks/sec)")
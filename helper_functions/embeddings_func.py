@@ -1,14 +1,72 @@
 from sentence_transformers import SentenceTransformer
+from transformers import AutoTokenizer
+from helper_functions.model_loader import MODEL_BASE_DIRECTORY, load_model
+from helper_functions.inference_backend import (
+    INFERENCE_BACKEND, EXPORT_HINT, ONNX_BACKENDS, mean_pool_normalize, onnx_directory, onnx_session, quantize_dynamic_int8
+)
+import numpy as np
 import os
 
-model_dir = "./model/embedding_model"
+model_name = 'sentence-transformers/all-MiniLM-L6-v2'
+model_folder_name = "all_minilm_l6_v2"
+model_dir = os.path.join(MODEL_BASE_DIRECTORY, model_folder_name)
 
-os.makedirs(model_dir, exist_ok=True)
 
-model = SentenceTransformer('sentence-transformers/all-MiniLM-L6-v2', cache_folder=model_dir)
+def _download(directory):
+    SentenceTransformer(model_name).save(directory)
+
+
+def _load_local(directory):
+    return SentenceTransformer(directory, local_files_only=True)
+
+
+def _load_local_int8(directory):
+    return quantize_dynamic_int8(_load_local(directory))
+
+
+def _load_local_onnx(directory, file_name):
+    return AutoTokenizer.from_pretrained(directory, local_files_only=True), onnx_session(directory, file_name)
+
+
+def get_embedding_model(backend=None):
+    """
+    Return the embedding model for the selected inference backend, loaded once per process.
+    For torch backends this is a SentenceTransformer, for the onnxruntime ones a (tokenizer, InferenceSession) pair.
+    """
+    backend = backend or INFERENCE_BACKEND
+    if backend == "torch-dynamic-int8":
+        return load_model(f"{model_folder_name}:int8", model_dir, _load_local_int8, _download)
+    if backend in ONNX_BACKENDS:
+        return load_model(f"{model_folder_name}:{backend}", onnx_directory(model_folder_name),
+                          lambda directory: _load_local_onnx(directory, ONNX_BACKENDS[backend]), hint=EXPORT_HINT)
+    return load_model(model_folder_name, model_dir, _load_local, _download)
+
+
+def embed_texts(texts, batch_size=32, backend=None):
+    """
+    Embed a list of texts, returning a float32 matrix of shape (len(texts), 384).
+    """
+    texts = list(texts)
+    backend = backend or INFERENCE_BACKEND
+    model = get_embedding_model(backend)
+
+    if backend not in ONNX_BACKENDS:
+        return np.asarray(model.encode(texts, batch_size=batch_size, convert_to_numpy=True), dtype=np.float32)
+
+    tokenizer, session = model
+    embeddings = np.zeros((len(texts), 384), dtype=np.float32)
+    order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+    for start in range(0, len(order), batch_size):
+        batch_indices = order[start:start + batch_size]
+        batch = tokenizer([texts[i] for i in batch_indices], padding=True, truncation=True, max_length=256, return_tensors="np")
+        inputs = {"input_ids": batch["input_ids"].astype(np.int64), "attention_mask": batch["attention_mask"].astype(np.int64)}
+        last_hidden_state = session.run(["last_hidden_state"], inputs)[0]
+        embeddings[batch_indices] = mean_pool_normalize(last_hidden_state, inputs["attention_mask"])
+    return embeddings
+
 
 def embedding_model(text):
-    embedding = model.encode([text])[0]
+    embedding = embed_texts([text])[0]
     return embedding
 
 # print(embedding_model("Hello, world!"), len(embedding_model("Hello, world!")))
@@ -0,0 +1,107 @@
+import os
+import json
+import hashlib
+from tqdm import tqdm
+
+MANIFEST_PATH = "./preprocessed_data/index_manifest.json"
+
+
+def chunk_id(url, chunk):
+    """
+    Deterministic vector id for a chunk: the same text at the same URL always
+    gets the same id, so re-runs can tell new chunks from already-indexed ones.
+    """
+    content_hash = hashlib.sha256(chunk.encode("utf-8")).hexdigest()
+    return hashlib.sha256(f"{url}\x00{content_hash}".encode("utf-8")).hexdigest()[:32]
+
+
+def load_manifest(path=MANIFEST_PATH):
+    """
+    The manifest records every embedded chunk id with its source and whether it
+    has been upserted, plus the ids still to be deleted from the remote index.
+    """
+    if not os.path.isfile(path):
+        return {"chunks": {}, "pending_deletes": []}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def manifest_version(path=MANIFEST_PATH):
+    """
+    Hash of the chunk ids upserted to the remote index (changes whenever a sync
+    does), or None without a manifest.
+    """
+    if not os.path.isfile(path):
+        return None
+    upserted = sorted(i for i, entry in load_manifest(path)["chunks"].items() if entry.get("upserted"))
+    return hashlib.sha256("\n".join(upserted).encode("utf-8")).hexdigest()[:16]
+
+
+def save_manifest(manifest, path=MANIFEST_PATH):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, path)
+
+
+def record_embedding_run(manifest, current_chunks):
+    """
+    Update the manifest after an embedding run over `current_chunks` ({id: source}).
+    Returns the delta as {"added": [...], "unchanged": [...], "removed": [...]}.
+    """
+    previous = manifest["chunks"]
+    added = [i for i in current_chunks if i not in previous]
+    unchanged = [i for i in current_chunks if i in previous]
+    removed = [i for i in previous if i not in current_chunks]
+
+    manifest["chunks"] = {
+        i: {"source": source, "upserted": previous.get(i, {}).get("upserted", False)}
+        for i, source in current_chunks.items()
+    }
+    pending = set(manifest.get("pending_deletes", []))
+    pending.update(i for i in removed if previous[i].get("upserted"))
+    pending.difference_update(current_chunks)
+    manifest["pending_deletes"] = sorted(pending)
+
+    return {"added": added, "unchanged": unchanged, "removed": removed}
+
+
+def sync_to_index(index, store, manifest, batch_size=100):
+    """
+    Bring a Pinecone index in line with the vector store: upsert chunks not yet
+    upserted and delete vectors of chunks that have vanished. Only the delta is
+    sent; the manifest is updated and saved as batches succeed.
+
+    If the manifest has never recorded an upsert, any vectors already in the
+    index are untracked (the random ids of the old full upload) and would sit
+    next to their content-hash copies, so they are deleted first.
+    """
+    cleared = 0
+    if not any(entry.get("upserted") for entry in manifest["chunks"].values()):
+        cleared = index.describe_index_stats().total_vector_count
+        if cleared:
+            print(f"Index holds {cleared} vectors not recorded in the manifest; deleting them before the first sync")
+            index.delete(delete_all=True)
+            manifest["pending_deletes"] = []
+            save_manifest(manifest)
+
+    pending_upserts = [row for row in range(len(store)) if not manifest["chunks"].get(store.id(row), {}).get("upserted")]
+
+    for i in tqdm(range(0, len(pending_upserts), batch_size), desc="Upserting new chunks"):
+        rows = pending_upserts[i:i + batch_size]
+        batch = [store.records(row, row + 1)[0] for row in rows]
+        index.upsert(vectors=batch)
+        for record in batch:
+            manifest["chunks"].setdefault(record["id"], {"source": record["metadata"]["source"]})["upserted"] = True
+        save_manifest(manifest)
+
+    pending_deletes = list(manifest.get("pending_deletes", []))
+    for i in tqdm(range(0, len(pending_deletes), batch_size), desc="Deleting vanished chunks"):
+        batch = pending_deletes[i:i + batch_size]
+        index.delete(ids=batch)
+        manifest["pending_deletes"] = pending_deletes[i + batch_size:]
+        save_manifest(manifest)
+
+    report = {"upserted": len(pending_upserts), "deleted": len(pending_deletes) + cleared}
+    print(f"Index sync: {report['upserted']} vectors upserted, {report['deleted']} vectors deleted")
+    return report
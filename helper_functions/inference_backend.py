@@ -0,0 +1,202 @@
+import os
+import time
+import json
+import numpy as np
+from dotenv import load_dotenv
+from helper_functions.model_loader import MODEL_BASE_DIRECTORY, write_checksums
+
+load_dotenv()
+
+BACKENDS = ("torch-fp32", "torch-dynamic-int8", "onnxruntime-fp32", "onnxruntime")
+# parity_check compares every other backend against this one
+REFERENCE_BACKEND = "torch-fp32"
+
+INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "torch-fp32")
+if INFERENCE_BACKEND not in BACKENDS:
+    raise ValueError(f"INFERENCE_BACKEND must be one of {BACKENDS}, got '{INFERENCE_BACKEND}'")
+
+ONNX_FILE_NAME = "model.onnx"
+ONNX_INT8_FILE_NAME = "model.int8.onnx"
+# ONNX graph each onnxruntime backend runs; "onnxruntime" is the int8 one
+ONNX_BACKENDS = {"onnxruntime-fp32": ONNX_FILE_NAME, "onnxruntime": ONNX_INT8_FILE_NAME}
+EXPORT_HINT = "Run `python -m helper_functions.inference_backend export` to build the ONNX artifacts."
+
+
+def onnx_directory(model_folder_name):
+    return os.path.join(MODEL_BASE_DIRECTORY, f"{model_folder_name}_onnx")
+
+
+def quantize_dynamic_int8(model):
+    """
+    Return a copy of a PyTorch model with its Linear layers dynamically quantized to int8.
+    """
+    import torch
+
+    return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def onnx_session(directory, file_name=ONNX_INT8_FILE_NAME):
+    """
+    Open an ONNX graph in `directory` (the int8 one by default) on the CPU execution provider.
+    """
+    import onnxruntime as ort
+
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    return ort.InferenceSession(
+        os.path.join(directory, file_name),
+        sess_options=options,
+        providers=["CPUExecutionProvider"],
+    )
+
+
+def mean_pool_normalize(last_hidden_state, attention_mask):
+    """
+    Mean pooling over non-padding tokens followed by L2 normalisation,
+    matching the Pooling + Normalize modules of all-MiniLM-L6-v2.
+    """
+    mask = attention_mask[..., None].astype(np.float32)
+    summed = (last_hidden_state * mask).sum(axis=1)
+    counts = np.clip(mask.sum(axis=1), 1e-9, None)
+    pooled = summed / counts
+    norms = np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+    return (pooled / norms).astype(np.float32)
+
+
+def _export_onnx(module, input_names, output_name, directory, sample_encoding):
+    import torch
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+
+    os.makedirs(directory, exist_ok=True)
+    fp32_path = os.path.join(directory, ONNX_FILE_NAME)
+    int8_path = os.path.join(directory, ONNX_INT8_FILE_NAME)
+
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes[output_name] = {0: "batch"}
+
+    # no_grad rather than inference_mode: inference tensors break tracing on some torch versions
+    with torch.no_grad():
+        torch.onnx.export(
+            module,
+            tuple(torch.from_numpy(sample_encoding[name]) for name in input_names),
+            fp32_path,
+            input_names=list(input_names),
+            output_names=[output_name],
+            dynamic_axes=dynamic_axes,
+            opset_version=14,
+        )
+    quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+    write_checksums(directory)
+    print(f"Exported {fp32_path} and {int8_path}")
+
+
+def export_models():
+    """
+    One-shot export of the sentiment and embedding models to ONNX (fp32 + dynamic int8).
+    The tokenizer files are copied next to the graphs so the onnxruntime backend
+    does not need the PyTorch artifacts at all.
+    """
+    import torch
+    from helper_functions import sentiment_analysis, embeddings_func
+
+    class _LogitsOnly(torch.nn.Module):
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, input_ids, attention_mask):
+            return self.model(input_ids=input_ids, attention_mask=attention_mask).logits
+
+    class _LastHiddenStateOnly(torch.nn.Module):
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, input_ids, attention_mask):
+            return self.model(input_ids=input_ids, attention_mask=attention_mask).last_hidden_state
+
+    sample_texts = ["Connecting Snowflake to Atlan - required permissions?", "Hi"]
+
+    tokenizer, model = sentiment_analysis.get_sentiment_model("torch-fp32")
+    directory = onnx_directory(sentiment_analysis.model_folder_name)
+    tokenizer.save_pretrained(directory)
+    model.config.save_pretrained(directory)
+    _export_onnx(
+        _LogitsOnly(model).eval(),
+        ("input_ids", "attention_mask"),
+        "logits",
+        directory,
+        tokenizer(sample_texts, padding=True, return_tensors="np"),
+    )
+
+    st_model = embeddings_func.get_embedding_model("torch-fp32")
+    directory = onnx_directory(embeddings_func.model_folder_name)
+    st_model.tokenizer.save_pretrained(directory)
+    _export_onnx(
+        _LastHiddenStateOnly(st_model[0].auto_model).eval(),
+        ("input_ids", "attention_mask"),
+        "last_hidden_state",
+        directory,
+        st_model.tokenizer(sample_texts, padding=True, return_tensors="np"),
+    )
+
+
+def parity_check(texts):
+    """
+    Compare every backend against the torch-fp32 reference on `texts`:
+    sentiment label agreement, embedding cosine drift and per-text latency.
+    Raises RuntimeError when the reference itself cannot be loaded; other
+    backends that cannot be loaded are reported with their error.
+    """
+    from helper_functions.sentiment_analysis import sentiment_analysis_batch
+    from helper_functions.embeddings_func import embed_texts
+
+    report = {}
+    reference_labels = None
+    reference_embeddings = None
+
+    for backend in [REFERENCE_BACKEND] + [backend for backend in BACKENDS if backend != REFERENCE_BACKEND]:
+        try:
+            t1 = time.perf_counter()
+            labels = sentiment_analysis_batch(texts, backend=backend)
+            sentiment_ms = (time.perf_counter() - t1) * 1000 / len(texts)
+
+            t1 = time.perf_counter()
+            embeddings = embed_texts(texts, backend=backend)
+            embedding_ms = (time.perf_counter() - t1) * 1000 / len(texts)
+        except (ImportError, RuntimeError) as e:
+            if backend == REFERENCE_BACKEND:
+                raise RuntimeError(f"Parity needs the {REFERENCE_BACKEND} reference, which could not be loaded: {e}") from e
+            report[backend] = {"error": str(e)}
+            continue
+
+        if backend == REFERENCE_BACKEND:
+            reference_labels, reference_embeddings = labels, embeddings
+
+        cosines = np.sum(embeddings * reference_embeddings, axis=1) / (
+            np.linalg.norm(embeddings, axis=1) * np.linalg.norm(reference_embeddings, axis=1)
+        )
+        report[backend] = {
+            "label_agreement": float(np.mean([a == b for a, b in zip(labels, reference_labels)])),
+            "embedding_cosine_mean": float(cosines.mean()),
+            "embedding_cosine_min": float(cosines.min()),
+            "sentiment_ms_per_text": round(sentiment_ms, 2),
+            "embedding_ms_per_text": round(embedding_ms, 2),
+        }
+
+    return report
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) >= 2 and sys.argv[1] == "export":
+        export_models()
+    elif len(sys.argv) >= 2 and sys.argv[1] == "parity":
+        tickets_path = sys.argv[2] if len(sys.argv) > 2 else "./json_files_data/data.json"
+        with open(tickets_path, "r", encoding="utf-8") as f:
+            tickets = json.load(f)
+        print(json.dumps(parity_check([ticket["body"] for ticket in tickets]), indent=2))
+    else:
+        print("Usage: python -m helper_functions.inference_backend [export|parity [tickets.json]]")
+        sys.exit(2)
@@ -2,30 +2,83 @@ from helper_functions.sentiment_analysis import sentiment_analysis
 from helper_functions.emoji import emotion_to_emoji
 from helper_functions.topic_tags import topic_tags_of_the_concern
 from helper_functions.priority import priority_of_the_concern
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from dotenv import load_dotenv
 import os
-import random
+import time
 
 
 load_dotenv()
 
+# Seconds each stage may take before the analysis returns without it
+STAGE_TIMEOUT = float(os.getenv("ANALYSIS_STAGE_TIMEOUT_SECONDS", "20"))
 
-def internal_analysis(body):
-    sentiment = sentiment_analysis(body)
+# Shared by all sessions; a stage that misses its deadline keeps its worker until the call returns
+_executor = ThreadPoolExecutor(max_workers=12, thread_name_prefix="internal-analysis")
+
+
+def _timed(stage):
+    started = time.perf_counter()
+    result = stage()
+    return result, time.perf_counter() - started
+
+
+def internal_analysis(body, concurrent=True, stage_timeout=STAGE_TIMEOUT):
+    """
+    Run sentiment, topic tagging and priority for `body`.
+
+    With concurrent=True the three stages run at the same time, so the latency
+    is that of the slowest stage instead of the sum. `stage_timeout` is either
+    seconds for every stage or a {stage: seconds} dict; a stage that misses its
+    deadline or fails is reported as None and listed in "timed_out"/"errors",
+    and the other results are still returned. "timings" holds seconds per stage.
+    """
+    # No explicit key: the LLM gateway picks the least-loaded Groq key
+    stages = {
+        "sentiment": lambda: sentiment_analysis(body),
+        "topics": lambda: topic_tags_of_the_concern(body,"groq",None),
+        "priority": lambda: priority_of_the_concern(body,"groq",None),
+    }
+    if not isinstance(stage_timeout, dict):
+        stage_timeout = {name: stage_timeout for name in stages}
+
+    results = {name: None for name in stages}
+    timings = {name: None for name in stages}
+    timed_out = []
+    errors = {}
+
+    started = time.perf_counter()
+    if concurrent:
+        futures = {name: _executor.submit(_timed, stage) for name, stage in stages.items()}
+        for name, future in futures.items():
+            remaining = stage_timeout.get(name, STAGE_TIMEOUT) - (time.perf_counter() - started)
+            try:
+                results[name], timings[name] = future.result(timeout=max(remaining, 0))
+            except FutureTimeoutError:
+                timed_out.append(name)
+            except Exception as e:
+                errors[name] = str(e)
+    else:
+        for name, stage in stages.items():
+            try:
+                results[name], timings[name] = _timed(stage)
+            except Exception as e:
+                errors[name] = str(e)
+    timings["total"] = time.perf_counter() - started
+
+    sentiment = results["sentiment"]
     # print("Sentiment:", sentiment)
-    emoji = emotion_to_emoji(sentiment)
+    emoji = emotion_to_emoji(sentiment) if sentiment else "🤷"
     # print("Emoji:", emoji)
-    groq_api_keys = [os.getenv("GROQ_API_KEY"),os.getenv("GROQ_API_KEY_2")]
-    topics = topic_tags_of_the_concern(body,"groq",random.choice(groq_api_keys))
-    # print("Topics:", topics)
-    priority = priority_of_the_concern(body,"groq",random.choice(groq_api_keys))
-    # print("Priority:", priority)
 
     return {
         "sentiment": sentiment,
         "emoji": emoji,
-        "topics": topics,
-        "priority": priority
+        "topics": results["topics"],
+        "priority": results["priority"],
+        "timings": timings,
+        "timed_out": timed_out,
+        "errors": errors,
     }
 
 internal_analysis("I am very happy with the service provided. The team was prompt and efficient.")
\ No newline at end of file
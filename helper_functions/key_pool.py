@@ -0,0 +1,272 @@
+import time
+import asyncio
+import threading
+
+
+class RateLimitError(Exception):
+    """
+    Raised by a provider when a key is throttled (HTTP 429). `retry_after` is the
+    number of seconds the provider asked us to wait, when it said so.
+    """
+
+    def __init__(self, message="rate limited", retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class InvalidKeyError(Exception):
+    """
+    Raised by a provider when a key is rejected outright (revoked, no permission).
+    """
+
+
+class NoKeyAvailableError(Exception):
+    pass
+
+
+class TokenBucket:
+    """
+    Classic token bucket: holds up to `capacity` tokens and refills at
+    `capacity / period_s` tokens per second.
+    """
+
+    def __init__(self, capacity, period_s=60.0, now=None):
+        self.capacity = float(capacity)
+        self.rate = self.capacity / period_s
+        self.tokens = self.capacity
+        self.updated = now if now is not None else time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def available(self, now=None):
+        self._refill(now if now is not None else time.monotonic())
+        return self.tokens
+
+    def wait_time(self, amount, now=None):
+        """
+        Seconds until `amount` tokens are available (0 if they already are).
+        """
+        amount = min(amount, self.capacity)
+        missing = amount - self.available(now)
+        return 0.0 if missing <= 0 else missing / self.rate
+
+    def consume(self, amount, now=None):
+        self._refill(now if now is not None else time.monotonic())
+        self.tokens -= amount
+
+
+class KeyState:
+    def __init__(self, key, requests_per_minute, tokens_per_minute, now=None):
+        self.key = key
+        self.requests = TokenBucket(requests_per_minute, now=now)
+        self.tokens = TokenBucket(tokens_per_minute, now=now)
+        self.in_flight = 0
+        self.cooldown_until = float("-inf")
+        self.consecutive_rate_limits = 0
+        self.consecutive_failures = 0
+        self.circuit_open_until = float("-inf")
+        self.counters = {"requests": 0, "successes": 0, "rate_limited": 0, "failures": 0}
+
+    def wait_time(self, estimated_tokens, now):
+        blocked_until = max(self.cooldown_until, self.circuit_open_until)
+        return max(blocked_until - now, self.requests.wait_time(1, now), self.tokens.wait_time(estimated_tokens, now))
+
+    @property
+    def label(self):
+        return f"...{self.key[-4:]}" if self.key else "<none>"
+
+
+class KeyPool:
+    """
+    Schedules calls over several API keys of one provider.
+
+    Every key has a request bucket and a token bucket sized to the provider's
+    per-minute limits. acquire() picks, among the keys whose budgets allow the
+    call right now, the one with the fewest calls in flight and the most
+    request budget left; if none can, it waits for the first key to free up.
+    A 429 puts the key in cooldown for the provider's retry-after (or an
+    exponential backoff) and the call goes back to waiting for a key. A key
+    that is rejected or fails `failure_threshold` times in a row is
+    circuit-broken for `circuit_reset_s` seconds. A call gives up with
+    NoKeyAvailableError only when no key can take it within `max_wait_s`.
+
+    `clock` and `sleep` can be replaced, e.g. by a fake clock in tests.
+    """
+
+    def __init__(self, keys, requests_per_minute=30, tokens_per_minute=15000, base_backoff_s=1.0,
+                 failure_threshold=3, circuit_reset_s=60.0, max_wait_s=30.0, clock=time.monotonic, sleep=time.sleep):
+        keys = [key for key in keys if key]
+        if not keys:
+            raise ValueError("KeyPool needs at least one API key")
+        self._clock = clock
+        self._sleep = sleep
+        self.keys = [KeyState(key, requests_per_minute, tokens_per_minute, now=clock()) for key in keys]
+        self.base_backoff_s = base_backoff_s
+        self.failure_threshold = failure_threshold
+        self.circuit_reset_s = circuit_reset_s
+        self.max_wait_s = max_wait_s
+        self._lock = threading.Lock()
+
+    def _try_acquire(self, estimated_tokens):
+        """
+        Returns (KeyState, 0) when a key was reserved, else (None, seconds to wait).
+        """
+        with self._lock:
+            now = self._clock()
+            ready = [state for state in self.keys if state.wait_time(estimated_tokens, now) == 0]
+            if not ready:
+                return None, min(state.wait_time(estimated_tokens, now) for state in self.keys)
+            state = min(ready, key=lambda s: (s.in_flight, -s.requests.available(now)))
+            state.requests.consume(1, now)
+            state.tokens.consume(estimated_tokens, now)
+            state.in_flight += 1
+            state.counters["requests"] += 1
+            return state, 0.0
+
+    def _release(self, state, estimated_tokens, used_tokens=None, error=None, cancelled=False):
+        with self._lock:
+            now = self._clock()
+            state.in_flight -= 1
+            if cancelled:
+                # Neither a success nor the key's fault
+                return
+            if used_tokens is not None:
+                # Settle the estimate against what the provider reported
+                state.tokens.consume(used_tokens - estimated_tokens, now)
+
+            if error is None:
+                state.counters["successes"] += 1
+                state.consecutive_failures = 0
+                state.consecutive_rate_limits = 0
+            elif isinstance(error, RateLimitError):
+                state.counters["rate_limited"] += 1
+                # A missing (or zero) retry-after backs off exponentially, so a key is never hammered
+                backoff = error.retry_after or self.base_backoff_s * (2 ** state.consecutive_rate_limits)
+                state.consecutive_rate_limits += 1
+                state.cooldown_until = now + backoff
+            else:
+                state.counters["failures"] += 1
+                state.consecutive_failures += 1
+                if isinstance(error, InvalidKeyError) or state.consecutive_failures >= self.failure_threshold:
+                    state.circuit_open_until = now + self.circuit_reset_s
+
+    def _deadline(self, max_wait_s):
+        max_wait_s = self.max_wait_s if max_wait_s is None else max_wait_s
+        return self._clock() + max_wait_s, max_wait_s
+
+    def _wait_time_or_raise(self, deadline, max_wait_s, wait, last_error):
+        if self._clock() + wait > deadline:
+            raise NoKeyAvailableError(f"No API key available within {max_wait_s:.1f}s; {self.stats()}") from last_error
+        return wait
+
+    def call(self, fn, estimated_tokens=500, max_wait_s=None):
+        """
+        Run fn(api_key) on the best key. Rate-limited and rejected keys are set
+        aside and the call waits for the next usable one, for at most
+        max_wait_s in total (the pool's own when None). fn may return an object
+        with `prompt_tokens`/`completion_tokens` to settle the token budget.
+        """
+        result, release = self.reserve(fn, estimated_tokens, max_wait_s=max_wait_s)
+        release(used_tokens=_used_tokens(result))
+        return result
+
+    def reserve(self, fn, estimated_tokens=500, max_wait_s=None):
+        """
+        Like call(), but the key stays in flight after fn returns, for work that
+        goes on using it (e.g. a streamed response). Returns (result, release);
+        call release(used_tokens=None, error=None) once that work is over.
+        """
+        deadline, max_wait_s = self._deadline(max_wait_s)
+        last_error = None
+        while True:
+            state, wait = self._try_acquire(estimated_tokens)
+            if state is None:
+                self._sleep(self._wait_time_or_raise(deadline, max_wait_s, wait, last_error))
+                continue
+            try:
+                result = fn(state.key)
+            except (RateLimitError, InvalidKeyError) as e:
+                self._release(state, estimated_tokens, error=e)
+                last_error = e
+                continue
+            except Exception as e:
+                self._release(state, estimated_tokens, error=e)
+                raise
+            except BaseException:
+                self._release(state, estimated_tokens, cancelled=True)
+                raise
+            return result, self._release_once(state, estimated_tokens)
+
+    def _release_once(self, state, estimated_tokens):
+        # Taken by the first release; later ones are no-ops
+        released = threading.Lock()
+
+        def release(used_tokens=None, error=None):
+            if released.acquire(blocking=False):
+                self._release(state, estimated_tokens, used_tokens=used_tokens, error=error)
+
+        return release
+
+    async def acall(self, fn, estimated_tokens=500, max_wait_s=None):
+        """
+        asyncio version of call(); fn(api_key) must return an awaitable.
+        """
+        deadline, max_wait_s = self._deadline(max_wait_s)
+        last_error = None
+        while True:
+            state, wait = self._try_acquire(estimated_tokens)
+            if state is None:
+                await asyncio.sleep(self._wait_time_or_raise(deadline, max_wait_s, wait, last_error))
+                continue
+            try:
+                result = await fn(state.key)
+            except (RateLimitError, InvalidKeyError) as e:
+                self._release(state, estimated_tokens, error=e)
+                last_error = e
+                continue
+            except Exception as e:
+                self._release(state, estimated_tokens, error=e)
+                raise
+            except BaseException:
+                # Cancelled or interrupted: free the slot without blaming the key
+                self._release(state, estimated_tokens, cancelled=True)
+                raise
+            self._release(state, estimated_tokens, used_tokens=_used_tokens(result))
+            return result
+
+    def stats(self):
+        """
+        Per-key utilisation: counters, calls in flight, remaining budgets and
+        whether the key is cooling down or circuit-broken.
+        """
+        with self._lock:
+            now = self._clock()
+            return {
+                state.label: {
+                    **state.counters,
+                    "in_flight": state.in_flight,
+                    "request_budget_left": round(state.requests.available(now), 1),
+                    "token_budget_left": round(state.tokens.available(now)),
+                    "request_utilisation": round(1 - state.requests.available(now) / state.requests.capacity, 2),
+                    "cooling_down": state.cooldown_until > now,
+                    "circuit_open": state.circuit_open_until > now,
+                }
+                for state in self.keys
+            }
+
+
+def _used_tokens(result):
+    prompt_tokens = getattr(result, "prompt_tokens", None)
+    completion_tokens = getattr(result, "completion_tokens", None)
+    if prompt_tokens is None or completion_tokens is None:
+        return None
+    return prompt_tokens + completion_tokens
+
+
+def estimate_tokens(*texts, completion_tokens=256):
+    """
+    Rough pre-call token estimate (~4 characters per token) plus expected completion.
+    """
+    return sum(len(text or "") for text in texts) // 4 + completion_tokens
@@ -0,0 +1,181 @@
+import os
+import re
+import time
+import sqlite3
+import hashlib
+import threading
+import unicodedata
+from dotenv import load_dotenv
+
+load_dotenv()
+
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "llm_cache.db")
+LLM_CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "50000"))
+LLM_CACHE_DISABLED = os.getenv("LLM_CACHE_DISABLED", "0") == "1"
+
+
+def normalise_text(text):
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFKC", text)).strip()
+
+
+def cache_key(provider, model, system_prompt, text):
+    system_prompt_hash = hashlib.sha256(system_prompt.encode("utf-8")).hexdigest()
+    payload = "\x00".join([provider, model, system_prompt_hash, normalise_text(text)])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """
+    Persistent LLM response cache in SQLite, keyed on
+    (provider, model, system prompt hash, normalised prompt text).
+
+    Entries older than `ttl_s` are treated as misses; once the table grows past
+    `max_entries` the least recently used entries are evicted. Hits only note
+    their access time in memory; the notes are written out with the next put()
+    or evict(), so a read never costs a disk write.
+    """
+
+    def __init__(self, path=LLM_CACHE_PATH, ttl_s=LLM_CACHE_TTL_SECONDS, max_entries=LLM_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.ttl_s = ttl_s
+        self.max_entries = max_entries
+        self.counters = {"hits": 0, "misses": 0, "expired": 0, "stores": 0, "evictions": 0}
+        self._counters_lock = threading.Lock()
+        self._local = threading.local()
+        # Guards the pending last_access touches and the write counter
+        self._lock = threading.Lock()
+        self._pending_touches = {}
+        self._writes_since_eviction = 0
+
+        conn = self._connection()
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS llm_cache (
+            key TEXT PRIMARY KEY,
+            provider TEXT,
+            model TEXT,
+            response TEXT,
+            prompt_tokens INTEGER,
+            completion_tokens INTEGER,
+            created_at REAL,
+            last_access REAL
+        )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_last_access ON llm_cache(last_access)")
+        conn.commit()
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _count(self, name, amount=1):
+        with self._counters_lock:
+            self.counters[name] += amount
+
+    def get(self, provider, model, system_prompt, text):
+        """
+        Return (response, prompt_tokens, completion_tokens) or None on a miss.
+        """
+        key = cache_key(provider, model, system_prompt, text)
+        conn = self._connection()
+        row = conn.execute(
+            "SELECT response, prompt_tokens, completion_tokens, created_at FROM llm_cache WHERE key = ?", (key,)
+        ).fetchone()
+        now = time.time()
+        if row is None:
+            self._count("misses")
+            return None
+        if now - row[3] > self.ttl_s:
+            with self._lock:
+                self._pending_touches.pop(key, None)
+            conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+            conn.commit()
+            self._count("expired")
+            self._count("misses")
+            return None
+        with self._lock:
+            self._pending_touches[key] = now
+        self._count("hits")
+        return row[0], row[1], row[2]
+
+    def put(self, provider, model, system_prompt, text, response, prompt_tokens=None, completion_tokens=None):
+        now = time.time()
+        conn = self._connection()
+        self._flush_touches(conn)
+        conn.execute(
+            "INSERT OR REPLACE INTO llm_cache VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (cache_key(provider, model, system_prompt, text), provider, model, response,
+             prompt_tokens, completion_tokens, now, now),
+        )
+        conn.commit()
+        self._count("stores")
+
+        with self._lock:
+            self._writes_since_eviction += 1
+            due = self._writes_since_eviction >= 100
+            if due:
+                self._writes_since_eviction = 0
+        if due:
+            self.evict()
+
+    def _flush_touches(self, conn):
+        """
+        Write the access times noted by get() since the last flush; the caller commits.
+        """
+        with self._lock:
+            touches, self._pending_touches = self._pending_touches, {}
+        if touches:
+            conn.executemany("UPDATE llm_cache SET last_access = ? WHERE key = ?",
+                             [(last_access, key) for key, last_access in touches.items()])
+
+    def evict(self):
+        """
+        Drop expired entries, then the least recently used ones beyond max_entries.
+        """
+        conn = self._connection()
+        self._flush_touches(conn)
+        expired = conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (time.time() - self.ttl_s,)).rowcount
+        overflow = conn.execute(
+            "DELETE FROM llm_cache WHERE key IN (SELECT key FROM llm_cache ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        ).rowcount
+        conn.commit()
+        self._count("evictions", expired + overflow)
+
+    def clear(self):
+        with self._lock:
+            self._pending_touches.clear()
+        conn = self._connection()
+        conn.execute("DELETE FROM llm_cache")
+        conn.commit()
+
+    def stats(self):
+        with self._counters_lock:
+            counters = dict(self.counters)
+        lookups = counters["hits"] + counters["misses"]
+        counters["entries"] = self._connection().execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+        counters["hit_rate"] = round(counters["hits"] / lookups, 3) if lookups else None
+        return counters
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_llm_cache():
+    """
+    The process-wide cache, or None when LLM_CACHE_DISABLED=1.
+    """
+    global _cache
+    if LLM_CACHE_DISABLED:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = LLMCache()
+    return _cache
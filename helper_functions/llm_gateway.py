@@ -0,0 +1,569 @@
+import os
+import json
+import time
+import asyncio
+import threading
+from collections import defaultdict, deque
+from dataclasses import dataclass
+from typing import Optional
+from dotenv import load_dotenv
+from helper_functions.key_pool import KeyPool, RateLimitError, InvalidKeyError, estimate_tokens
+from helper_functions.llm_cache import get_llm_cache
+
+load_dotenv()
+
+DEFAULT_TIMEOUT = float(os.getenv("LLM_TIMEOUT_SECONDS", "30"))
+
+
+@dataclass
+class LLMResponse:
+    text: str
+    provider: str
+    model: str
+    latency_s: float
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+    cached: bool = False
+    # Streamed responses only: time until the first piece of text arrived
+    ttft_s: Optional[float] = None
+
+
+class LLMTimeoutError(TimeoutError):
+    pass
+
+
+class LLMBlockedError(Exception):
+    """
+    The provider refused to answer (blocked prompt, safety stop); the message
+    carries its reason.
+    """
+
+
+class FakeProvider:
+    """
+    Offline stand-in for a real provider, for load tests and air-gapped runs.
+    It sleeps for `latency_s` and answers classification prompts with a valid
+    label, so the dashboard and bot flows work end to end without network.
+
+    With `requests_per_window` set, each API key may only make that many calls
+    per `window_s` seconds; further calls raise RateLimitError with a
+    retry_after, like a throttled real provider. Keys in `invalid_keys` are rejected.
+    """
+
+    model = "fake-llm"
+
+    def __init__(self, latency_s=0.05, responder=None, requests_per_window=None, window_s=60.0, invalid_keys=()):
+        self.latency_s = latency_s
+        self.responder = responder or self.default_responder
+        self.requests_per_window = requests_per_window
+        self.window_s = window_s
+        self.invalid_keys = set(invalid_keys)
+        self._calls = defaultdict(deque)
+        self._lock = threading.Lock()
+
+    def _check_key(self, api_key):
+        if api_key in self.invalid_keys:
+            raise InvalidKeyError(f"fake provider rejected key {api_key}")
+        if self.requests_per_window is None:
+            return
+        with self._lock:
+            now = time.monotonic()
+            calls = self._calls[api_key]
+            while calls and now - calls[0] >= self.window_s:
+                calls.popleft()
+            if len(calls) >= self.requests_per_window:
+                raise RateLimitError(f"fake provider throttled key {api_key}", retry_after=self.window_s - (now - calls[0]))
+            calls.append(now)
+
+    @staticmethod
+    def default_responder(prompt, system_prompt):
+        if "JSON array" in system_prompt:
+            tickets = json.loads(prompt)
+            return json.dumps([{"id": ticket["id"], "topic": "How-to", "priority": "Medium_Priority"} for ticket in tickets])
+        if "High_Priority" in system_prompt:
+            return "Medium_Priority"
+        if "Topic Tag" in system_prompt:
+            return "How-to"
+        return f"[fake answer] {prompt[:200]}"
+
+    def _response(self, prompt, system_prompt, started):
+        text = self.responder(prompt, system_prompt)
+        return LLMResponse(
+            text=text,
+            provider="fake",
+            model=self.model,
+            latency_s=time.perf_counter() - started,
+            prompt_tokens=len(system_prompt.split()) + len(prompt.split()),
+            completion_tokens=len(text.split()),
+        )
+
+    def generate(self, prompt, system_prompt, api_key=None, model=None, timeout=None):
+        started = time.perf_counter()
+        self._check_key(api_key)
+        if timeout is not None and self.latency_s > timeout:
+            time.sleep(timeout)
+            raise LLMTimeoutError(f"fake provider timed out after {timeout}s")
+        time.sleep(self.latency_s)
+        return self._response(prompt, system_prompt, started)
+
+    async def agenerate(self, prompt, system_prompt, api_key=None, model=None, timeout=None):
+        started = time.perf_counter()
+        self._check_key(api_key)
+        if timeout is not None and self.latency_s > timeout:
+            await asyncio.sleep(timeout)
+            raise LLMTimeoutError(f"fake provider timed out after {timeout}s")
+        await asyncio.sleep(self.latency_s)
+        return self._response(prompt, system_prompt, started)
+
+    def stream(self, prompt, system_prompt, api_key=None, model=None, timeout=None):
+        """
+        The answer word by word: `latency_s` before the first word, then the
+        same again spread over the rest.
+        """
+        self._check_key(api_key)
+        words = self.responder(prompt, system_prompt).split(" ")
+
+        def pieces():
+            time.sleep(self.latency_s)
+            for i, word in enumerate(words):
+                if i:
+                    time.sleep(self.latency_s / len(words))
+                yield (" " if i else "") + word, None
+            yield "", (len(system_prompt.split()) + len(prompt.split()), len(words))
+
+        return pieces()
+
+
+def _retry_after(error):
+    response = getattr(error, "response", None)
+    value = response.headers.get("retry-after") if response is not None else None
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+class GroqProvider:
+    @staticmethod
+    def _translate(error):
+        import groq
+        if isinstance(error, groq.RateLimitError):
+            return RateLimitError(str(error), retry_after=_retry_after(error))
+        if isinstance(error, (groq.AuthenticationError, groq.PermissionDeniedError)):
+            return InvalidKeyError(str(error))
+        return None
+
+    @property
+    def model(self):
+        from helper_functions.llm_groq import GROQ_MODEL
+        return GROQ_MODEL
+
+    @staticmethod
+    def _response(completion, model, started):
+        usage = getattr(completion, "usage", None)
+        return LLMResponse(
+            text=completion.choices[0].message.content,
+            provider="groq",
+            model=model,
+            latency_s=time.perf_counter() - started,
+            prompt_tokens=getattr(usage, "prompt_tokens", None),
+            completion_tokens=getattr(usage, "completion_tokens", None),
+        )
+
+    def generate(self, prompt, system_prompt, api_key=None, model=None, timeout=None):
+        from helper_functions.llm_groq import groq_completion
+        model = model or self.model
+        started = time.perf_counter()
+        try:
+            completion = groq_completion(prompt, system_prompt, api_key or os.getenv("GROQ_API_KEY"), model=model, timeout=timeout)
+        except Exception as e:
+            raise (self._translate(e) or e) from e
+        return self._response(completion, model, started)
+
+    def stream(self, prompt, system_prompt, api_key=None, model=None, timeout=None):
+        from helper_functions.llm_groq import groq_completion_stream
+        try:
+            chunks = groq_completion_stream(prompt, system_prompt, api_key or os.getenv("GROQ_API_KEY"), model=model or self.model, timeout=timeout)
+        except Exception as e:
+            raise (self._translate(e) or e) from e
+
+        def pieces():
+            for chunk in chunks:
+                # Groq reports usage on the last chunk under x_groq
+                usage = getattr(getattr(chunk, "x_groq", None), "usage", None)
+                text = chunk.choices[0].delta.content if chunk.choices else None
+                yield text or "", (usage.prompt_tokens, usage.completion_tokens) if usage else None
+
+        return pieces()
+
+    async def agenerate(self, prompt, system_prompt, api_key=None, model=None, timeout=None):
+        from helper_functions.llm_groq import groq_completion_async
+        model = model or self.model
+        started = time.perf_counter()
+        try:
+            completion = await groq_completion_async(prompt, system_prompt, api_key or os.getenv("GROQ_API_KEY"), model=model, timeout=timeout)
+        except Exception as e:
+            raise (self._translate(e) or e) from e
+        return self._response(completion, model, started)
+
+
+def _gemini_block_reason(response):
+    """
+    Why Gemini returned no text, or None for a normal finish.
+    """
+    feedback = getattr(response, "prompt_feedback", None)
+    if feedback is not None and getattr(feedback, "block_reason", None):
+        return f"prompt blocked ({getattr(feedback.block_reason, 'name', feedback.block_reason)})"
+    for candidate in getattr(response, "candidates", None) or []:
+        finish_reason = getattr(candidate.finish_reason, "name", str(candidate.finish_reason))
+        if finish_reason not in ("STOP", "MAX_TOKENS", "FINISH_REASON_UNSPECIFIED"):
+            return f"finish reason {finish_reason}"
+    return None
+
+
+class GeminiProvider:
+    @staticmethod
+    def _translate(error):
+        from google.api_core import exceptions
+        if isinstance(error, exceptions.ResourceExhausted):
+            return RateLimitError(str(error))
+        if isinstance(error, (exceptions.Unauthenticated, exceptions.PermissionDenied)):
+            return InvalidKeyError(str(error))
+        return None
+
+    @property
+    def model(self):
+        from helper_functions.llm_gemini import GEMINI_MODEL
+        return GEMINI_MODEL
+
+    @staticmethod
+    def _response(response, model, started):
+        usage = getattr(response, "usage_metadata", None)
+        return LLMResponse(
+            text=response.text,
+            provider="gemini",
+            model=model,
+            latency_s=time.perf_counter() - started,
+            prompt_tokens=getattr(usage, "prompt_token_count", None),
+            completion_tokens=getattr(usage, "candidates_token_count", None),
+        )
+
+    def generate(self, prompt, system_prompt, api_key=None, model=None, timeout=None):
+        from helper_functions.llm_gemini import gemini_completion
+        model = model or self.model
+        started = time.perf_counter()
+        try:
+            response = gemini_completion(prompt, system_prompt, api_key, model_name=model, timeout=timeout)
+        except Exception as e:
+            raise (self._translate(e) or e) from e
+        return self._response(response, model, started)
+
+    def stream(self, prompt, system_prompt, api_key=None, model=None, timeout=None):
+        from helper_functions.llm_gemini import gemini_completion_stream
+        try:
+            chunks = gemini_completion_stream(prompt, system_prompt, api_key, model_name=model or self.model, timeout=timeout)
+        except Exception as e:
+            raise (self._translate(e) or e) from e
+
+        def pieces():
+            for chunk in chunks:
+                try:
+                    text = chunk.text
+                except ValueError:
+                    # No text parts: fine for a last chunk carrying only the finish reason,
+                    # but a blocked prompt or safety stop must not end as an empty answer
+                    reason = _gemini_block_reason(chunk)
+                    if reason is not None:
+                        raise LLMBlockedError(f"Gemini stopped the answer: {reason}")
+                    text = ""
+                usage = getattr(chunk, "usage_metadata", None)
+                yield text, (usage.prompt_token_count, usage.candidates_token_count) if usage else None
+
+        return pieces()
+
+    async def agenerate(self, prompt, system_prompt, api_key=None, model=None, timeout=None):
+        from helper_functions.llm_gemini import gemini_completion_async
+        model = model or self.model
+        started = time.perf_counter()
+        try:
+            response = await gemini_completion_async(prompt, system_prompt, api_key, model_name=model, timeout=timeout)
+        except Exception as e:
+            raise (self._translate(e) or e) from e
+        return self._response(response, model, started)
+
+
+PROVIDERS = {
+    "groq": GroqProvider(),
+    "gemini": GeminiProvider(),
+    "fake": FakeProvider(latency_s=float(os.getenv("FAKE_LLM_LATENCY_SECONDS", "0.05"))),
+}
+
+
+# Keys and per-key per-minute limits of the providers scheduled through a KeyPool
+KEY_POOL_SETTINGS = {
+    "groq": (("GROQ_API_KEY", "GROQ_API_KEY_2"), "GROQ_REQUESTS_PER_MINUTE", "30", "GROQ_TOKENS_PER_MINUTE", "15000"),
+    "gemini": (("GEMINI_API_KEY",), "GEMINI_REQUESTS_PER_MINUTE", "10", "GEMINI_TOKENS_PER_MINUTE", "250000"),
+}
+
+_key_pools = {}
+_key_pools_lock = threading.Lock()
+
+
+def register_provider(name, provider):
+    """
+    Add or replace a provider, e.g. a FakeProvider with custom latency for a load test.
+    """
+    PROVIDERS[name] = provider
+
+
+def register_key_pool(provider, pool):
+    """
+    Schedule calls to `provider` that do not pass an explicit api_key over `pool`.
+    """
+    with _key_pools_lock:
+        _key_pools[provider] = pool
+
+
+def get_key_pool(provider):
+    """
+    Return the KeyPool for `provider`, built from the environment on first use,
+    or None when the provider has no keys configured.
+    """
+    with _key_pools_lock:
+        if provider not in _key_pools and provider in KEY_POOL_SETTINGS:
+            key_names, rpm_name, rpm_default, tpm_name, tpm_default = KEY_POOL_SETTINGS[provider]
+            keys = [os.getenv(name) for name in key_names if os.getenv(name)]
+            _key_pools[provider] = KeyPool(
+                keys,
+                requests_per_minute=float(os.getenv(rpm_name, rpm_default)),
+                tokens_per_minute=float(os.getenv(tpm_name, tpm_default)),
+            ) if keys else None
+        return _key_pools.get(provider)
+
+
+def key_pool_stats():
+    """
+    Utilisation of every key pool in use, keyed by provider.
+    """
+    with _key_pools_lock:
+        pools = dict(_key_pools)
+    return {provider: pool.stats() for provider, pool in pools.items() if pool is not None}
+
+
+def _provider(provider):
+    if provider not in PROVIDERS:
+        raise ValueError(f"Unknown LLM provider '{provider}', expected one of {sorted(PROVIDERS)}")
+    return PROVIDERS[provider]
+
+
+def generate(provider, prompt, system_prompt, api_key=None, model=None, timeout=DEFAULT_TIMEOUT,
+             cache=False, cache_validator=None, deadline=None) -> LLMResponse:
+    """
+    Run one completion on `provider` ("groq", "gemini", "fake", ...) through its
+    long-lived pooled client. Without an explicit api_key the call is scheduled
+    over the provider's KeyPool, which retries on rate limits.
+
+    With cache=True the answer is served from / stored in the persistent LLM
+    cache; `cache_validator(text)` can veto storing answers that are unusable.
+
+    `deadline` (a time.monotonic() value) bounds the whole call: the wait for a
+    pooled key and the request timeout both shrink to what is left of it.
+    """
+    backend = _provider(provider)
+    model = model or backend.model
+
+    llm_cache = get_llm_cache() if cache else None
+    if llm_cache is not None:
+        started = time.perf_counter()
+        hit = llm_cache.get(provider, model, system_prompt, prompt)
+        if hit is not None:
+            text, prompt_tokens, completion_tokens = hit
+            return LLMResponse(text, provider, model, time.perf_counter() - started, prompt_tokens, completion_tokens, cached=True)
+
+    def call(key):
+        call_timeout = timeout
+        if deadline is not None:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise LLMTimeoutError(f"{provider} call ran out of its time budget before it started")
+            call_timeout = remaining if call_timeout is None else min(call_timeout, remaining)
+        return backend.generate(prompt, system_prompt, api_key=key, model=model, timeout=call_timeout)
+
+    pool = get_key_pool(provider) if api_key is None else None
+    if pool is None:
+        response = call(api_key)
+    else:
+        max_wait_s = None if deadline is None else max(0.0, deadline - time.monotonic())
+        response = pool.call(call, estimated_tokens=estimate_tokens(system_prompt, prompt), max_wait_s=max_wait_s)
+
+    if llm_cache is not None and (cache_validator is None or cache_validator(response.text)):
+        llm_cache.put(provider, model, system_prompt, prompt, response.text, response.prompt_tokens, response.completion_tokens)
+    return response
+
+
+class LLMStream:
+    """
+    Iterator over the text of a streamed completion, piece by piece as the
+    provider sends it. Once it is exhausted, `response` is the complete
+    LLMResponse: latency_s is the total time, ttft_s the time to the first text.
+    If the stream fails, `response` stays None and `error` is set.
+
+    `release`, from KeyPool.reserve, is called once the stream is over, so the
+    key counts as in flight until then and is charged the reported tokens.
+    """
+
+    def __init__(self, pieces, provider, model, started, on_complete=None, cached=False, release=None):
+        self._pieces = pieces
+        self._release = release
+        self.error = None
+        self.provider = provider
+        self.model = model
+        self.started = started
+        self._callbacks = [on_complete] if on_complete is not None else []
+        self.cached = cached
+        self.response = None
+
+    def add_done_callback(self, fn):
+        """
+        Call fn(response) once the stream has been consumed.
+        """
+        self._callbacks.append(fn)
+
+    def _settle(self, used_tokens=None, error=None):
+        if self._release is not None:
+            self._release(used_tokens=used_tokens, error=error)
+
+    def __del__(self):
+        # A stream that was never consumed still gives its key back
+        self._settle()
+
+    def __iter__(self):
+        parts = []
+        ttft_s = None
+        prompt_tokens = completion_tokens = None
+        try:
+            for text, usage in self._pieces:
+                if usage is not None:
+                    prompt_tokens, completion_tokens = usage
+                if text:
+                    if ttft_s is None:
+                        ttft_s = time.perf_counter() - self.started
+                    parts.append(text)
+                    yield text
+        except LLMBlockedError as e:
+            # Refused content is not a fault of the key
+            self.error = e
+            self._settle()
+            raise
+        except BaseException as e:
+            # GeneratorExit (the reader stopped early) is not a failure either
+            self.error = e
+            self._settle(error=e if isinstance(e, Exception) else None)
+            raise
+        self.response = LLMResponse("".join(parts), self.provider, self.model, time.perf_counter() - self.started,
+                                    prompt_tokens, completion_tokens, cached=self.cached, ttft_s=ttft_s)
+        self._settle(used_tokens=prompt_tokens + completion_tokens if None not in (prompt_tokens, completion_tokens) else None)
+        for fn in self._callbacks:
+            fn(self.response)
+
+
+def stream_generate(provider, prompt, system_prompt, api_key=None, model=None, timeout=DEFAULT_TIMEOUT,
+                    cache=False) -> LLMStream:
+    """
+    Streaming version of generate(). The request is made, on a key from the
+    provider's KeyPool, before this returns, so rate limits and rejected keys
+    are retried as usual; iterate the LLMStream for the text. The key stays
+    reserved until the stream is over. A cached answer is replayed as a single
+    piece; with cache=True a completed, non-empty stream is stored.
+    """
+    backend = _provider(provider)
+    model = model or backend.model
+    started = time.perf_counter()
+
+    llm_cache = get_llm_cache() if cache else None
+    if llm_cache is not None:
+        hit = llm_cache.get(provider, model, system_prompt, prompt)
+        if hit is not None:
+            text, prompt_tokens, completion_tokens = hit
+            return LLMStream(iter([(text, (prompt_tokens, completion_tokens))]), provider, model, started, cached=True)
+
+    def on_complete(response):
+        if llm_cache is not None and response.text:
+            llm_cache.put(provider, model, system_prompt, prompt, response.text, response.prompt_tokens, response.completion_tokens)
+
+    pool = get_key_pool(provider) if api_key is None else None
+    if pool is None:
+        pieces, release = backend.stream(prompt, system_prompt, api_key=api_key, model=model, timeout=timeout), None
+    else:
+        pieces, release = pool.reserve(
+            lambda key: backend.stream(prompt, system_prompt, api_key=key, model=model, timeout=timeout),
+            estimated_tokens=estimate_tokens(system_prompt, prompt),
+        )
+    return LLMStream(pieces, provider, model, started, on_complete=on_complete, release=release)
+
+
+async def agenerate(provider, prompt, system_prompt, api_key=None, model=None, timeout=DEFAULT_TIMEOUT) -> LLMResponse:
+    """
+    asyncio version of generate(); the deadline covers each attempt.
+    """
+    backend = _provider(provider)
+
+    async def attempt(key):
+        try:
+            return await asyncio.wait_for(
+                backend.agenerate(prompt, system_prompt, api_key=key, model=model, timeout=timeout),
+                timeout=timeout,
+            )
+        except asyncio.TimeoutError as e:
+            raise LLMTimeoutError(f"{provider} did not answer within {timeout}s") from e
+
+    pool = get_key_pool(provider) if api_key is None else None
+    if pool is None:
+        return await attempt(api_key)
+    return await pool.acall(attempt, estimated_tokens=estimate_tokens(system_prompt, prompt))
+
+
+def load_test(provider="fake", requests=200, concurrency=20, prompt="It is urgent, our pipeline is down.",
+              system_prompt="You are a helpful assistant."):
+    """
+    Fire `requests` async calls with at most `concurrency` in flight and report
+    throughput and latency percentiles.
+    """
+    async def run():
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def one():
+            async with semaphore:
+                return await agenerate(provider, prompt, system_prompt)
+
+        started = time.perf_counter()
+        responses = await asyncio.gather(*(one() for _ in range(requests)), return_exceptions=True)
+        return responses, time.perf_counter() - started
+
+    responses, elapsed = asyncio.run(run())
+    if get_key_pool(provider) is not None:
+        print(get_key_pool(provider).stats())
+    latencies = sorted(r.latency_s for r in responses if isinstance(r, LLMResponse))
+    errors = sum(1 for r in responses if not isinstance(r, LLMResponse))
+    report = {
+        "requests": requests,
+        "errors": errors,
+        "requests_per_sec": round(requests / elapsed, 1),
+        "p50_latency_s": round(latencies[len(latencies) // 2], 3) if latencies else None,
+        "p99_latency_s": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))], 3) if latencies else None,
+    }
+    print(report)
+    return report
+
+
+if __name__ == "__main__":
+    import sys
+
+    provider = sys.argv[1] if len(sys.argv) > 1 else "fake"
+    if provider == "fake":
+        # Two keys of 20 requests per 2 seconds each, the second one dead: exercises
+        # least-loaded selection, 429 backoff and circuit breaking offline.
+        register_provider("fake", FakeProvider(latency_s=0.05, requests_per_window=20, window_s=2.0, invalid_keys={"fake-key-dead"}))
+        register_key_pool("fake", KeyPool(["fake-key-1", "fake-key-2", "fake-key-dead"], requests_per_minute=600,
+                                          tokens_per_minute=10**6, max_wait_s=60))
+    load_test(provider=provider)
@@ -1,20 +1,47 @@
 import google.generativeai as genai
 import os
+import threading
 from dotenv import load_dotenv
 
 load_dotenv()
 
-def gemini_response(prompt: str, SYSTEM_PROMPT: str) -> str:
-        
-    genai.configure(api_key=os.environ["GEMINI_API_KEY"])
+GEMINI_MODEL = "gemini-2.5-flash"
+
+# genai keeps one process-wide client per configured key; configure it once and
+# only again when a different key is used, so the transport is reused between calls.
+_configured_key = None
+_configure_lock = threading.Lock()
 
-    model = genai.GenerativeModel(
-        model_name="gemini-2.5-flash",
+def _configure(api_key: str):
+    global _configured_key
+    if _configured_key != api_key:
+        with _configure_lock:
+            if _configured_key != api_key:
+                genai.configure(api_key=api_key)
+                _configured_key = api_key
+
+def get_gemini_model(SYSTEM_PROMPT: str, api_key: str = None, model_name: str = GEMINI_MODEL):
+    # GenerativeModel is a lightweight wrapper around the shared client, cheap to build per prompt
+    _configure(api_key or os.environ["GEMINI_API_KEY"])
+    return genai.GenerativeModel(
+        model_name=model_name,
         system_instruction=SYSTEM_PROMPT
     )
 
-    response = model.generate_content(prompt)
-    # print(response.text)
-    return response.text
+def gemini_completion(prompt: str, SYSTEM_PROMPT: str, api_key: str = None, model_name: str = GEMINI_MODEL, timeout: float = None):
+    model = get_gemini_model(SYSTEM_PROMPT, api_key, model_name)
+    return model.generate_content(prompt, request_options={"timeout": timeout} if timeout else None)
+
+async def gemini_completion_async(prompt: str, SYSTEM_PROMPT: str, api_key: str = None, model_name: str = GEMINI_MODEL, timeout: float = None):
+    model = get_gemini_model(SYSTEM_PROMPT, api_key, model_name)
+    return await model.generate_content_async(prompt, request_options={"timeout": timeout} if timeout else None)
+
+def gemini_completion_stream(prompt: str, SYSTEM_PROMPT: str, api_key: str = None, model_name: str = GEMINI_MODEL, timeout: float = None):
+    model = get_gemini_model(SYSTEM_PROMPT, api_key, model_name)
+    return model.generate_content(prompt, stream=True, request_options={"timeout": timeout} if timeout else None)
+
+def gemini_response(prompt: str, SYSTEM_PROMPT: str) -> str:
+    from helper_functions.llm_gateway import generate
+    return generate("gemini", prompt, SYSTEM_PROMPT).text
 
 # gemini_response("It is urgent .")
\ No newline at end of file
@@ -1,31 +1,77 @@
 import os
-from groq import Groq
+import asyncio
+import weakref
+import threading
+from groq import Groq, AsyncGroq
 from dotenv import load_dotenv
 load_dotenv()
 
-def groq_response(prompt: str, SYSTEM_PROMPT: str, groq_api_key: str) -> str:
+GROQ_MODEL = "gemma2-9b-it"
+
+# One long-lived client per (api key, sync/async): the HTTP connection pool and
+# TLS sessions are reused across calls instead of being rebuilt for every ticket.
+_clients = {}
+# Async clients are bound to the event loop they were created on: kept per loop
+# object, and dropped with it, so a later asyncio.run never gets a closed loop's client
+_async_clients = weakref.WeakKeyDictionary()
+_clients_lock = threading.Lock()
 
+def get_groq_client(groq_api_key: str, asynchronous: bool = False):
+    clients = _clients
+    if asynchronous:
+        loop = asyncio.get_running_loop()
+        clients = _async_clients.get(loop)
+        if clients is None:
+            with _clients_lock:
+                clients = _async_clients.setdefault(loop, {})
+    client = clients.get(groq_api_key)
+    if client is None:
+        with _clients_lock:
+            client = clients.get(groq_api_key)
+            if client is None:
+                client = (AsyncGroq if asynchronous else Groq)(api_key=groq_api_key)
+                clients[groq_api_key] = client
+    return client
 
-    
-    client = Groq(
-        api_key=groq_api_key,
+def _messages(prompt: str, SYSTEM_PROMPT: str):
+    return [
+        {
+            "role": "system",
+            "content": SYSTEM_PROMPT
+        },
+        {
+            "role": "user",
+            "content": prompt,
+        }
+    ]
+
+def groq_completion(prompt: str, SYSTEM_PROMPT: str, groq_api_key: str, model: str = GROQ_MODEL, timeout: float = None):
+    return get_groq_client(groq_api_key).chat.completions.create(
+        messages=_messages(prompt, SYSTEM_PROMPT),
+        model=model,
+        stream=False,
+        timeout=timeout,
     )
 
-    chat_completion = client.chat.completions.create(
-        messages=[
-            {
-                "role": "system",
-                "content": SYSTEM_PROMPT
-            },
-            {
-                "role": "user",
-                "content": prompt,
-            }
-        ],
-        model="gemma2-9b-it", 
+async def groq_completion_async(prompt: str, SYSTEM_PROMPT: str, groq_api_key: str, model: str = GROQ_MODEL, timeout: float = None):
+    return await get_groq_client(groq_api_key, asynchronous=True).chat.completions.create(
+        messages=_messages(prompt, SYSTEM_PROMPT),
+        model=model,
         stream=False,
+        timeout=timeout,
     )
 
-    return chat_completion.choices[0].message.content
+def groq_completion_stream(prompt: str, SYSTEM_PROMPT: str, groq_api_key: str, model: str = GROQ_MODEL, timeout: float = None):
+    # Returns once the response has started; iterate it for the chunks as they arrive
+    return get_groq_client(groq_api_key).chat.completions.create(
+        messages=_messages(prompt, SYSTEM_PROMPT),
+        model=model,
+        stream=True,
+        timeout=timeout,
+    )
+
+def groq_response(prompt: str, SYSTEM_PROMPT: str, groq_api_key: str) -> str:
+    from helper_functions.llm_gateway import generate
+    return generate("groq", prompt, SYSTEM_PROMPT, api_key=groq_api_key).text
 
 # print(groq_response("Who are you?", "You are a helpful assistant.", os.environ.get("GROQ_API_KEY")))
\ No newline at end of file
@@ -0,0 +1,147 @@
+import os
+import json
+import time
+import numpy as np
+from functools import lru_cache
+from dotenv import load_dotenv
+from helper_functions.vector_store import VectorStore, vector_store_exists
+
+load_dotenv()
+
+PINECONE_DATA_PATH = "./preprocessed_data/pinecone_db_data.json"
+
+# exact | ivf | hnsw
+LOCAL_INDEX_MODE = os.getenv("LOCAL_INDEX_MODE", "exact")
+IVF_NPROBE = int(os.getenv("LOCAL_INDEX_NPROBE", "8"))
+
+
+def _normalize(matrix):
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return matrix / np.clip(norms, 1e-12, None)
+
+
+class LocalVectorIndex:
+    """
+    In-process cosine-similarity index over the records produced by
+    docs_preprocessing_for_pinecone.pinecone_data_setup.
+
+    `query` mirrors Pinecone's Index.query and returns {"matches": [...]} where
+    every match has id, score, metadata and (optionally) values, so it can be
+    used wherever a Pinecone index is.
+
+    mode="exact" scans one contiguous float32 matrix. mode="ivf" clusters the
+    vectors with k-means and only scans the `nprobe` closest clusters.
+    mode="hnsw" uses an hnswlib graph (optional dependency).
+    """
+
+    def __init__(self, ids, vectors, metadata, mode="exact", nlist=None, nprobe=IVF_NPROBE, normalized=False):
+        self.ids = list(ids)
+        self.metadata = metadata
+        if normalized and isinstance(vectors, np.ndarray) and vectors.dtype == np.float32 and vectors.flags.c_contiguous:
+            # Already unit-length (e.g. a memory-mapped vector store): use it without copying.
+            self.vectors = vectors
+        else:
+            self.vectors = np.ascontiguousarray(_normalize(np.asarray(vectors, dtype=np.float32)))
+        self.mode = mode
+        self.nprobe = nprobe
+
+        if mode == "ivf":
+            self._build_ivf(nlist or max(1, int(np.sqrt(len(self.ids)))))
+        elif mode == "hnsw":
+            self._build_hnsw()
+        elif mode != "exact":
+            raise ValueError(f"Unknown local index mode '{mode}', expected exact, ivf or hnsw")
+
+    @classmethod
+    def from_records(cls, records, **kwargs):
+        return cls(
+            [record["id"] for record in records],
+            [record["values"] for record in records],
+            [record["metadata"] for record in records],
+            **kwargs,
+        )
+
+    @classmethod
+    def from_store(cls, store, **kwargs):
+        """
+        Build the index on top of a memory-mapped helper_functions.vector_store.VectorStore.
+        """
+        return cls(store.ids, store.vectors, store.metadata, normalized=True, **kwargs)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _build_ivf(self, nlist, iterations=10, seed=0):
+        rng = np.random.default_rng(seed)
+        nlist = min(nlist, len(self.ids))
+        centroids = self.vectors[rng.choice(len(self.ids), size=nlist, replace=False)]
+        for _ in range(iterations):
+            assignments = np.argmax(self.vectors @ centroids.T, axis=1)
+            for c in range(nlist):
+                members = self.vectors[assignments == c]
+                if len(members):
+                    centroids[c] = members.mean(axis=0)
+            centroids = _normalize(centroids)
+        self.centroids = np.ascontiguousarray(centroids, dtype=np.float32)
+        assignments = np.argmax(self.vectors @ self.centroids.T, axis=1)
+        self.inverted_lists = [np.flatnonzero(assignments == c) for c in range(nlist)]
+
+    def _build_hnsw(self, ef_construction=200, m=16):
+        import hnswlib
+
+        self.hnsw = hnswlib.Index(space="ip", dim=self.vectors.shape[1])
+        self.hnsw.init_index(max_elements=len(self.ids), ef_construction=ef_construction, M=m)
+        self.hnsw.add_items(self.vectors, np.arange(len(self.ids)))
+
+    def _search(self, query, top_k):
+        if self.mode == "hnsw":
+            self.hnsw.set_ef(max(50, top_k))
+            labels, distances = self.hnsw.knn_query(query, k=min(top_k, len(self.ids)))
+            return labels[0], 1.0 - distances[0]
+
+        if self.mode == "ivf":
+            probes = np.argsort(-(self.centroids @ query))[:self.nprobe]
+            candidates = np.concatenate([self.inverted_lists[c] for c in probes])
+        else:
+            candidates = None
+
+        matrix = self.vectors if candidates is None else self.vectors[candidates]
+        scores = matrix @ query
+        k = min(top_k, len(scores))
+        if k == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        rows = top if candidates is None else candidates[top]
+        return rows, scores[top]
+
+    def query(self, vector, top_k=10, include_values=False, include_metadata=True):
+        query = _normalize(np.asarray(vector, dtype=np.float32).reshape(-1))
+        rows, scores = self._search(query, top_k)
+
+        matches = []
+        for row, score in zip(rows, scores):
+            match = {"id": self.ids[row], "score": float(score)}
+            if include_values:
+                match["values"] = self.vectors[row].tolist()
+            if include_metadata:
+                match["metadata"] = self.metadata[row]
+            matches.append(match)
+        return {"matches": matches}
+
+
+@lru_cache(maxsize=None)
+def load_local_index(path=PINECONE_DATA_PATH, mode=LOCAL_INDEX_MODE):
+    """
+    Build the local index once per process, from the memory-mapped vector store
+    when it exists and from the Pinecone-format JSON records otherwise.
+    """
+    t1 = time.perf_counter()
+    if vector_store_exists():
+        index = LocalVectorIndex.from_store(VectorStore(), mode=mode)
+    else:
+        with open(path, "r", encoding="utf-8") as f:
+            records = json.load(f)
+        index = LocalVectorIndex.from_records(records, mode=mode)
+    print(f"Loaded local '{mode}' index with {len(index)} vectors in {time.perf_counter() - t1:.2f} seconds")
+    return index
@@ -0,0 +1,157 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from dotenv import load_dotenv
+
+load_dotenv()
+
+MODEL_BASE_DIRECTORY = "./model"
+CHECKSUM_FILE_NAME = "checksums.json"
+
+# Local artifacts are the only source unless this flag is set explicitly.
+ALLOW_HUB_DOWNLOAD = os.getenv("MODEL_ALLOW_HUB_DOWNLOAD", "0") == "1"
+
+
+def _process_start_time():
+    """
+    (start time, what it measures from): the process start via psutil, else
+    the import of this module, which is all that can be measured without it.
+    """
+    try:
+        import psutil
+        return psutil.Process(os.getpid()).create_time(), "process start"
+    except ImportError:
+        return time.time(), "model_loader import (install psutil for process start)"
+
+
+PROCESS_START_TIME, PROCESS_START_LABEL = _process_start_time()
+
+_loaded_models = {}
+_model_locks = {}
+_registry_lock = threading.Lock()
+_reported_first_results = set()
+
+
+def _file_sha256(path, block_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def compute_checksums(directory):
+    """
+    Return {relative_path: sha256} for every file of a model artifact directory.
+    """
+    checksums = {}
+    for root, _, files in os.walk(directory):
+        for file_name in files:
+            path = os.path.join(root, file_name)
+            relative_path = os.path.relpath(path, directory).replace(os.sep, "/")
+            if relative_path == CHECKSUM_FILE_NAME:
+                continue
+            checksums[relative_path] = _file_sha256(path)
+    return dict(sorted(checksums.items()))
+
+
+def write_checksums(directory):
+    checksums = compute_checksums(directory)
+    with open(os.path.join(directory, CHECKSUM_FILE_NAME), "w", encoding="utf-8") as f:
+        json.dump(checksums, f, indent=2)
+    return checksums
+
+
+def verify_checksums(directory):
+    """
+    Return (ok, reason) for the artifact in `directory` against its checksums.json.
+    """
+    checksum_path = os.path.join(directory, CHECKSUM_FILE_NAME)
+    if not os.path.isfile(checksum_path):
+        return False, f"no {CHECKSUM_FILE_NAME} in {directory}"
+
+    with open(checksum_path, "r", encoding="utf-8") as f:
+        expected = json.load(f)
+
+    if not expected:
+        return False, f"{checksum_path} lists no files"
+
+    for relative_path, expected_sha in expected.items():
+        path = os.path.join(directory, relative_path)
+        if not os.path.isfile(path):
+            return False, f"missing file {relative_path}"
+        if _file_sha256(path) != expected_sha:
+            return False, f"checksum mismatch for {relative_path}"
+    return True, "ok"
+
+
+def load_model(name, local_directory, load_local, download=None, hint=None):
+    """
+    Load a model at most once per process, offline-first.
+
+    `load_local(directory)` builds the model from the local artifact, which must
+    pass checksum verification. `download(directory)` fetches the model from the
+    Hugging Face Hub and saves it into `directory`; it is only called when
+    MODEL_ALLOW_HUB_DOWNLOAD=1, after which the artifact is checksummed.
+    Artifacts that are built locally rather than downloaded pass download=None
+    and a `hint` telling the user how to build them.
+    """
+    if name in _loaded_models:
+        return _loaded_models[name]
+
+    with _registry_lock:
+        lock = _model_locks.setdefault(name, threading.Lock())
+
+    with lock:
+        if name in _loaded_models:
+            return _loaded_models[name]
+
+        t1 = time.perf_counter()
+        ok, reason = verify_checksums(local_directory)
+        if not ok:
+            if download is None:
+                raise RuntimeError(f"Local artifact for model '{name}' is not usable ({reason}). {hint or ''}".strip())
+            if not ALLOW_HUB_DOWNLOAD:
+                raise RuntimeError(
+                    f"Local artifact for model '{name}' is not usable ({reason}). "
+                    f"Set MODEL_ALLOW_HUB_DOWNLOAD=1 to fetch it from the Hugging Face Hub once, "
+                    f"or run `python -m helper_functions.model_loader seal {local_directory}` "
+                    f"to checksum an artifact you already trust."
+                )
+            print(f"Downloading model '{name}' from the Hugging Face Hub ({reason})")
+            os.makedirs(local_directory, exist_ok=True)
+            download(local_directory)
+            write_checksums(local_directory)
+
+        model = load_local(local_directory)
+        _loaded_models[name] = model
+        print(f"Loaded model '{name}' from {local_directory} in {time.perf_counter() - t1:.2f} seconds")
+        return model
+
+
+def report_time_to_first_result(name):
+    """
+    Print the time from process start (or, without psutil, from this module's
+    import) to the first result of `name`, once per process.
+    """
+    if name in _reported_first_results:
+        return
+    _reported_first_results.add(name)
+    print(f"Time from {PROCESS_START_LABEL} to first {name} result: {time.time() - PROCESS_START_TIME:.2f} seconds")
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) == 3 and sys.argv[1] == "seal":
+        written = write_checksums(sys.argv[2])
+        print(f"Wrote checksums for {len(written)} files in {sys.argv[2]}")
+    elif len(sys.argv) == 3 and sys.argv[1] == "verify":
+        ok, reason = verify_checksums(sys.argv[2])
+        print(f"{sys.argv[2]}: {reason}")
+        sys.exit(0 if ok else 1)
+    else:
+        print("Usage: python -m helper_functions.model_loader [seal|verify] <model_directory>")
+        sys.exit(2)
@@ -1,12 +1,10 @@
 import json
 import os
 from pinecone import Pinecone, ServerlessSpec
-from helper_functions.embeddings_func import embedding_model
+from helper_functions.embedding_pipeline import EMBEDDING_BATCH_SIZE, EMBEDDING_WORKERS, embed_in_batches
 from tqdm import tqdm
 import time
 from dotenv import load_dotenv
-from concurrent.futures import ThreadPoolExecutor, as_completed
-import threading
 from typing import List, Tuple, Dict, Any
 
 load_dotenv()
@@ -16,20 +14,6 @@ PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
 INDEX_NAME = "developer-atlan-docs"
 DIMENSION = 384
 BATCH_SIZE = 100
-MAX_WORKERS = 8  # Number of threads for parallel processing
-EMBEDDING_BATCH_SIZE = 10  # Number of documents to process per thread
-
-# Thread-local storage for model instances
-thread_local = threading.local()
-
-def get_thread_embedding_model():
-    """
-    Get embedding model instance for current thread
-    This ensures each thread has its own model instance
-    """
-    if not hasattr(thread_local, 'model'):
-        thread_local.model = embedding_model
-    return thread_local.model
 
 def initialize_pinecone():
     """
@@ -73,72 +57,28 @@ def load_json_data(file_path: str) -> List[Dict]:
         print(f"Error parsing JSON: {e}")
         return None
 
-def process_single_document(doc_data: Tuple[int, Dict]) -> Tuple[str, List[float], Dict]:
-    """
-    Process a single document to create embedding
-    Returns tuple of (doc_id, embedding, metadata)
-    """
-    doc_idx, doc = doc_data
-    
-    try:
-        url = doc.get('url', '')
-        content = doc.get('text', '')
-        
-        # Skip documents with empty content
-        if not content.strip():
-            return None
-        
-        # Get thread-local embedding model
-        embedding_func = get_thread_embedding_model()
-        embedding = embedding_func(content)
-        
-        doc_id = f"doc_{doc_idx}"
-        
-        metadata = {
-            "url": url,
-            "content_length": len(content),
-            "content_preview": content[:200]
-        }
-        
-        return (doc_id, embedding.tolist(), metadata)
-        
-    except Exception as e:
-        print(f"Error processing document {doc_idx}: {e}")
-        return None
-
 def create_embeddings_parallel(documents: List[Dict], start_idx: int = 0) -> List[Tuple]:
     """
-    Create embeddings for documents using multithreading
+    Create embeddings for documents in large batches across a process pool
     Returns list of tuples (id, embedding, metadata)
     """
     vectors = []
-    
-    # Prepare data with indices for processing
-    doc_data = [(start_idx + i, doc) for i, doc in enumerate(documents)]
-    
-    # Create progress bar for embedding generation
-    with tqdm(total=len(documents), desc="Creating embeddings", unit="docs") as pbar:
-        
-        # Use ThreadPoolExecutor for parallel processing
-        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
-            # Submit all tasks
-            future_to_doc = {
-                executor.submit(process_single_document, data): data[0] 
-                for data in doc_data
+
+    # Skip documents with empty content
+    doc_data = [(start_idx + i, doc) for i, doc in enumerate(documents) if doc.get('text', '').strip()]
+
+    for batch, embeddings in embed_in_batches(doc_data, text_of=lambda item: item[1]['text'],
+                                              batch_size=EMBEDDING_BATCH_SIZE, workers=EMBEDDING_WORKERS,
+                                              total=len(doc_data)):
+        for (doc_idx, doc), embedding in zip(batch, embeddings):
+            content = doc['text']
+            metadata = {
+                "url": doc.get('url', ''),
+                "content_length": len(content),
+                "content_preview": content[:200]
             }
-            
-            # Collect results as they complete
-            for future in as_completed(future_to_doc):
-                doc_idx = future_to_doc[future]
-                try:
-                    result = future.result()
-                    if result is not None:
-                        vectors.append(result)
-                    pbar.update(1)
-                except Exception as e:
-                    print(f"Error in thread for document {doc_idx}: {e}")
-                    pbar.update(1)
-    
+            vectors.append((f"doc_{doc_idx}", embedding.tolist(), metadata))
+
     return vectors
 
 def upload_to_pinecone_with_progress(index, vectors: List[Tuple]) -> None:
@@ -170,32 +110,9 @@ def upload_to_pinecone_with_progress(index, vectors: List[Tuple]) -> None:
 
 def process_documents_in_chunks(documents: List[Dict]) -> List[Tuple]:
     """
-    Process all documents in chunks with multithreading
+    Process all documents through the batched embedding pipeline
     """
-    all_vectors = []
-    chunk_size = 100  # Larger chunks for better efficiency
-    
-    # Create overall progress for chunk processing
-    total_chunks = (len(documents) + chunk_size - 1) // chunk_size
-    
-    with tqdm(total=total_chunks, desc="Processing chunks", unit="chunks") as chunk_pbar:
-        
-        for i in range(0, len(documents), chunk_size):
-            chunk = documents[i:i + chunk_size]
-            
-            print(f"\nProcessing chunk {i//chunk_size + 1}/{total_chunks}")
-            print(f"Documents {i} to {min(i + chunk_size - 1, len(documents) - 1)}")
-            
-            # Process chunk with multithreading
-            vectors = create_embeddings_parallel(chunk, start_idx=i)
-            all_vectors.extend(vectors)
-            
-            chunk_pbar.update(1)
-            
-            # Optional: Small delay between chunks to prevent overwhelming the system
-            time.sleep(1)
-    
-    return all_vectors
+    return create_embeddings_parallel(documents)
 
 def main():
     """
@@ -227,8 +144,8 @@ def main():
         print(f"❌ Error initializing Pinecone: {e}")
         return
     
-    # Step 3: Create embeddings with multithreading
-    print(f"\n🧠 Step 3: Creating embeddings with {MAX_WORKERS} threads...")
+    # Step 3: Create embeddings in batches across worker processes
+    print(f"\n🧠 Step 3: Creating embeddings with {EMBEDDING_WORKERS or 'no'} worker processes...")
     print(f"Processing {len(documents)} documents in parallel...")
     
     start_time = time.time()
@@ -1,45 +1,108 @@
-from helper_functions.llm_gemini import gemini_response
-from helper_functions.llm_groq import groq_response
+import re
+import time
+import threading
+from helper_functions.llm_gateway import PROVIDERS, DEFAULT_TIMEOUT, generate, get_key_pool
+from helper_functions.priority_rules import match_priority
 from prompts.prompt_priority import SYSTEM_PROMPT_PRIORITY
 import os
 from dotenv import load_dotenv
 load_dotenv()
 
+PRIORITY_LABELS = ("High_Priority", "Medium_Priority", "Low_Priority")
+
+# Total time the LLM path may spend on one ticket, retries and failover included
+PRIORITY_LLM_BUDGET_SECONDS = float(os.getenv("PRIORITY_LLM_BUDGET_SECONDS", "20"))
+PRIORITY_LLM_FAILOVER = os.getenv("PRIORITY_LLM_FAILOVER", "0") == "1"
+PRIORITY_DEFAULT = os.getenv("PRIORITY_DEFAULT", "Medium_Priority")
+
+FAILOVER_PROVIDER = {"groq": "gemini", "gemini": "groq"}
+
+RETRY_INSTRUCTION = "\n\nAnswer with exactly one of: High_Priority, Medium_Priority, Low_Priority."
+
+_LEVEL_REGEX = re.compile(r"\b(high|medium|low)(?:[\s_-]*priority)?\b")
+
+_outcomes = {"rule": 0, "llm": 0, "llm_normalised": 0, "llm_retry": 0, "failover": 0, "default": 0, "llm_errors": 0}
+_outcomes_lock = threading.Lock()
+
+
+def _count(outcome):
+    with _outcomes_lock:
+        _outcomes[outcome] += 1
+
+
+def priority_outcome_stats():
+    """
+    How each priority was decided: by the rules, by the LLM (first answer, after
+    local normalisation, after a retry, on the failover provider) or by the default.
+    """
+    with _outcomes_lock:
+        return dict(_outcomes)
+
+
+def normalise_priority(response):
+    """
+    Map an LLM answer onto one of PRIORITY_LABELS, accepting near misses such as
+    "high priority", "**Low_Priority**" or "Priority: medium". None when the answer
+    names no level or more than one.
+    """
+    if response in PRIORITY_LABELS:
+        return response
+    levels = set(_LEVEL_REGEX.findall((response or "").lower()))
+    if len(levels) != 1:
+        return None
+    return f"{levels.pop().capitalize()}_Priority"
+
+
+def _llm_priority(text, llm_choice, groq_api_key, SYSTEM_PROMPT):
+    """
+    Ask the LLM within PRIORITY_LLM_BUDGET_SECONDS: the plain prompt first, then
+    once more with an explicit answer format, then (if enabled) the other provider.
+    Returns (label, outcome) or (None, None) when every attempt failed.
+    """
+    # The Groq key is only meant for Groq; other providers use their own key pool
+    api_key = groq_api_key if llm_choice == "groq" else None
+    attempts = [(llm_choice, text, api_key, "llm"), (llm_choice, text + RETRY_INSTRUCTION, api_key, "llm_retry")]
+    failover = FAILOVER_PROVIDER.get(llm_choice)
+    if PRIORITY_LLM_FAILOVER and failover and get_key_pool(failover) is not None:
+        attempts.append((failover, text + RETRY_INSTRUCTION, None, "failover"))
+
+    valid = lambda response: normalise_priority(response) is not None
+    deadline = time.monotonic() + PRIORITY_LLM_BUDGET_SECONDS
+    for provider, prompt, api_key, outcome in attempts:
+        remaining = deadline - time.monotonic()
+        if remaining < 1:
+            break
+        try:
+            # The deadline also bounds the wait for a pooled key, not just the HTTP timeout
+            response = generate(provider, prompt, SYSTEM_PROMPT, api_key=api_key, timeout=DEFAULT_TIMEOUT,
+                                cache=True, cache_validator=valid, deadline=deadline).text
+        except Exception as e:
+            print(f"Priority LLM call on {provider} failed: {e}")
+            _count("llm_errors")
+            continue
+        label = normalise_priority(response)
+        if label is not None:
+            return label, ("llm_normalised" if outcome == "llm" and label != response else outcome)
+    return None, None
+
+
 def priority_of_the_concern(text,llm_choice,groq_api_key, SYSTEM_PROMPT=SYSTEM_PROMPT_PRIORITY) -> str:
     """
     Get the priority of the concern using rule based method or using LLM
     """
-    high_priority = ["Urgent","Immediate", "As soon as possible", "Critical", "Important", "Priority", "Emergency", "ASAP", "Serious"]
-    medium_priority = ["Soon", "In a few days", "Within a week", "Moderate", "Normal", "Standard", "Regular", "Usual", "Average", "Typical"]
-    low_priority = ["Later", "In the future", "Not urgent", "Trivial", "Minor", "Negligible", "Low", "Non-urgent", "Whenever", "At your convenience", "No rush", "Eventually"]
-
-    text_lower = text.lower()
-
-    if any(word.lower() in text_lower for word in high_priority):
-        return "High_Priority"
-    elif any(word.lower() in text_lower for word in medium_priority):
-        return "Medium_Priority"
-    elif any(word.lower() in text_lower for word in low_priority):
-        return "Low_Priority"
-    else:
-        # print("Using LLM to determine priority...")
-        llm_response = ""
-        if llm_choice == "gemini":
-            llm_response = gemini_response(text, SYSTEM_PROMPT)
-        elif llm_choice == "groq":
-            llm_response = groq_response(text, SYSTEM_PROMPT, groq_api_key)
-        else:
-            return "Invalid LLM choice"
-
-        if llm_response not in ["High_Priority", "Medium_Priority", "Low_Priority"]:
-            if llm_choice == "gemini":
-                llm_response = gemini_response(text, SYSTEM_PROMPT)
-            elif llm_choice == "groq":
-                llm_response = groq_response(text, SYSTEM_PROMPT, groq_api_key)
-            else:
-                return "Invalid LLM choice"
-
-    return llm_response
-
-
-# print(priority_of_the_concern("It is not urg353ent", "groq", groq_api_key=os.environ.get("GROQ_API_KEY")))
+    rule_priority, _ = match_priority(text)
+    if rule_priority is not None:
+        _count("rule")
+        return rule_priority
+
+    # print("Using LLM to determine priority...")
+    if llm_choice not in PROVIDERS:
+        return "Invalid LLM choice"
+    label, outcome = _llm_priority(text, llm_choice, groq_api_key, SYSTEM_PROMPT)
+    if label is None:
+        label, outcome = PRIORITY_DEFAULT, "default"
+    _count(outcome)
+    return label
+
+
+# print(priority_of_the_concern("It is not urg353ent", "groq", groq_api_key=os.environ.get("GROQ_API_KEY")))
\ No newline at end of file
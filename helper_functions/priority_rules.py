@@ -0,0 +1,182 @@
+import re
+import json
+import time
+import threading
+
+HIGH_PRIORITY = ["Urgent", "Immediate", "As soon as possible", "Critical", "Important", "Priority", "Emergency", "ASAP", "Serious"]
+MEDIUM_PRIORITY = ["Medium priority", "Soon", "In a few days", "Within a week", "Moderate", "Normal", "Standard", "Regular", "Usual", "Average", "Typical"]
+LOW_PRIORITY = ["Low priority", "Later", "In the future", "Not urgent", "Trivial", "Minor", "Negligible", "Low", "Non-urgent", "Whenever", "At your convenience", "No rush", "Eventually"]
+
+# Checked in this order, as in the original if/elif chain
+LEVELS = [("High_Priority", HIGH_PRIORITY), ("Medium_Priority", MEDIUM_PRIORITY), ("Low_Priority", LOW_PRIORITY)]
+
+_LEVEL_OF = {keyword.lower(): level for level, keywords in LEVELS for keyword in keywords}
+# "emergencies", "priorities": plurals the regex suffix below cannot produce
+_LEVEL_OF.update({keyword[:-1] + "ies": level for keyword, level in list(_LEVEL_OF.items())
+                  if keyword.endswith("y") and not keyword.endswith("ly")})
+
+
+def _trie_pattern(keywords):
+    """
+    Regex for a set of lowercase keywords, factored into a character trie so the
+    engine never retries alternatives sharing a prefix. Optional tails are greedy,
+    so "not urgent" and "non-urgent" are consumed whole before "urgent" can match
+    inside them.
+    """
+    trie = {}
+    for keyword in keywords:
+        node = trie
+        for ch in keyword:
+            node = node.setdefault(ch, {})
+        node[""] = True
+
+    def build(node):
+        branches = [
+            (r"\s+" if ch == " " else re.escape(ch)) + build(child)
+            for ch, child in sorted(node.items()) if ch
+        ]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        return "(?:" + body + ")?" if "" in node else body
+
+    return build(trie)
+
+
+# Matched against lowercased text; cheaper than re.IGNORECASE. The suffix keeps
+# the inflections the old substring matcher caught ("immediately", "emergencies")
+KEYWORD_REGEX = re.compile(r"\b(?P<keyword>" + _trie_pattern(_LEVEL_OF) + r")(?:ly|s|es)?\b")
+
+# A negation up to two words before a keyword ("not that urgent", "isn't critical", "non urgent")
+NEGATION_REGEX = re.compile(
+    r"\b(?:not|no|non|never|nothing|without|isn'?t|aren'?t|wasn'?t|don'?t|doesn'?t)(?:\W+\w+){0,2}\W*$",
+    re.IGNORECASE,
+)
+NEGATION_WINDOW = 40
+# A negation does not reach past the end of its clause ("nothing works, urgent help")
+CLAUSE_BREAK_REGEX = re.compile(r"[,.;:!?]|\b(?:but|however|though|although)\b")
+
+_stats = {"rule": 0, "llm_fallback": 0}
+_stats_lock = threading.Lock()
+
+
+def _classify(matches):
+    """
+    Pick the priority from the non-negated keyword matches of one ticket.
+    """
+    evidence = [match for match in matches if not match["negated"]]
+    for level, _ in LEVELS:
+        if any(match["level"] == level for match in evidence):
+            return level, evidence
+    return None, evidence
+
+
+def _evidence(m, text):
+    window = text[max(0, m.start() - NEGATION_WINDOW):m.start()]
+    clause_start = 0
+    for clause_break in CLAUSE_BREAK_REGEX.finditer(window):
+        clause_start = clause_break.end()
+    window = window[clause_start:]
+    return {
+        "keyword": m.group(0),
+        "level": _LEVEL_OF[" ".join(m.group("keyword").split())],
+        "span": (m.start(), m.end()),
+        "negated": NEGATION_REGEX.search(window) is not None,
+    }
+
+
+def _matches(text):
+    text = text.lower()
+    return [_evidence(m, text) for m in KEYWORD_REGEX.finditer(text)]
+
+
+def _count(priorities):
+    with _stats_lock:
+        for priority in priorities:
+            _stats["rule" if priority else "llm_fallback"] += 1
+
+
+def match_priority(text):
+    """
+    Rule-based priority of one ticket.
+
+    Returns (priority, evidence): priority is None when no rule fires and the
+    LLM has to decide; evidence lists the non-negated keyword matches, with
+    spans into the lowercased text.
+    """
+    priority, evidence = _classify(_matches(text))
+    _count([priority])
+    return priority, evidence
+
+
+def match_priority_batch(texts):
+    """
+    match_priority over many tickets, updating the rule stats once for the list.
+    """
+    results = [_classify(_matches(text)) for text in texts]
+    _count([priority for priority, _ in results])
+    return results
+
+
+def rule_stats():
+    """
+    How many tickets the rules decided and what share still needed the LLM.
+    """
+    with _stats_lock:
+        stats = dict(_stats)
+    total = stats["rule"] + stats["llm_fallback"]
+    stats["llm_fallback_share"] = round(stats["llm_fallback"] / total, 3) if total else None
+    return stats
+
+
+def _legacy_match(text):
+    """
+    The previous substring matcher, kept for the benchmark.
+    """
+    high_priority = ["Urgent","Immediate", "As soon as possible", "Critical", "Important", "Priority", "Emergency", "ASAP", "Serious"]
+    medium_priority = ["Soon", "In a few days", "Within a week", "Moderate", "Normal", "Standard", "Regular", "Usual", "Average", "Typical"]
+    low_priority = ["Later", "In the future", "Not urgent", "Trivial", "Minor", "Negligible", "Low", "Non-urgent", "Whenever", "At your convenience", "No rush", "Eventually"]
+    text_lower = text.lower()
+    if any(word.lower() in text_lower for word in high_priority):
+        return "High_Priority"
+    elif any(word.lower() in text_lower for word in medium_priority):
+        return "Medium_Priority"
+    elif any(word.lower() in text_lower for word in low_priority):
+        return "Low_Priority"
+    return None
+
+
+def benchmark(texts, repeat=200):
+    """
+    Rule-path throughput of the legacy and the compiled matcher, plus how often
+    the two disagree.
+    """
+    def tickets_per_second(fn):
+        t1 = time.perf_counter()
+        for _ in range(repeat):
+            fn()
+        return round(repeat * len(texts) / (time.perf_counter() - t1))
+
+    legacy = [_legacy_match(text) for text in texts]
+    compiled = [priority for priority, _ in match_priority_batch(texts)]
+    return {
+        "tickets": len(texts),
+        "legacy_tickets_per_s": tickets_per_second(lambda: [_legacy_match(text) for text in texts]),
+        "compiled_tickets_per_s": tickets_per_second(lambda: [_classify(_matches(text)) for text in texts]),
+        "legacy_llm_fallback_share": round(legacy.count(None) / len(texts), 3),
+        "compiled_llm_fallback_share": round(compiled.count(None) / len(texts), 3),
+        "disagreements": sum(a != b for a, b in zip(legacy, compiled)),
+    }
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) >= 2 and sys.argv[1] == "benchmark":
+        tickets_path = sys.argv[2] if len(sys.argv) > 2 else "./json_files_data/data.json"
+        with open(tickets_path, "r", encoding="utf-8") as f:
+            texts = [ticket["body"] for ticket in json.load(f)]
+        print(json.dumps(benchmark(texts), indent=2))
+    else:
+        print("Usage: python -m helper_functions.priority_rules benchmark [tickets.json]")
+        sys.exit(2)
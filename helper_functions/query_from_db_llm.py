@@ -1,16 +1,44 @@
-from pinecone.grpc import PineconeGRPC as Pinecone
 from helper_functions.embeddings_func import embedding_model
-from helper_functions.llm_gemini import gemini_response
-from helper_functions.llm_groq import groq_response
+from helper_functions.llm_gateway import generate, stream_generate
+from helper_functions.semantic_cache import get_semantic_cache
+from helper_functions.bm25_index import load_bm25_index, reciprocal_rank_fusion
+from helper_functions.context_builder import CONTEXT_TOKEN_BUDGET, build_context, truncate_to_tokens
 import os
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 import time
-import random
 load_dotenv()
 
 
-pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
-index = pc.Index(os.getenv("PINECONE_INDEX_NAME"))
+# pinecone | local
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "pinecone")
+# hybrid (dense + BM25, fused with reciprocal rank fusion) | dense
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "hybrid")
+# Chunks passed to the LLM; hybrid recall allows fewer than the dense-only 10
+RETRIEVAL_TOP_K = int(os.getenv("RETRIEVAL_TOP_K", "6" if RETRIEVAL_MODE == "hybrid" else "10"))
+# Candidates each retriever contributes to the fusion
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "20"))
+RRF_K = int(os.getenv("RRF_K", "60"))
+
+# Dense and BM25 retrieval run side by side
+_retrieval_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="retrieval")
+
+index = None
+
+def get_vector_index():
+    """
+    Return the retrieval index selected by VECTOR_BACKEND, created on first use.
+    """
+    global index
+    if index is None:
+        if VECTOR_BACKEND == "local":
+            from helper_functions.local_vector_index import load_local_index
+            index = load_local_index()
+        else:
+            from pinecone.grpc import PineconeGRPC as Pinecone
+            pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
+            index = pc.Index(os.getenv("PINECONE_INDEX_NAME"))
+    return index
 
 # query = "Explain me about AzureEventHub"
 # query_embedding = embedding_model(query)
@@ -18,46 +46,114 @@ t1 = time.perf_counter()
 
 results = ""
 
-def show_metadata(query):
-    query_embedding = embedding_model(query)
-    results = index.query(query_embedding, top_k=10, include_values=True, include_metadata=True)
+def _timed(retrieve):
+    t1 = time.perf_counter()
+    results = retrieve()
+    return results, time.perf_counter() - t1
+
+
+def retrieve(query, query_embedding=None, top_k=RETRIEVAL_TOP_K):
+    """
+    Chunks for `query` as {"matches": [...], "timings": {...}}. In hybrid mode
+    the dense search (embedding included when not given) and the BM25 search
+    run concurrently and are merged with reciprocal rank fusion, so exact
+    identifiers such as connector names and error codes are not missed.
+    """
+    def dense(k):
+        embedding = query_embedding if query_embedding is not None else embedding_model(query)
+        return get_vector_index().query(embedding, top_k=k, include_values=False, include_metadata=True)
+
+    bm25_index = load_bm25_index() if RETRIEVAL_MODE == "hybrid" else None
+    if bm25_index is None:
+        results, dense_s = _timed(lambda: dense(top_k))
+        return {"matches": results["matches"], "timings": {"dense_s": dense_s}}
+
+    dense_future = _retrieval_executor.submit(_timed, lambda: dense(HYBRID_CANDIDATES))
+    bm25_future = _retrieval_executor.submit(_timed, lambda: bm25_index.query(query, top_k=HYBRID_CANDIDATES))
+    (dense_results, dense_s), (bm25_results, bm25_s) = dense_future.result(), bm25_future.result()
+
+    t1 = time.perf_counter()
+    results = reciprocal_rank_fusion({"dense": dense_results, "bm25": bm25_results}, top_k, k=RRF_K)
+    results["timings"] = {"dense_s": dense_s, "bm25_s": bm25_s, "fusion_s": time.perf_counter() - t1}
+    return results
+
+
+def show_metadata(query, query_embedding=None):
+    results = retrieve(query, query_embedding)
+    print("Retrieval timings: " + ", ".join(f"{name} {1000 * seconds:.1f} ms" for name, seconds in results["timings"].items()))
     for match in results['matches']:
         print(match['metadata'])
-    documents = [match['metadata']['text'] for match in results['matches']]
-    context = "\n\n".join(documents)
-    source_urls_string = ""
-    source_urls = [match['metadata']['source'] for match in results['matches']]
+    # Deduplicated, grouped by URL and packed into CONTEXT_TOKEN_BUDGET tokens
+    context, source_urls, results["context_stats"] = build_context(results['matches'])
+    print(f"Context: {results['context_stats']}")
     source_urls_string = "\n".join(source_urls)
     print("Source URLs: ", source_urls_string)
     return results, context, source_urls
 
 results, context, source_urls = show_metadata("Explain me about AzureEventHub")
 
-print(f"Time taken for Pinecone query: {time.perf_counter() - t1} seconds")
+print(f"Time taken for {VECTOR_BACKEND} query: {time.perf_counter() - t1} seconds")
 # documents = [match['metadata']['text'] for match in results['matches']]
 # context = "\n\n".join(documents)
 
 # print(context) 
 
 
-def llm_generation(prompt, context, llm = "groq"):
-    context = context[:6000]
-    SYSTEM_PROMPT = f"""You are a helpful AI assistant. Use the following pieces of context to answer the question at the end. 
+def semantic_lookup(query, llm="gemini"):
+    """
+    Embed `query` once and look it up in the semantic answer cache.
+    Returns (query_embedding, cached_entry or None); pass the embedding on to
+    show_metadata and remember_answer so it is not computed again.
+    """
+    query_embedding = embedding_model(query)
+    semantic_cache = get_semantic_cache()
+    cached = semantic_cache.lookup(query_embedding, llm) if semantic_cache is not None else None
+    return query_embedding, cached
+
+
+def remember_answer(query, query_embedding, results, context, source_urls, answer, llm="gemini"):
+    semantic_cache = get_semantic_cache()
+    # An empty answer (nothing generated) would be replayed for every similar question
+    if semantic_cache is not None and answer and answer.strip():
+        source_ids = [match['id'] for match in results['matches']]
+        semantic_cache.store(query, query_embedding, llm, source_ids, source_urls, context, answer)
+
+
+def _rag_system_prompt(prompt, context, packed=True):
+    # Contexts packed by build_context already fit the budget; any other text is cut at a sentence end
+    if not packed:
+        context = truncate_to_tokens(context, CONTEXT_TOKEN_BUDGET)
+    return f"""You are a helpful AI assistant. Use the following pieces of context to answer the question at the end. 
     If you don't know the answer, just say that you don't know, don't try to make up an answer. Just tell "I don't know" and refering the concern to concerned authority.  Nothing else.
     Context: {context} 
     Question: {prompt} 
     Answer in detail:"""
-    t1 = time.perf_counter()
-    llm_response = ""
-    groq_apis = [os.getenv("GROQ_API_KEY"),os.getenv("GROQ_API_KEY_2")]
-    if llm == "gemini":
-        print("Using Gemini LLM")
-        llm_response = gemini_response(prompt, SYSTEM_PROMPT)
-    elif llm == "groq":
-        print("Using Groq LLM")
-        llm_response = groq_response(prompt, SYSTEM_PROMPT,random.choice(groq_apis))
-    print(f"Time taken for LLM response: {time.perf_counter() - t1} seconds")
-    return llm_response 
+
+
+def llm_generation(prompt, context, llm = "groq", packed=True):
+    SYSTEM_PROMPT = _rag_system_prompt(prompt, context, packed)
+    print(f"Using {llm} LLM")
+    response = generate(llm, prompt, SYSTEM_PROMPT)
+    print(f"Time taken for LLM response: {response.latency_s} seconds "
+          f"({response.prompt_tokens} prompt tokens, {response.completion_tokens} completion tokens)")
+    return response.text 
+
+
+def llm_generation_stream(prompt, context, llm = "groq", packed=True):
+    """
+    Like llm_generation, but returns an LLMStream to render while the answer
+    is generated; its `response` (with ttft_s and latency_s) is set once the
+    stream has been consumed.
+    """
+    print(f"Streaming from {llm} LLM")
+    answer_stream = stream_generate(llm, prompt, _rag_system_prompt(prompt, context, packed))
+
+    def log(response):
+        print(f"Time to first token: {response.ttft_s} seconds, full LLM response: {response.latency_s} seconds "
+              f"({response.prompt_tokens} prompt tokens, {response.completion_tokens} completion tokens)")
+
+    answer_stream.add_done_callback(log)
+    return answer_stream
 
 
 # gemini_response = llm_generation("Explain me about AzureEventHub", context, llm="gemini")
@@ -0,0 +1,196 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+import numpy as np
+from dotenv import load_dotenv
+from helper_functions.llm_cache import LLM_CACHE_PATH
+from helper_functions.vector_store import current_index_version
+from helper_functions.index_manifest import manifest_version
+
+load_dotenv()
+
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92"))
+SEMANTIC_CACHE_DISABLED = os.getenv("SEMANTIC_CACHE_DISABLED", "0") == "1"
+# pinecone | local, as in query_from_db_llm
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "pinecone")
+# How often the Pinecone index version is re-read; the local store's is checked on every lookup
+SEMANTIC_CACHE_VERSION_CHECK_SECONDS = float(os.getenv("SEMANTIC_CACHE_VERSION_CHECK_SECONDS", "300"))
+
+_UNCHECKED = object()
+
+
+def index_version():
+    """
+    Version of the index answers are retrieved from: the local vector store's
+    hash, or for Pinecone the manifest of the last sync, falling back to the
+    remote vector count on deployments that never ran the sync themselves.
+    """
+    if VECTOR_BACKEND == "local":
+        return current_index_version()
+    version = manifest_version()
+    if version is None:
+        from helper_functions.query_from_db_llm import get_vector_index
+        version = f"pinecone:{get_vector_index().describe_index_stats().total_vector_count}"
+    return version
+
+
+class SemanticAnswerCache:
+    """
+    Cache of RAG answers looked up by query-embedding similarity, so paraphrases
+    of a question already answered skip both retrieval and generation.
+
+    Entries are (query embedding, retrieved source ids/urls, context, answer)
+    stored in SQLite next to the LLM cache and mirrored in an in-memory float32
+    matrix for the cosine scan. Every entry carries the vector index version it
+    was answered against; entries from another version are dropped, so a
+    rebuilt index invalidates the cache.
+    """
+
+    def __init__(self, path=LLM_CACHE_PATH, threshold=SEMANTIC_CACHE_THRESHOLD):
+        self.path = path
+        self.threshold = threshold
+        self.counters = {"hits": 0, "misses": 0, "stores": 0}
+        self._lock = threading.Lock()
+        self.version_check_seconds = 0 if VECTOR_BACKEND == "local" else SEMANTIC_CACHE_VERSION_CHECK_SECONDS
+        self._version_checked_at = float("-inf")
+
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+        CREATE TABLE IF NOT EXISTS semantic_answer_cache (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            llm TEXT,
+            query TEXT,
+            embedding BLOB,
+            source_ids TEXT,
+            source_urls TEXT,
+            context TEXT,
+            answer TEXT,
+            index_version TEXT,
+            created_at REAL
+        )
+        """)
+        self._conn.commit()
+        version = self._poll_index_version()
+        if version is _UNCHECKED:
+            # Keep the entries until the version can be read; retried on the next lookup
+            self._version_checked_at = float("-inf")
+            self._load(None, prune=False)
+        else:
+            self._load(version)
+
+    def _poll_index_version(self):
+        """
+        index_version(), or _UNCHECKED if it was read less than
+        version_check_seconds ago or could not be read.
+        """
+        now = time.monotonic()
+        if now - self._version_checked_at < self.version_check_seconds:
+            return _UNCHECKED
+        self._version_checked_at = now
+        try:
+            return index_version()
+        except Exception as e:
+            print(f"Semantic cache: could not read the index version ({e})")
+            return _UNCHECKED
+
+    def _load(self, version, prune=True):
+        self.index_version = version
+        if prune:
+            self._conn.execute("DELETE FROM semantic_answer_cache WHERE index_version IS NOT ?", (self.index_version,))
+            self._conn.commit()
+        rows = self._conn.execute("SELECT id, llm, embedding FROM semantic_answer_cache ORDER BY id").fetchall()
+        self._ids = [row[0] for row in rows]
+        self._llms = [row[1] for row in rows]
+        self._matrix = (
+            np.vstack([np.frombuffer(row[2], dtype=np.float32) for row in rows])
+            if rows else np.zeros((0, 384), dtype=np.float32)
+        )
+
+    @staticmethod
+    def _unit(embedding):
+        embedding = np.asarray(embedding, dtype=np.float32).reshape(-1)
+        return embedding / max(float(np.linalg.norm(embedding)), 1e-12)
+
+    def lookup(self, query_embedding, llm):
+        """
+        Return the cached entry most similar to `query_embedding` for `llm` if its
+        cosine similarity reaches the threshold, else None.
+        """
+        # Read outside the lock: for Pinecone it may be a remote call
+        version = self._poll_index_version()
+        with self._lock:
+            if version is not _UNCHECKED and version != self.index_version:
+                self._load(version)
+            if not self._ids:
+                self.counters["misses"] += 1
+                return None
+
+            similarities = self._matrix @ self._unit(query_embedding)
+            similarities[[i for i, entry_llm in enumerate(self._llms) if entry_llm != llm]] = -1.0
+            best = int(np.argmax(similarities))
+            if similarities[best] < self.threshold:
+                self.counters["misses"] += 1
+                return None
+            # Under the lock: another session's invalidate() or reload could delete the row in between
+            row = self._conn.execute(
+                "SELECT query, source_ids, source_urls, context, answer FROM semantic_answer_cache WHERE id = ?", (self._ids[best],)
+            ).fetchone()
+            if row is None:
+                self.counters["misses"] += 1
+                return None
+            self.counters["hits"] += 1
+
+        return {
+            "query": row[0],
+            "source_ids": json.loads(row[1]),
+            "source_urls": json.loads(row[2]),
+            "context": row[3],
+            "answer": row[4],
+            "similarity": float(similarities[best]),
+        }
+
+    def store(self, query, query_embedding, llm, source_ids, source_urls, context, answer):
+        embedding = self._unit(query_embedding)
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO semantic_answer_cache (llm, query, embedding, source_ids, source_urls, context, answer, index_version, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (llm, query, embedding.tobytes(), json.dumps(list(source_ids)), json.dumps(list(source_urls)),
+                 context, answer, self.index_version, time.time()),
+            )
+            self._conn.commit()
+            self._ids.append(cursor.lastrowid)
+            self._llms.append(llm)
+            self._matrix = np.vstack([self._matrix, embedding[None, :]])
+            self.counters["stores"] += 1
+
+    def invalidate(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM semantic_answer_cache")
+            self._conn.commit()
+            self._load(self.index_version)
+
+    def stats(self):
+        with self._lock:
+            return {**self.counters, "entries": len(self._ids), "index_version": self.index_version}
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_semantic_cache():
+    """
+    The process-wide semantic answer cache, or None when SEMANTIC_CACHE_DISABLED=1.
+    """
+    global _cache
+    if SEMANTIC_CACHE_DISABLED:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = SemanticAnswerCache()
+    return _cache
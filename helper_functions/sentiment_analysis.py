@@ -1,31 +1,107 @@
 import os
-from transformers import AutoTokenizer, AutoModelForSequenceClassification, pipeline
+import numpy as np
+from transformers import AutoConfig, AutoTokenizer, AutoModelForSequenceClassification
+from helper_functions.model_loader import MODEL_BASE_DIRECTORY, load_model, report_time_to_first_result
+from helper_functions.inference_backend import (
+    INFERENCE_BACKEND, EXPORT_HINT, ONNX_BACKENDS, onnx_directory, onnx_session, quantize_dynamic_int8
+)
 
-base_directory = "./model"
 model_name = "joeddav/distilbert-base-uncased-go-emotions-student"
 model_folder_name = "go_emotions_student"
-save_directory = os.path.join(base_directory, model_folder_name)
-os.makedirs(save_directory, exist_ok=True)
+save_directory = os.path.join(MODEL_BASE_DIRECTORY, model_folder_name)
 
-tokenizer = AutoTokenizer.from_pretrained(model_name)
-model = AutoModelForSequenceClassification.from_pretrained(model_name)
 
-tokenizer.save_pretrained(save_directory)
-model.save_pretrained(save_directory)
+def _download(directory):
+    AutoTokenizer.from_pretrained(model_name).save_pretrained(directory)
+    AutoModelForSequenceClassification.from_pretrained(model_name).save_pretrained(directory)
 
-local_tokenizer = AutoTokenizer.from_pretrained(save_directory)
-local_model = AutoModelForSequenceClassification.from_pretrained(save_directory)
 
-classifier = pipeline(
-        "text-classification",
-        model=local_model,
-        tokenizer=local_tokenizer,
-        top_k=None
-    )
+def _load_local(directory):
+    local_tokenizer = AutoTokenizer.from_pretrained(directory, local_files_only=True)
+    local_model = AutoModelForSequenceClassification.from_pretrained(directory, local_files_only=True)
+    local_model.eval()
+    return local_tokenizer, local_model
+
+
+def _load_local_int8(directory):
+    local_tokenizer, local_model = _load_local(directory)
+    return local_tokenizer, quantize_dynamic_int8(local_model)
+
+
+def _load_local_onnx(directory, file_name):
+    local_tokenizer = AutoTokenizer.from_pretrained(directory, local_files_only=True)
+    config = AutoConfig.from_pretrained(directory, local_files_only=True)
+    return local_tokenizer, (onnx_session(directory, file_name), config)
+
+
+def get_sentiment_model(backend=None):
+    """
+    Return (tokenizer, model) for the selected inference backend, loaded once per process.
+    For the onnxruntime backends `model` is an (InferenceSession, config) pair.
+    """
+    backend = backend or INFERENCE_BACKEND
+    if backend == "torch-dynamic-int8":
+        return load_model(f"{model_folder_name}:int8", save_directory, _load_local_int8, _download)
+    if backend in ONNX_BACKENDS:
+        return load_model(f"{model_folder_name}:{backend}", onnx_directory(model_folder_name),
+                          lambda directory: _load_local_onnx(directory, ONNX_BACKENDS[backend]), hint=EXPORT_HINT)
+    return load_model(model_folder_name, save_directory, _load_local, _download)
+
+
+def _logits(model, batch, backend):
+    if backend in ONNX_BACKENDS:
+        session, _ = model
+        return session.run(["logits"], {"input_ids": batch["input_ids"], "attention_mask": batch["attention_mask"]})[0]
+
+    import torch
+    with torch.inference_mode():
+        return model(
+            input_ids=torch.from_numpy(batch["input_ids"]),
+            attention_mask=torch.from_numpy(batch["attention_mask"]),
+        ).logits.numpy()
+
 
 def sentiment_analysis(text):
-    results = classifier(text)
-    # print(results[0][0]['label'])
-    return results[0][0]['label']
+    return sentiment_analysis_batch([text])[0]
+
+def sentiment_analysis_batch(texts, batch_size=32, backend=None):
+    """
+    Classify many texts with a few large forward passes instead of one per text.
+    Inputs are sorted by token length so every batch is padded only to its own
+    longest member; labels are returned in the original input order.
+    """
+    texts = list(texts)
+    if not texts:
+        return []
+
+    backend = backend or INFERENCE_BACKEND
+    local_tokenizer, local_model = get_sentiment_model(backend)
+    config = local_model[1] if backend in ONNX_BACKENDS else local_model.config
+
+    encodings = local_tokenizer(texts, truncation=True)
+    input_ids = encodings["input_ids"]
+    attention_mask = encodings["attention_mask"]
+    order = sorted(range(len(texts)), key=lambda i: len(input_ids[i]))
+
+    labels = [None] * len(texts)
+
+    for start in range(0, len(order), batch_size):
+        batch_indices = order[start:start + batch_size]
+        batch = local_tokenizer.pad(
+            {
+                "input_ids": [input_ids[i] for i in batch_indices],
+                "attention_mask": [attention_mask[i] for i in batch_indices],
+            },
+            padding=True,
+            return_tensors="np",
+        )
+        batch = {key: value.astype(np.int64) for key, value in batch.items()}
+        logits = _logits(local_model, batch, backend)
+        for i, label_id in zip(batch_indices, logits.argmax(axis=-1).tolist()):
+            labels[i] = config.id2label[label_id]
+
+    report_time_to_first_result("sentiment")
+    return labels
 
-# print(sentiment_analysis("I love my laptop!"))
\ No newline at end of file
+# print(sentiment_analysis("I love my laptop!"))
+# print(sentiment_analysis_batch(["I love my laptop!", "This is so frustrating."]))
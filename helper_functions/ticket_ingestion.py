@@ -0,0 +1,229 @@
+import io
+import os
+import re
+import csv
+import json
+import hashlib
+
+# Characters decoded per read when streaming a JSON array
+READ_CHUNK_SIZE = 64 * 1024
+REQUIRED_FIELDS = ("id", "subject", "body")
+FORMATS = ("json", "jsonl", "csv")
+_NON_WHITESPACE = re.compile(r"[^ \t\r\n]")
+
+
+class TicketValidationError(ValueError):
+    pass
+
+
+def validate_ticket(ticket, position):
+    """
+    Check one ticket against the id/subject/body schema and return it with
+    string fields. Raises TicketValidationError.
+    """
+    if not isinstance(ticket, dict):
+        raise TicketValidationError(f"ticket {position}: expected an object, got {type(ticket).__name__}")
+    missing = [field for field in REQUIRED_FIELDS if ticket.get(field) is None]
+    if missing:
+        raise TicketValidationError(f"ticket {position}: missing {', '.join(missing)}")
+    if not isinstance(ticket["id"], (str, int)):
+        raise TicketValidationError(f"ticket {position}: id must be a string or an integer")
+    if not isinstance(ticket["subject"], str) or not isinstance(ticket["body"], str):
+        raise TicketValidationError(f"ticket {position}: subject and body must be strings")
+    if not ticket["body"].strip():
+        raise TicketValidationError(f"ticket {position}: empty body")
+    return {**ticket, "id": str(ticket["id"])}
+
+
+def _open_binary(source):
+    """
+    (binary file object, whether we opened it) for a path, bytes or a file object.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        return open(source, "rb"), True
+    if isinstance(source, (bytes, bytearray)):
+        return io.BytesIO(source), True
+    return source, False
+
+
+def detect_format(binary, name=None):
+    """
+    Pick json/jsonl/csv from the file extension, else from the first non-blank byte.
+    """
+    extension = os.path.splitext(name or "")[1].lower().lstrip(".")
+    if extension in ("jsonl", "ndjson"):
+        return "jsonl"
+    if extension in FORMATS:
+        return extension
+
+    start = binary.tell()
+    head = binary.read(1024).lstrip(b"\xef\xbb\xbf \t\r\n")
+    binary.seek(start)
+    if head.startswith(b"["):
+        return "json"
+    if head.startswith(b"{"):
+        return "jsonl"
+    return "csv"
+
+
+def _iter_json_array(text):
+    """
+    Decode the elements of a top-level JSON array one at a time with
+    raw_decode, holding at most one element plus one read chunk in memory.
+    Elements must be separated by exactly one comma and only whitespace may
+    follow the closing bracket; anything else raises TicketValidationError.
+    """
+    decoder = json.JSONDecoder()
+    # The buffer is scanned by index and only compacted when more is read
+    buffer, pos, eof = "", 0, False
+
+    def read():
+        nonlocal buffer, pos, eof
+        chunk = text.read(READ_CHUNK_SIZE)
+        eof = not chunk
+        buffer, pos = buffer[pos:] + chunk, 0
+
+    def peek():
+        # Moves pos to the next non-whitespace character and returns it, reading on
+        # as needed; "" at the end of the input
+        nonlocal pos
+        while True:
+            match = _NON_WHITESPACE.search(buffer, pos)
+            if match:
+                pos = match.start()
+                return buffer[pos]
+            if eof:
+                pos = len(buffer)
+                return ""
+            read()
+
+    if peek() != "[":
+        raise TicketValidationError("expected a JSON array of tickets")
+    pos += 1
+    if peek() == "]":
+        pos += 1
+    else:
+        position = 0
+        while True:
+            if peek() in ("", ",", "]"):
+                raise TicketValidationError(f"expected ticket {position}, found {peek() or 'the end of the file'!r}")
+            while True:
+                try:
+                    item, end = decoder.raw_decode(buffer, pos)
+                except json.JSONDecodeError as e:
+                    if eof:
+                        raise TicketValidationError(f"invalid or truncated JSON array: {e}") from e
+                else:
+                    # A value running up to the end of the buffer (a number, say) may continue in the next chunk
+                    if end < len(buffer) or eof:
+                        break
+                read()
+            yield item
+            pos = end
+
+            separator = peek()
+            pos += 1
+            if separator == "]":
+                break
+            if separator != ",":
+                raise TicketValidationError(f"expected ',' or ']' after ticket {position}, found {separator or 'the end of the file'!r}")
+            position += 1
+
+    if peek():
+        raise TicketValidationError(f"unexpected data after the JSON array: {buffer[pos:pos + 20]!r}")
+
+
+def _iter_jsonl(text):
+    for line in text:
+        if line.strip():
+            yield json.loads(line)
+
+
+def iter_tickets(source, fmt=None, name=None, errors="skip", stats=None):
+    """
+    Stream validated tickets from a JSON array, JSON Lines or CSV source (path,
+    bytes or binary file object) without loading the whole file.
+
+    Invalid tickets are skipped and counted in `stats` ({"tickets", "invalid"})
+    with errors="skip", or raise TicketValidationError with errors="raise".
+    A malformed file (not a JSON array, broken separators, trailing data)
+    always raises.
+    """
+    stats = stats if stats is not None else {}
+    stats.setdefault("tickets", 0)
+    stats.setdefault("invalid", 0)
+
+    binary, opened = _open_binary(source)
+    try:
+        fmt = fmt or detect_format(binary, name or (source if isinstance(source, str) else getattr(source, "name", None)))
+        text = io.TextIOWrapper(binary, encoding="utf-8-sig", newline="" if fmt == "csv" else None)
+        try:
+            if fmt == "json":
+                items = _iter_json_array(text)
+            elif fmt == "jsonl":
+                items = _iter_jsonl(text)
+            elif fmt == "csv":
+                items = csv.DictReader(text)
+            else:
+                raise ValueError(f"Unknown ticket format '{fmt}', expected one of {FORMATS}")
+
+            first_error = None
+            try:
+                for position, item in enumerate(items):
+                    try:
+                        ticket = validate_ticket(item, position)
+                    except TicketValidationError as e:
+                        if errors == "raise":
+                            raise
+                        stats["invalid"] += 1
+                        first_error = first_error or e
+                        continue
+                    stats["tickets"] += 1
+                    yield ticket
+            finally:
+                # One line for the whole file, however many tickets were bad
+                if first_error is not None:
+                    print(f"Skipped {stats['invalid']} invalid tickets (first: {first_error})")
+        finally:
+            # Leave a caller's file object open
+            text.detach()
+    finally:
+        if opened:
+            binary.close()
+
+
+def file_hash(source):
+    """
+    SHA-256 of a path, bytes or binary file object, read in chunks; a file
+    object is rewound to where it was.
+    """
+    binary, opened = _open_binary(source)
+    digest = hashlib.sha256()
+    start = binary.tell()
+    try:
+        for chunk in iter(lambda: binary.read(1024 * 1024), b""):
+            digest.update(chunk)
+    finally:
+        if opened:
+            binary.close()
+        else:
+            binary.seek(start)
+    return digest.hexdigest()
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+    import resource
+
+    path = sys.argv[1] if len(sys.argv) > 1 else "./json_files_data/data.json"
+    stats = {}
+    started = time.perf_counter()
+    first_ticket_s = None
+    for _ in iter_tickets(path, stats=stats):
+        if first_ticket_s is None:
+            first_ticket_s = time.perf_counter() - started
+    print({**stats,
+           "first_ticket_ms": round(1000 * (first_ticket_s or 0), 2),
+           "seconds": round(time.perf_counter() - started, 2),
+           "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)})
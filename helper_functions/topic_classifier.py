@@ -0,0 +1,182 @@
+import os
+import json
+import time
+import threading
+import numpy as np
+from dotenv import load_dotenv
+from helper_functions.embeddings_func import embed_texts
+from helper_functions.model_loader import MODEL_BASE_DIRECTORY
+
+load_dotenv()
+
+TOPIC_LABELS = ["How-to", "Product", "Connector", "Lineage", "API/SDK", "SSO", "Glossary", "Best practices", "Sensitive data", "Other"]
+
+TOPIC_CLASSIFIER_PATH = os.path.join(MODEL_BASE_DIRECTORY, "topic_centroids.npz")
+# "local" tries the trained classifier before the LLM; "llm" always asks the LLM
+TOPIC_CLASSIFIER_ENABLED = os.getenv("TOPIC_CLASSIFIER", "llm") == "local"
+TOPIC_CONFIDENCE_THRESHOLD = float(os.getenv("TOPIC_CONFIDENCE_THRESHOLD", "0.6"))
+# Softmax temperature over cosine similarities; lower is more peaked
+TOPIC_TEMPERATURE = float(os.getenv("TOPIC_TEMPERATURE", "0.05"))
+
+
+class TopicClassifier:
+    """
+    Nearest-centroid topic classifier on MiniLM embeddings.
+
+    One unit-length centroid per topic, averaged from LLM-labelled tickets.
+    The confidence is the softmax (at TOPIC_TEMPERATURE) of the cosine
+    similarities to all centroids, taken at the winning topic.
+    """
+
+    def __init__(self, labels, centroids, temperature=TOPIC_TEMPERATURE):
+        self.labels = list(labels)
+        self.centroids = np.asarray(centroids, dtype=np.float32)
+        self.temperature = temperature
+
+    @classmethod
+    def fit(cls, texts, labels):
+        return cls.fit_embeddings(_unit_embeddings(texts), labels)
+
+    @classmethod
+    def fit_embeddings(cls, embeddings, labels):
+        topics = sorted(set(labels), key=lambda label: TOPIC_LABELS.index(label) if label in TOPIC_LABELS else len(TOPIC_LABELS))
+        centroids = []
+        for topic in topics:
+            centroid = embeddings[[i for i, label in enumerate(labels) if label == topic]].mean(axis=0)
+            centroids.append(centroid / max(float(np.linalg.norm(centroid)), 1e-12))
+        return cls(topics, np.vstack(centroids))
+
+    def save(self, path=TOPIC_CLASSIFIER_PATH):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        np.savez(path, labels=np.array(self.labels), centroids=self.centroids)
+
+    @classmethod
+    def load(cls, path=TOPIC_CLASSIFIER_PATH):
+        data = np.load(path)
+        return cls([str(label) for label in data["labels"]], data["centroids"])
+
+    def predict_batch(self, texts):
+        """
+        Return [(label, confidence)] for `texts`.
+        """
+        return self.predict_embeddings(_unit_embeddings(texts))
+
+    def predict_embeddings(self, embeddings):
+        logits = (embeddings @ self.centroids.T) / self.temperature
+        logits -= logits.max(axis=1, keepdims=True)
+        probabilities = np.exp(logits)
+        probabilities /= probabilities.sum(axis=1, keepdims=True)
+        best = probabilities.argmax(axis=1)
+        return [(self.labels[b], float(probabilities[i, b])) for i, b in enumerate(best)]
+
+    def predict(self, text):
+        return self.predict_batch([text])[0]
+
+
+def _unit_embeddings(texts):
+    embeddings = embed_texts(texts)
+    return embeddings / np.clip(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12, None)
+
+
+_classifier = None
+_classifier_lock = threading.Lock()
+_stats = {"local": 0, "escalated": 0, "local_seconds": 0.0, "escalated_seconds": 0.0}
+_stats_lock = threading.Lock()
+
+
+def get_topic_classifier():
+    """
+    The trained classifier, loaded once per process, or None if it has not been trained.
+    """
+    global _classifier
+    if _classifier is None and os.path.isfile(TOPIC_CLASSIFIER_PATH):
+        with _classifier_lock:
+            if _classifier is None:
+                _classifier = TopicClassifier.load()
+    return _classifier
+
+
+def record_outcome(escalated, seconds):
+    with _stats_lock:
+        key = "escalated" if escalated else "local"
+        _stats[key] += 1
+        _stats[f"{key}_seconds"] += seconds
+
+
+def topic_classifier_stats():
+    """
+    Escalation rate and mean per-ticket latency of the local path and the LLM fallback.
+    """
+    with _stats_lock:
+        stats = dict(_stats)
+    total = stats["local"] + stats["escalated"]
+    return {
+        "tickets": total,
+        "escalation_rate": round(stats["escalated"] / total, 3) if total else None,
+        "local_ms_per_ticket": round(1000 * stats["local_seconds"] / stats["local"], 2) if stats["local"] else None,
+        "escalated_ms_per_ticket": round(1000 * stats["escalated_seconds"] / stats["escalated"], 2) if stats["escalated"] else None,
+    }
+
+
+def _llm_labels(texts, llm_choice):
+    from helper_functions.topic_tags import topic_tags_of_the_concern
+    labels = []
+    for text in texts:
+        label = topic_tags_of_the_concern(text, llm_choice, None, allow_local=False).strip()
+        labels.append(label if label in TOPIC_LABELS else "Other")
+    return labels
+
+
+def leave_one_out_predictions(embeddings, labels):
+    """
+    [(label, confidence)] for every ticket from centroids fitted on all the
+    other tickets, so no ticket is scored by a centroid it helped build.
+    """
+    predictions = []
+    for i in range(len(labels)):
+        rest = [j for j in range(len(labels)) if j != i]
+        classifier = TopicClassifier.fit_embeddings(embeddings[rest], [labels[j] for j in rest])
+        predictions.append(classifier.predict_embeddings(embeddings[i:i + 1])[0])
+    return predictions
+
+
+def evaluate(texts, llm_labels, thresholds=(0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9)):
+    """
+    For each threshold: share of tickets that would escalate to the LLM and the
+    agreement with the LLM label on the tickets kept local, both measured
+    leave-one-out over the labelled tickets.
+    """
+    t1 = time.perf_counter()
+    embeddings = _unit_embeddings(texts)
+    TopicClassifier.fit_embeddings(embeddings, llm_labels).predict_embeddings(embeddings)
+    ms_per_ticket = 1000 * (time.perf_counter() - t1) / max(len(texts), 1)
+    predictions = leave_one_out_predictions(embeddings, llm_labels)
+
+    report = {"local_ms_per_ticket": round(ms_per_ticket, 2), "method": "leave-one-out", "thresholds": {}}
+    for threshold in thresholds:
+        kept = [(label, llm_label) for (label, confidence), llm_label in zip(predictions, llm_labels) if confidence >= threshold]
+        report["thresholds"][threshold] = {
+            "escalation_rate": round(1 - len(kept) / max(len(texts), 1), 3),
+            "agreement_when_local": round(sum(a == b for a, b in kept) / len(kept), 3) if kept else None,
+        }
+    return report
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) >= 2 and sys.argv[1] in ("train", "evaluate"):
+        tickets_path = sys.argv[2] if len(sys.argv) > 2 else "./json_files_data/data.json"
+        llm_choice = sys.argv[3] if len(sys.argv) > 3 else "groq"
+        with open(tickets_path, "r", encoding="utf-8") as f:
+            texts = [ticket["body"] for ticket in json.load(f)]
+        labels = _llm_labels(texts, llm_choice)
+
+        if sys.argv[1] == "train":
+            classifier = TopicClassifier.fit(texts, labels)
+            classifier.save()
+            print(f"Trained topic centroids for {classifier.labels} on {len(texts)} tickets -> {TOPIC_CLASSIFIER_PATH}")
+        print(json.dumps(evaluate(texts, labels), indent=2))
+    else:
+        print("Usage: python -m helper_functions.topic_classifier [train|evaluate] [tickets.json] [groq|gemini]")
+        sys.exit(2)
@@ -1,14 +1,29 @@
-from helper_functions.llm_gemini import gemini_response
-from helper_functions.llm_groq import groq_response
+import time
+from helper_functions.llm_gateway import PROVIDERS, generate
+from helper_functions.topic_classifier import (
+    TOPIC_CLASSIFIER_ENABLED, TOPIC_CONFIDENCE_THRESHOLD, get_topic_classifier, record_outcome,
+)
 from prompts.prompt_topic_tags import SYSTEM_PROMPT_TOPIC_TAGS
 
-def topic_tags_of_the_concern(text,llm_choice,groq_api_key, SYSTEM_PROMPT=SYSTEM_PROMPT_TOPIC_TAGS) -> str:
-    if llm_choice == "gemini":
-        return gemini_response(text, SYSTEM_PROMPT)
-    elif llm_choice == "groq":
-        return groq_response(text, SYSTEM_PROMPT, groq_api_key)
-    else:
+def topic_tags_of_the_concern(text,llm_choice,groq_api_key, SYSTEM_PROMPT=SYSTEM_PROMPT_TOPIC_TAGS, allow_local=True) -> str:
+    if llm_choice not in PROVIDERS:
         return "Invalid LLM choice"
+    # The Groq key is only meant for Groq; other providers use their own key pool
+    api_key = groq_api_key if llm_choice == "groq" else None
+
+    classifier = get_topic_classifier() if allow_local and TOPIC_CLASSIFIER_ENABLED else None
+    if classifier is None:
+        return generate(llm_choice, text, SYSTEM_PROMPT, api_key=api_key, cache=True).text
+
+    # Local centroid classifier first; only low-confidence tickets go to the LLM
+    t1 = time.perf_counter()
+    label, confidence = classifier.predict(text)
+    if confidence >= TOPIC_CONFIDENCE_THRESHOLD:
+        record_outcome(False, time.perf_counter() - t1)
+        return label
+    label = generate(llm_choice, text, SYSTEM_PROMPT, api_key=api_key, cache=True).text
+    record_outcome(True, time.perf_counter() - t1)
+    return label
     
 # print("Using Gemini")
 # print(topic_tags_of_the_concern("I have a problem with my internet connection and my billing statement is incorrect.", "gemini"))
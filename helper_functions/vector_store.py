@@ -0,0 +1,244 @@
+import os
+import json
+import time
+import hashlib
+import shutil
+import numpy as np
+
+VECTOR_STORE_DIRECTORY = "./preprocessed_data/vector_store"
+PINECONE_DATA_PATH = "./preprocessed_data/pinecone_db_data.json"
+
+VECTORS_FILE = "vectors.npy"
+IDS_FILE = "ids.npy"
+SOURCES_FILE = "sources.json"
+SOURCE_INDEX_FILE = "source_index.npy"
+TEXTS_FILE = "texts.bin"
+TEXT_OFFSETS_FILE = "text_offsets.npy"
+META_FILE = "meta.json"
+
+
+def vector_store_exists(directory=VECTOR_STORE_DIRECTORY):
+    return os.path.isfile(os.path.join(directory, META_FILE))
+
+
+def current_index_version(directory=VECTOR_STORE_DIRECTORY):
+    """
+    Version hash of the store on disk (changes whenever the set of chunks does), or None.
+    """
+    if not vector_store_exists(directory):
+        return None
+    with open(os.path.join(directory, META_FILE), "r", encoding="utf-8") as f:
+        return json.load(f).get("version")
+
+
+def save_vector_store(ids, vectors, sources, texts, directory=VECTOR_STORE_DIRECTORY, dimension=None):
+    """
+    Write chunks as a memory-mappable store:
+
+    vectors.npy       float32 (N, D), L2-normalised
+    ids.npy           fixed-width bytes (N,)
+    sources.json      distinct source URLs, source_index.npy int32 (N,) into it
+    texts.bin         UTF-8 chunk texts back to back, text_offsets.npy int64 (N + 1,)
+    meta.json         count, dimension and a version hash of the ids
+
+    The files are written to a temporary directory that then replaces
+    `directory`, so readers with the old store memory-mapped keep a valid view.
+    With no chunks at all an empty (0, `dimension`) store is written.
+    """
+    if not (len(ids) == len(vectors) == len(sources) == len(texts)):
+        raise ValueError(f"save_vector_store got {len(ids)} ids, {len(vectors)} vectors, "
+                         f"{len(sources)} sources and {len(texts)} texts")
+
+    final_directory = directory
+    directory = final_directory.rstrip("/\\") + ".tmp"
+    shutil.rmtree(directory, ignore_errors=True)
+    os.makedirs(directory)
+
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if not len(ids):
+        vectors = vectors.reshape(0, dimension or (vectors.shape[1] if vectors.ndim == 2 else 0))
+    elif vectors.ndim != 2:
+        vectors = vectors.reshape(len(ids), -1)
+    norms = np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+    np.save(os.path.join(directory, VECTORS_FILE), np.ascontiguousarray(vectors / norms, dtype=np.float32))
+
+    np.save(os.path.join(directory, IDS_FILE), np.array([i.encode("utf-8") for i in ids], dtype=np.bytes_))
+
+    source_table = {}
+    source_index = np.array([source_table.setdefault(s, len(source_table)) for s in sources], dtype=np.int32)
+    np.save(os.path.join(directory, SOURCE_INDEX_FILE), source_index)
+    with open(os.path.join(directory, SOURCES_FILE), "w", encoding="utf-8") as f:
+        json.dump(list(source_table), f, ensure_ascii=False)
+
+    offsets = np.zeros(len(texts) + 1, dtype=np.int64)
+    with open(os.path.join(directory, TEXTS_FILE), "wb") as f:
+        for i, text in enumerate(texts):
+            encoded = text.encode("utf-8")
+            f.write(encoded)
+            offsets[i + 1] = offsets[i] + len(encoded)
+    np.save(os.path.join(directory, TEXT_OFFSETS_FILE), offsets)
+
+    version = hashlib.sha256("\n".join(sorted(ids)).encode("utf-8")).hexdigest()[:16]
+    with open(os.path.join(directory, META_FILE), "w", encoding="utf-8") as f:
+        json.dump({"count": len(ids), "dimension": int(vectors.shape[1]), "version": version}, f)
+
+    previous_directory = final_directory.rstrip("/\\") + ".old"
+    shutil.rmtree(previous_directory, ignore_errors=True)
+    if os.path.exists(final_directory):
+        os.rename(final_directory, previous_directory)
+    os.rename(directory, final_directory)
+    shutil.rmtree(previous_directory, ignore_errors=True)
+
+
+def save_vector_store_from_records(records, directory=VECTOR_STORE_DIRECTORY, dimension=None):
+    save_vector_store(
+        [record["id"] for record in records],
+        [record["values"] for record in records],
+        [record["metadata"]["source"] for record in records],
+        [record["metadata"]["text"] for record in records],
+        directory,
+        dimension=dimension,
+    )
+
+
+def convert(json_path=PINECONE_DATA_PATH, directory=VECTOR_STORE_DIRECTORY):
+    """
+    Build the vector store from a Pinecone-format JSON export.
+    """
+    with open(json_path, "r", encoding="utf-8") as f:
+        save_vector_store_from_records(json.load(f), directory)
+    print(f"Converted {json_path} to {directory}")
+
+
+def ensure_vector_store(json_path=PINECONE_DATA_PATH, directory=VECTOR_STORE_DIRECTORY):
+    """
+    Convert the JSON export when it is the only copy of the embeddings, so it
+    can be reused instead of re-embedding everything. True if a store exists afterwards.
+    """
+    if not vector_store_exists(directory) and os.path.isfile(json_path):
+        convert(json_path, directory)
+    return vector_store_exists(directory)
+
+
+class _MetadataView:
+    """
+    Sequence of {"source", "text"} dicts decoded on access from the store files.
+    """
+
+    def __init__(self, store):
+        self._store = store
+
+    def __len__(self):
+        return len(self._store)
+
+    def __getitem__(self, row):
+        return {"source": self._store.source(row), "text": self._store.text(row)}
+
+
+class VectorStore:
+    """
+    Read side of the store written by save_vector_store. Vectors and chunk texts
+    are memory-mapped, so opening the store costs almost nothing and rows are
+    only paged in when they are touched.
+    """
+
+    def __init__(self, directory=VECTOR_STORE_DIRECTORY):
+        self.directory = directory
+        with open(os.path.join(directory, META_FILE), "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        with open(os.path.join(directory, SOURCES_FILE), "r", encoding="utf-8") as f:
+            self.source_table = json.load(f)
+
+        self.vectors = np.load(os.path.join(directory, VECTORS_FILE), mmap_mode="r")
+        self._ids = np.load(os.path.join(directory, IDS_FILE), mmap_mode="r")
+        self.source_index = np.load(os.path.join(directory, SOURCE_INDEX_FILE), mmap_mode="r")
+        self.text_offsets = np.load(os.path.join(directory, TEXT_OFFSETS_FILE), mmap_mode="r")
+
+        texts_path = os.path.join(directory, TEXTS_FILE)
+        if os.path.getsize(texts_path):
+            self._texts = np.memmap(texts_path, dtype=np.uint8, mode="r")
+        else:
+            self._texts = np.zeros(0, dtype=np.uint8)
+
+        self.metadata = _MetadataView(self)
+
+    @property
+    def version(self):
+        return self.meta["version"]
+
+    def __len__(self):
+        return int(self.meta["count"])
+
+    @property
+    def ids(self):
+        return [i.decode("utf-8") for i in self._ids]
+
+    def id(self, row):
+        return self._ids[row].decode("utf-8")
+
+    def source(self, row):
+        return self.source_table[int(self.source_index[row])]
+
+    def text(self, row):
+        start, end = int(self.text_offsets[row]), int(self.text_offsets[row + 1])
+        return self._texts[start:end].tobytes().decode("utf-8")
+
+    def records(self, start=0, stop=None):
+        """
+        Pinecone-format records for rows [start, stop), e.g. for upserts.
+        """
+        stop = len(self) if stop is None else min(stop, len(self))
+        return [
+            {"id": self.id(row), "values": self.vectors[row].tolist(), "metadata": self.metadata[row]}
+            for row in range(start, stop)
+        ]
+
+
+def _measure_load(path):
+    import resource
+    from helper_functions.local_vector_index import LocalVectorIndex
+
+    t1 = time.perf_counter()
+    if path.endswith(".json"):
+        with open(path, "r", encoding="utf-8") as f:
+            records = json.load(f)
+        index = LocalVectorIndex.from_records(records)
+    else:
+        index = LocalVectorIndex.from_store(VectorStore(path))
+    load_seconds = time.perf_counter() - t1
+
+    index.query(index.vectors[0], top_k=10)
+    peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return {"path": path, "vectors": len(index), "load_seconds": round(load_seconds, 3), "peak_rss_mb": round(peak_rss_mb, 1)}
+
+
+def benchmark(json_path=PINECONE_DATA_PATH, directory=VECTOR_STORE_DIRECTORY):
+    """
+    Load the JSON records and the binary store in fresh processes and report
+    load time and peak RSS of each, including one top-10 query.
+    """
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    results = []
+    for path in (json_path, directory):
+        if not os.path.exists(path):
+            print(f"Skipping {path}: not found")
+            continue
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executor:
+            results.append(executor.submit(_measure_load, path).result())
+    for result in results:
+        print(result)
+    return results
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) >= 2 and sys.argv[1] == "convert":
+        convert(sys.argv[2] if len(sys.argv) > 2 else PINECONE_DATA_PATH)
+    elif len(sys.argv) >= 2 and sys.argv[1] == "benchmark":
+        benchmark()
+    else:
+        print("Usage: python -m helper_functions.vector_store [convert [pinecone_db_data.json]|benchmark]")
+        sys.exit(2)
@@ -1,14 +1,14 @@
-import sqlite3
+from sql_db.ticket_repository import get_ticket_repository
 
 def fetch_data_from_db(ID,db_path="customer_concern.db"):
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
+    # Reuses this thread's pooled read-only connection instead of opening one per lookup
+    ticket = get_ticket_repository(db_path).get(ID)
+    return [(ticket["subject"], ticket["body"])] if ticket else []
 
-    cursor.execute("SELECT subject, body FROM customer_concern WHERE id = ?", (ID,))
-    
-    data = cursor.fetchall()
-    conn.close()
-    return data
+
+def fetch_many_from_db(IDs,db_path="customer_concern.db"):
+    tickets = get_ticket_repository(db_path).get_many(IDs)
+    return {ticket_id: (ticket["subject"], ticket["body"]) for ticket_id, ticket in tickets.items()}
 
 # print("Subject:")
 # print(fetch_data_from_db("TICKET-256")[0][0])
@@ -1,33 +1,161 @@
+import os
+import sys
+import time
 import sqlite3
-import json
+from itertools import islice
+from helper_functions.ticket_ingestion import iter_tickets
 
-conn = sqlite3.connect("customer_concern.db")
-cursor = conn.cursor()
+DB_PATH = "customer_concern.db"
+# Tickets per transaction
+INSERT_CHUNK_SIZE = int(os.getenv("SQL_INSERT_CHUNK_SIZE", "5000"))
 
-with open("./json_files_data/data.json", "r") as f:
-    tickets = json.load(f)
+# Computed analysis and timestamps, added to databases created before they existed
+ANALYSIS_COLUMNS = {
+    "sentiment": "TEXT",
+    "priority": "TEXT",
+    "topics": "TEXT",
+    "created_at": "REAL",
+    "updated_at": "REAL",
+    "analysed_at": "REAL",
+}
+# Partial indexes: freshly loaded rows have no analysis yet and cost nothing to index.
+# "WHERE sentiment = ?" implies IS NOT NULL, so SQLite still uses them for lookups.
+ANALYSIS_INDEXED_COLUMNS = ("sentiment", "priority", "topics")
 
-cursor.execute("""
-CREATE TABLE IF NOT EXISTS customer_concern (
-    id TEXT PRIMARY KEY,
-    subject TEXT,
-    body TEXT
+# External-content FTS5 index over subject/body, keyed by customer_concern's rowid.
+# The triggers keep it in sync; the upsert's WHERE means unchanged rows never fire them.
+FTS_TABLE = "customer_concern_fts"
+FTS_SCHEMA = f"""
+CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+    subject, body,
+    content='customer_concern', content_rowid='rowid',
+    tokenize='porter unicode61 remove_diacritics 2'
 )
-""")
+"""
+FTS_TRIGGERS = f"""
+CREATE TRIGGER IF NOT EXISTS customer_concern_fts_insert AFTER INSERT ON customer_concern BEGIN
+    INSERT INTO {FTS_TABLE}(rowid, subject, body) VALUES (new.rowid, new.subject, new.body);
+END;
+CREATE TRIGGER IF NOT EXISTS customer_concern_fts_delete AFTER DELETE ON customer_concern BEGIN
+    INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, subject, body) VALUES ('delete', old.rowid, old.subject, old.body);
+END;
+CREATE TRIGGER IF NOT EXISTS customer_concern_fts_update AFTER UPDATE OF subject, body ON customer_concern BEGIN
+    INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, subject, body) VALUES ('delete', old.rowid, old.subject, old.body);
+    INSERT INTO {FTS_TABLE}(rowid, subject, body) VALUES (new.rowid, new.subject, new.body);
+END;
+"""
 
+# Only rows whose subject or body changed are rewritten; their stale analysis is cleared
+UPSERT = """
+INSERT INTO customer_concern (id, subject, body, created_at, updated_at)
+VALUES (?, ?, ?, ?, ?)
+ON CONFLICT(id) DO UPDATE SET
+    subject = excluded.subject,
+    body = excluded.body,
+    updated_at = excluded.updated_at,
+    sentiment = NULL,
+    priority = NULL,
+    topics = NULL,
+    analysed_at = NULL
+WHERE customer_concern.subject IS NOT excluded.subject OR customer_concern.body IS NOT excluded.body
+"""
 
-def insert_to_db(tickets):
-    for ticket in tickets:
-        cursor.execute("""
-        INSERT OR REPLACE INTO customer_concern (id, subject, body)
-        VALUES (?, ?, ?)
-        """, (ticket["id"], ticket["subject"], ticket["body"]))
 
+def connect(db_path=DB_PATH):
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    # WAL + NORMAL only syncs at checkpoints; a crash can lose the last commits, never corrupt the file
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA cache_size=-65536")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    return conn
+
+
+def create_schema(conn):
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS customer_concern (
+        id TEXT PRIMARY KEY,
+        subject TEXT,
+        body TEXT
+    )
+    """)
+    existing = {row[1] for row in conn.execute("PRAGMA table_info(customer_concern)")}
+    for column, column_type in ANALYSIS_COLUMNS.items():
+        if column not in existing:
+            conn.execute(f"ALTER TABLE customer_concern ADD COLUMN {column} {column_type}")
+    for column in ANALYSIS_INDEXED_COLUMNS:
+        conn.execute(
+            f"CREATE INDEX IF NOT EXISTS idx_customer_concern_{column} ON customer_concern({column}) WHERE {column} IS NOT NULL"
+        )
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_customer_concern_updated_at ON customer_concern(updated_at)")
+
+    has_fts = conn.execute("SELECT 1 FROM sqlite_master WHERE name = ?", (FTS_TABLE,)).fetchone()
+    if not has_fts:
+        conn.execute(FTS_SCHEMA)
+    conn.executescript(FTS_TRIGGERS)
+    if not has_fts:
+        # Index the tickets loaded before the search index existed
+        rebuild_search_index(conn)
     conn.commit()
-    conn.close()
 
 
-insert_to_db(tickets)
+def rebuild_search_index(conn):
+    """
+    Re-index every ticket. Needed after a VACUUM, which may renumber the
+    rowids the index refers to.
+    """
+    conn.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+    conn.commit()
+
 
+def insert_to_db(tickets, conn, chunk_size=INSERT_CHUNK_SIZE):
+    """
+    Upsert `tickets` (any iterable) with one executemany per transaction of
+    `chunk_size` tickets. Returns tickets read, rows written and throughput.
+    """
+    started = time.perf_counter()
+    tickets = iter(tickets)
+    read = written = 0
+    while True:
+        chunk = list(islice(tickets, chunk_size))
+        if not chunk:
+            break
+        now = time.time()
+        with conn:
+            # rowcount sums changes() over the statements: upserted rows only, not the FTS trigger writes
+            written += conn.executemany(UPSERT, [(ticket["id"], ticket["subject"], ticket["body"], now, now) for ticket in chunk]).rowcount
+        read += len(chunk)
 
-conn.close()
\ No newline at end of file
+    seconds = time.perf_counter() - started
+    return {
+        "tickets": read,
+        "written": written,
+        "unchanged": read - written,
+        "seconds": round(seconds, 2),
+        "tickets_per_s": round(read / seconds) if seconds else None,
+    }
+
+
+def save_analysis(conn, results):
+    """
+    Store computed analysis; `results` is an iterable of
+    (id, sentiment, priority, topics).
+    """
+    now = time.time()
+    with conn:
+        conn.executemany(
+            "UPDATE customer_concern SET sentiment = ?, priority = ?, topics = ?, analysed_at = ? WHERE id = ?",
+            [(sentiment, priority, topics, now, ticket_id) for ticket_id, sentiment, priority, topics in results],
+        )
+
+
+if __name__ == "__main__":
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    tickets_path = args[0] if args else "./json_files_data/data.json"
+    conn = connect()
+    create_schema(conn)
+    if "--rebuild-search-index" in sys.argv:
+        rebuild_search_index(conn)
+    # Streamed and validated one ticket at a time; also accepts .jsonl and .csv exports
+    print(insert_to_db(iter_tickets(tickets_path), conn))
+    conn.close()
@@ -0,0 +1,315 @@
+import os
+import re
+import sys
+import time
+import sqlite3
+import hashlib
+import threading
+from sql_db.sql_data_inseration import DB_PATH, FTS_TABLE
+
+# Rows per page of a scan
+SCAN_PAGE_SIZE = int(os.getenv("TICKET_SCAN_PAGE_SIZE", "500"))
+# Ids per "id IN (...)" statement, below SQLite's old 999 host parameter limit
+LOOKUP_BATCH_SIZE = int(os.getenv("TICKET_LOOKUP_BATCH_SIZE", "512"))
+
+TICKET_COLUMNS = ("id", "subject", "body", "sentiment", "priority", "topics")
+
+SEARCH_LIMIT = int(os.getenv("TICKET_SEARCH_LIMIT", "5"))
+# BM25 is computed for every match; broad queries only rank their newest SEARCH_MAX_CANDIDATES matches
+SEARCH_MAX_CANDIDATES = int(os.getenv("TICKET_SEARCH_MAX_CANDIDATES", "1000"))
+# Matches in the subject count twice as much as in the body
+SEARCH_WEIGHTS = (2.0, 1.0)
+# Control characters never found in ticket text; the caller turns them into markup after escaping
+HIGHLIGHT_START, HIGHLIGHT_END = "\x02", "\x03"
+
+_WORD = re.compile(r"\w+")
+
+
+def fts_query(text, operator="AND"):
+    """
+    FTS5 query for free text: every word quoted, so input like
+    "snowflake: permissions -error" is never parsed as FTS syntax.
+    """
+    return f" {operator} ".join(f'"{word}"' for word in _WORD.findall(text.lower()))
+
+
+def _in_bucket(n):
+    """
+    Smallest power of two >= n; batches are padded to it so a few "IN (...)"
+    statements cover every batch size and stay in the prepared statement cache.
+    """
+    size = 1
+    while size < n:
+        size *= 2
+    return size
+
+
+class TicketRepository:
+    """
+    Read-only access to the customer_concern table. Every thread (Streamlit runs
+    each session in its own) gets one connection, opened on first use in
+    read-only URI mode and reused for all of its queries; sqlite3 keeps the
+    compiled statements per connection.
+    """
+
+    def __init__(self, db_path=DB_PATH):
+        self.db_path = db_path
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._select = None
+        self._columns = None
+        self.connections_opened = 0
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            uri = f"file:{os.path.abspath(self.db_path)}?mode=ro"
+            conn = sqlite3.connect(uri, uri=True, cached_statements=256)
+            conn.execute("PRAGMA query_only=1")
+            conn.execute("PRAGMA cache_size=-16384")
+            self._local.conn = conn
+            with self._lock:
+                self.connections_opened += 1
+                if self._select is None:
+                    # Databases loaded before the analysis columns existed still work
+                    self._columns = {row[1] for row in conn.execute("PRAGMA table_info(customer_concern)")}
+                    self._select = "SELECT " + ", ".join(
+                        column if column in self._columns else f"NULL AS {column}" for column in TICKET_COLUMNS
+                    ) + " FROM customer_concern"
+        return conn
+
+    def close(self):
+        """
+        Close the calling thread's connection; the next query reopens it.
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def _rows(self, sql, params=()):
+        conn = self._conn()
+        return [dict(zip(TICKET_COLUMNS, row)) for row in conn.execute(self._select + sql, params)]
+
+    def get(self, ticket_id):
+        rows = self._rows(" WHERE id = ?", (ticket_id,))
+        return rows[0] if rows else None
+
+    def get_many(self, ticket_ids):
+        """
+        {id: ticket} for the ids that exist, LOOKUP_BATCH_SIZE ids per query.
+        """
+        ticket_ids = list(dict.fromkeys(ticket_ids))
+        found = {}
+        for start in range(0, len(ticket_ids), LOOKUP_BATCH_SIZE):
+            chunk = ticket_ids[start:start + LOOKUP_BATCH_SIZE]
+            padded = chunk + [chunk[-1]] * (_in_bucket(len(chunk)) - len(chunk))
+            for row in self._rows(f" WHERE id IN ({', '.join('?' * len(padded))})", padded):
+                found[row["id"]] = row
+        return found
+
+    def scan(self, after_id=None, limit=SCAN_PAGE_SIZE):
+        """
+        One page of tickets ordered by id, starting after `after_id`. Keyset
+        paging walks the primary key index, so a page costs the same at any depth.
+        """
+        if after_id is None:
+            return self._rows(" ORDER BY id LIMIT ?", (limit,))
+        return self._rows(" WHERE id > ? ORDER BY id LIMIT ?", (after_id, limit))
+
+    def iter_tickets(self, page_size=SCAN_PAGE_SIZE):
+        after_id = None
+        while True:
+            page = self.scan(after_id, page_size)
+            yield from page
+            if len(page) < page_size:
+                return
+            after_id = page[-1]["id"]
+
+    def has_search_index(self):
+        return self._conn().execute("SELECT 1 FROM sqlite_master WHERE name = ?", (FTS_TABLE,)).fetchone() is not None
+
+    def search(self, text, limit=SEARCH_LIMIT):
+        """
+        Past tickets matching `text`, best BM25 score first, with their stored
+        classification, the highlighted subject and a body snippet. All words
+        must match; when nothing does, any word may. A query with more than
+        SEARCH_MAX_CANDIDATES matches is ranked over the newest of them.
+        """
+        conn = self._conn()
+        ranked = []
+        for operator in ("AND", "OR"):
+            query = fts_query(text, operator)
+            if not query:
+                return []
+            # Both statements only walk the index; no ticket text is read while ranking
+            cutoff = conn.execute(
+                f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH ? ORDER BY rowid DESC LIMIT 1 OFFSET ?",
+                (query, SEARCH_MAX_CANDIDATES),
+            ).fetchone()
+            ranked = conn.execute(
+                f"SELECT rowid, bm25({FTS_TABLE}, {SEARCH_WEIGHTS[0]}, {SEARCH_WEIGHTS[1]}) AS score FROM {FTS_TABLE} "
+                f"WHERE {FTS_TABLE} MATCH ? AND rowid > ? ORDER BY score LIMIT ?",
+                (query, cutoff[0] if cutoff else -1, limit),
+            ).fetchall()
+            if ranked:
+                break
+
+        # Ticket columns, highlight and snippet for the top hits only
+        columns = ", ".join(f"c.{column}" if column in self._columns else f"NULL AS {column}" for column in TICKET_COLUMNS)
+        sql = (
+            f"SELECT {columns}, highlight({FTS_TABLE}, 0, ?, ?), snippet({FTS_TABLE}, 1, ?, ?, '…', 16) "
+            f"FROM {FTS_TABLE} JOIN customer_concern c ON c.rowid = {FTS_TABLE}.rowid "
+            f"WHERE {FTS_TABLE} MATCH ? AND {FTS_TABLE}.rowid = ?"
+        )
+        results = []
+        for rowid, score in ranked:
+            row = conn.execute(sql, ((HIGHLIGHT_START, HIGHLIGHT_END) * 2) + (query, rowid)).fetchone()
+            results.append({**dict(zip(TICKET_COLUMNS, row)), "subject_highlight": row[-2], "snippet": row[-1],
+                            "score": round(-score, 3)})
+        return results
+
+    def count(self):
+        return self._conn().execute("SELECT COUNT(*) FROM customer_concern").fetchone()[0]
+
+    def fingerprint(self):
+        """
+        Changes whenever tickets are added or rewritten by the loader.
+        """
+        conn = self._conn()
+        if "updated_at" in self._columns:
+            state = conn.execute("SELECT COUNT(*), MAX(updated_at) FROM customer_concern").fetchone()
+        else:
+            state = conn.execute("SELECT COUNT(*), MAX(rowid) FROM customer_concern").fetchone()
+        return hashlib.sha256(f"{os.path.abspath(self.db_path)}:{state}".encode()).hexdigest()
+
+
+_repository = None
+_repository_lock = threading.Lock()
+
+
+def get_ticket_repository(db_path=DB_PATH):
+    """
+    Process-wide repository for `db_path`, shared by every Streamlit session.
+    """
+    global _repository
+    with _repository_lock:
+        if _repository is None or _repository.db_path != db_path:
+            _repository = TicketRepository(db_path)
+        return _repository
+
+
+def _percentile(latencies, p):
+    latencies = sorted(latencies)
+    return latencies[min(len(latencies) - 1, int(p / 100 * len(latencies)))]
+
+
+def benchmark(threads=8, lookups_per_thread=500, tickets=20000, batch=50):
+    """
+    Concurrent single-ticket lookups, connect-per-call (the old
+    fetch_data_from_db) against the pooled repository, on a throwaway database
+    of `tickets` tickets; then one batch lookup against `batch` single ones.
+    """
+    import random
+    import tempfile
+    from concurrent.futures import ThreadPoolExecutor
+    from sql_db.sql_data_inseration import connect, create_schema, insert_to_db
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "tickets.db")
+        conn = connect(db_path)
+        create_schema(conn)
+        insert_to_db(({"id": f"TICKET-{i}", "subject": f"Subject {i}", "body": f"Body of ticket {i} " * 20}
+                      for i in range(tickets)), conn)
+        conn.close()
+
+        def legacy_fetch(ticket_id):
+            conn = sqlite3.connect(db_path)
+            data = conn.execute("SELECT subject, body FROM customer_concern WHERE id = ?", (ticket_id,)).fetchall()
+            conn.close()
+            return data
+
+        repository = TicketRepository(db_path)
+
+        def run(lookup):
+            def worker(seed):
+                rng = random.Random(seed)
+                latencies = []
+                for _ in range(lookups_per_thread):
+                    started = time.perf_counter()
+                    lookup(f"TICKET-{rng.randrange(tickets)}")
+                    latencies.append(time.perf_counter() - started)
+                return latencies
+
+            with ThreadPoolExecutor(max_workers=threads) as executor:
+                latencies = [latency for result in executor.map(worker, range(threads)) for latency in result]
+            return {"p50_ms": round(1000 * _percentile(latencies, 50), 3),
+                    "p99_ms": round(1000 * _percentile(latencies, 99), 3)}
+
+        report = {"threads": threads, "lookups": threads * lookups_per_thread,
+                  "connect_per_call": run(legacy_fetch), "pooled": run(repository.get)}
+
+        ids = [f"TICKET-{i}" for i in random.Random(0).sample(range(tickets), batch)]
+        started = time.perf_counter()
+        for ticket_id in ids:
+            repository.get(ticket_id)
+        singles = time.perf_counter() - started
+        started = time.perf_counter()
+        repository.get_many(ids)
+        batched = time.perf_counter() - started
+        report[f"{batch}_ids"] = {"single_lookups_ms": round(1000 * singles, 2), "batch_lookup_ms": round(1000 * batched, 2)}
+        report["connections_opened"] = repository.connections_opened
+        repository.close()
+    return report
+
+
+def search_benchmark(tickets=200000, searches=200):
+    """
+    Load `tickets` synthetic tickets through the loader (so the triggers build
+    the search index) and time random two-word searches drawn from the same
+    word distribution as the tickets.
+    """
+    import random
+    import tempfile
+    import itertools
+    from sql_db.sql_data_inseration import connect, create_schema, insert_to_db
+
+    # Zipf-distributed vocabulary, like real ticket text: a few very common words, a long tail of rare ones
+    rng = random.Random(0)
+    vocabulary = ["".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(3, 10))) for _ in range(20000)]
+    weights = list(itertools.accumulate(1 / rank for rank in range(1, len(vocabulary) + 1)))
+
+    def ticket(i):
+        return {"id": f"TICKET-{i}", "subject": " ".join(rng.choices(vocabulary, cum_weights=weights, k=6)),
+                "body": " ".join(rng.choices(vocabulary, cum_weights=weights, k=80))}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "tickets.db")
+        conn = connect(db_path)
+        create_schema(conn)
+        insert_to_db((ticket(i) for i in range(tickets)), conn)
+        conn.close()
+
+        repository = TicketRepository(db_path)
+        latencies = []
+        for _ in range(searches):
+            query = " ".join(rng.choices(vocabulary, cum_weights=weights, k=2))
+            started = time.perf_counter()
+            repository.search(query)
+            latencies.append(time.perf_counter() - started)
+        repository.close()
+
+    return {"tickets": tickets, "searches": searches,
+            "p50_ms": round(1000 * _percentile(latencies, 50), 2), "p99_ms": round(1000 * _percentile(latencies, 99), 2)}
+
+
+if __name__ == "__main__":
+    import json
+
+    if len(sys.argv) >= 2 and sys.argv[1] == "benchmark":
+        print(json.dumps(benchmark(int(sys.argv[2]) if len(sys.argv) > 2 else 8), indent=2))
+    elif len(sys.argv) >= 2 and sys.argv[1] == "search-benchmark":
+        print(json.dumps(search_benchmark(int(sys.argv[2]) if len(sys.argv) > 2 else 200000), indent=2))
+    else:
+        print("Usage: python -m sql_db.ticket_repository benchmark [threads] | search-benchmark [tickets]")
+        sys.exit(2)
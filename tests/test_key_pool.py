@@ -0,0 +1,214 @@
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from helper_functions.key_pool import InvalidKeyError, KeyPool, NoKeyAvailableError, RateLimitError
+
+
+class FakeClock:
+    """
+    Monotonic clock that only moves when the pool sleeps.
+    """
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def make_pool(keys, clock, **kwargs):
+    kwargs.setdefault("requests_per_minute", 600)
+    kwargs.setdefault("tokens_per_minute", 10**6)
+    return KeyPool(keys, clock=clock, sleep=clock.sleep, **kwargs)
+
+
+def test_rate_limit_storm_waits_out_the_cooldown_instead_of_failing():
+    clock = FakeClock()
+    pool = make_pool(["key-1"], clock, max_wait_s=30)
+    throttled_until = clock.now + 10
+
+    def fn(key):
+        if clock.now < throttled_until:
+            raise RateLimitError(retry_after=2.0)
+        return "ok"
+
+    assert pool.call(fn) == "ok"
+    assert clock.now >= throttled_until
+    stats = pool.stats()["...ey-1"]
+    assert stats["rate_limited"] == 5
+    assert stats["successes"] == 1
+    assert stats["in_flight"] == 0
+
+
+def test_rate_limit_without_retry_after_backs_off_exponentially():
+    clock = FakeClock()
+    pool = make_pool(["key-1"], clock, base_backoff_s=1.0, max_wait_s=60)
+    attempts = []
+
+    def fn(key):
+        attempts.append(clock.now)
+        if len(attempts) < 4:
+            raise RateLimitError(retry_after=0)
+        return "ok"
+
+    assert pool.call(fn) == "ok"
+    gaps = [later - earlier for earlier, later in zip(attempts, attempts[1:])]
+    assert gaps == pytest.approx([1.0, 2.0, 4.0])
+
+
+def test_rate_limited_key_is_skipped_while_another_is_free():
+    clock = FakeClock()
+    pool = make_pool(["key-1", "key-2"], clock)
+    used = []
+
+    def fn(key):
+        used.append(key)
+        if key == "key-1":
+            raise RateLimitError(retry_after=30)
+        return key
+
+    assert pool.call(fn) == "key-2"
+    assert pool.call(fn) == "key-2"
+    assert used.count("key-1") == 1
+    assert clock.now == 1000.0
+
+
+def test_gives_up_when_the_wait_budget_runs_out():
+    clock = FakeClock()
+    pool = make_pool(["key-1"], clock, max_wait_s=5)
+
+    def fn(key):
+        raise RateLimitError(retry_after=2.0)
+
+    with pytest.raises(NoKeyAvailableError) as error:
+        pool.call(fn)
+    assert isinstance(error.value.__cause__, RateLimitError)
+    assert clock.now <= 1000.0 + 5
+
+
+def test_dead_key_is_circuit_broken_and_traffic_moves_on():
+    clock = FakeClock()
+    pool = make_pool(["key-dead", "key-ok"], clock)
+    used = []
+
+    def fn(key):
+        used.append(key)
+        if key == "key-dead":
+            raise InvalidKeyError("revoked")
+        return key
+
+    for _ in range(5):
+        assert pool.call(fn) == "key-ok"
+    assert used.count("key-dead") == 1
+    stats = pool.stats()
+    assert stats["...dead"]["circuit_open"]
+    assert not stats["...y-ok"]["circuit_open"]
+
+
+def test_only_dead_keys_raise_no_key_available():
+    clock = FakeClock()
+    pool = make_pool(["key-dead"], clock, circuit_reset_s=60, max_wait_s=30)
+
+    def fn(key):
+        raise InvalidKeyError("revoked")
+
+    with pytest.raises(NoKeyAvailableError):
+        pool.call(fn)
+    assert clock.now == 1000.0
+
+
+def test_other_errors_propagate_and_release_the_key():
+    clock = FakeClock()
+    pool = make_pool(["key-1"], clock)
+
+    def fn(key):
+        raise ValueError("bad request")
+
+    with pytest.raises(ValueError):
+        pool.call(fn)
+    stats = pool.stats()["...ey-1"]
+    assert stats["in_flight"] == 0
+    assert stats["failures"] == 1
+
+
+def test_request_budget_is_paced_on_the_clock():
+    clock = FakeClock()
+    pool = make_pool(["key-1"], clock, requests_per_minute=60, max_wait_s=60)
+    for _ in range(61):
+        pool.call(lambda key: "ok")
+    # 60 requests of burst, the 61st waits for one second of refill
+    assert clock.now == pytest.approx(1001.0)
+
+
+def test_token_budget_is_settled_against_reported_usage():
+    clock = FakeClock()
+    pool = make_pool(["key-1"], clock, tokens_per_minute=10000)
+    pool.call(lambda key: SimpleNamespace(prompt_tokens=3000, completion_tokens=1000), estimated_tokens=500)
+    assert pool.stats()["...ey-1"]["token_budget_left"] == 6000
+
+
+def test_concurrent_callers_queue_behind_a_throttled_provider():
+    # Two keys the provider lets through 2 calls per 0.1s each, while the pool
+    # itself would allow far more: the 429s must be waited out, not fail.
+    window_s, per_window = 0.1, 2
+    calls = {"key-1": [], "key-2": []}
+    lock = threading.Lock()
+
+    def fn(key):
+        with lock:
+            now = time.monotonic()
+            recent = [t for t in calls[key] if now - t < window_s]
+            calls[key] = recent
+            if len(recent) >= per_window:
+                raise RateLimitError(retry_after=window_s - (now - recent[0]))
+            recent.append(now)
+        return "ok"
+
+    pool = KeyPool(["key-1", "key-2"], requests_per_minute=6000, tokens_per_minute=10**7, max_wait_s=10)
+    results, errors = [], []
+
+    def caller():
+        for _ in range(4):
+            try:
+                results.append(pool.call(fn, estimated_tokens=10))
+            except Exception as e:
+                errors.append(e)
+
+    threads = [threading.Thread(target=caller) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert len(results) == 32
+    assert all(state["in_flight"] == 0 for state in pool.stats().values())
+
+
+def test_cancelled_async_call_frees_the_key_without_counting_a_failure():
+    clock = FakeClock()
+    pool = make_pool(["key-1"], clock, failure_threshold=1)
+
+    async def cancelled(key):
+        raise asyncio.CancelledError()
+
+    for _ in range(3):
+        with pytest.raises(asyncio.CancelledError):
+            asyncio.run(pool.acall(cancelled))
+
+    stats = pool.stats()["...ey-1"]
+    assert stats["in_flight"] == 0
+    assert stats["failures"] == 0
+    assert not stats["circuit_open"]
+
+    async def ok(key):
+        return "ok"
+
+    assert asyncio.run(pool.acall(ok)) == "ok"
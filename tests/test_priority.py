@@ -0,0 +1,140 @@
+import time
+
+import pytest
+
+from helper_functions import llm_gateway, priority
+from helper_functions.key_pool import KeyPool
+from helper_functions.llm_gateway import FakeProvider
+from helper_functions.priority import RETRY_INSTRUCTION, normalise_priority, priority_of_the_concern, priority_outcome_stats
+
+# No priority keyword, so the rules leave it to the LLM
+TICKET = "The dashboard shows the wrong owner for our tables"
+
+
+class ScriptedProvider(FakeProvider):
+    """
+    FakeProvider answering from a list, one answer per call; an exception in
+    the list is raised instead. Records (provider name, prompt) of every call.
+    """
+
+    def __init__(self, name, answers, calls, **kwargs):
+        super().__init__(latency_s=0, **kwargs)
+        self.name = name
+        self.answers = list(answers)
+        self.calls = calls
+
+    def generate(self, prompt, system_prompt, api_key=None, model=None, timeout=None):
+        self.calls.append((self.name, prompt))
+        answer = self.answers.pop(0) if self.answers else "no idea"
+        if isinstance(answer, Exception):
+            raise answer
+        self.responder = lambda prompt, system_prompt: answer
+        return super().generate(prompt, system_prompt, api_key=api_key, model=model, timeout=timeout)
+
+
+@pytest.fixture
+def providers(monkeypatch):
+    """
+    Scripts groq and gemini answers; no LLM cache and no key pools.
+    """
+    monkeypatch.setattr(llm_gateway, "get_llm_cache", lambda: None)
+    monkeypatch.setattr(llm_gateway, "_key_pools", {"groq": None, "gemini": None})
+    monkeypatch.setattr(priority, "PRIORITY_LLM_FAILOVER", False)
+    calls = []
+
+    def script(groq=(), gemini=()):
+        monkeypatch.setitem(llm_gateway.PROVIDERS, "groq", ScriptedProvider("groq", groq, calls))
+        monkeypatch.setitem(llm_gateway.PROVIDERS, "gemini", ScriptedProvider("gemini", gemini, calls))
+        return calls
+
+    return script
+
+
+def outcome_delta(before):
+    after = priority_outcome_stats()
+    return {outcome: after[outcome] - before[outcome] for outcome in after if after[outcome] != before[outcome]}
+
+
+@pytest.mark.parametrize("answer, expected", [
+    ("High_Priority", "High_Priority"),
+    ("high priority", "High_Priority"),
+    ("**Low_Priority**", "Low_Priority"),
+    ("Priority: medium", "Medium_Priority"),
+    ("medium-priority.", "Medium_Priority"),
+    ("High or low, hard to say", None),
+    ("urgent", None),
+    ("", None),
+    (None, None),
+])
+def test_normalise_priority(answer, expected):
+    assert normalise_priority(answer) == expected
+
+
+def test_rule_match_skips_the_llm(providers):
+    calls = providers()
+    before = priority_outcome_stats()
+    assert priority_of_the_concern("This is urgent", "groq", None) == "High_Priority"
+    assert calls == []
+    assert outcome_delta(before) == {"rule": 1}
+
+
+def test_valid_first_answer(providers):
+    calls = providers(groq=["Low_Priority"])
+    before = priority_outcome_stats()
+    assert priority_of_the_concern(TICKET, "groq", None) == "Low_Priority"
+    assert calls == [("groq", TICKET)]
+    assert outcome_delta(before) == {"llm": 1}
+
+
+def test_near_miss_is_normalised_without_a_retry(providers):
+    calls = providers(groq=["I'd say high priority"])
+    before = priority_outcome_stats()
+    assert priority_of_the_concern(TICKET, "groq", None) == "High_Priority"
+    assert len(calls) == 1
+    assert outcome_delta(before) == {"llm_normalised": 1}
+
+
+def test_unusable_answer_is_retried_with_the_answer_format(providers):
+    calls = providers(groq=["It depends", "Medium_Priority"])
+    before = priority_outcome_stats()
+    assert priority_of_the_concern(TICKET, "groq", None) == "Medium_Priority"
+    assert calls == [("groq", TICKET), ("groq", TICKET + RETRY_INSTRUCTION)]
+    assert outcome_delta(before) == {"llm_retry": 1}
+
+
+def test_failover_comes_after_both_attempts_on_the_chosen_provider(providers, monkeypatch):
+    monkeypatch.setattr(priority, "PRIORITY_LLM_FAILOVER", True)
+    monkeypatch.setattr(priority, "get_key_pool", lambda provider: object())
+    calls = providers(groq=["It depends", RuntimeError("boom")], gemini=["Low_Priority"])
+    before = priority_outcome_stats()
+    assert priority_of_the_concern(TICKET, "groq", None) == "Low_Priority"
+    assert calls == [("groq", TICKET), ("groq", TICKET + RETRY_INSTRUCTION), ("gemini", TICKET + RETRY_INSTRUCTION)]
+    assert outcome_delta(before) == {"failover": 1, "llm_errors": 1}
+
+
+def test_failover_needs_keys_for_the_other_provider(providers, monkeypatch):
+    monkeypatch.setattr(priority, "PRIORITY_LLM_FAILOVER", True)
+    calls = providers(groq=["?", "?"], gemini=["Low_Priority"])
+    assert priority_of_the_concern(TICKET, "groq", None) == priority.PRIORITY_DEFAULT
+    assert [provider for provider, _ in calls] == ["groq", "groq"]
+
+
+def test_default_when_every_attempt_fails(providers):
+    calls = providers(groq=[RuntimeError("down"), "maybe"])
+    before = priority_outcome_stats()
+    assert priority_of_the_concern(TICKET, "groq", None) == priority.PRIORITY_DEFAULT
+    assert len(calls) == 2
+    assert outcome_delta(before) == {"default": 1, "llm_errors": 1}
+
+
+def test_budget_covers_the_wait_for_a_pooled_key(providers, monkeypatch):
+    monkeypatch.setattr(priority, "PRIORITY_LLM_BUDGET_SECONDS", 1.5)
+    # One call per 10 s: the retry would have to wait far past the budget for the key
+    calls = providers(groq=["It depends", "High_Priority"])
+    llm_gateway.PROVIDERS["groq"].requests_per_window = 1
+    llm_gateway.PROVIDERS["groq"].window_s = 10
+    llm_gateway.register_key_pool("groq", KeyPool(["key-1"], requests_per_minute=600, max_wait_s=30))
+
+    started = time.monotonic()
+    assert priority_of_the_concern(TICKET, "groq", None) == priority.PRIORITY_DEFAULT
+    assert time.monotonic() - started < 1.5
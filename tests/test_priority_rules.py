@@ -0,0 +1,74 @@
+import pytest
+
+from helper_functions.priority_rules import match_priority, match_priority_batch
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("Our pipeline is down, this is urgent", "High_Priority"),
+    ("URGENT: lineage is missing", "High_Priority"),
+    ("Can you look at this soon?", "Medium_Priority"),
+    ("Fix it whenever you have time", "Low_Priority"),
+    ("How do I set up SSO?", None),
+])
+def test_keyword_levels(text, expected):
+    assert match_priority(text)[0] == expected
+
+
+@pytest.mark.parametrize("text", ["Please allow access", "I will follow up", "A normalised schema", "Lowered the limit"])
+def test_keywords_only_match_whole_words(text):
+    assert match_priority(text)[0] is None
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("Please respond as soon as possible", "High_Priority"),
+    ("Please respond as  soon\nas possible", "High_Priority"),
+    ("Fix it within a week", "Medium_Priority"),
+    ("Reply at your convenience", "Low_Priority"),
+    ("This is low priority", "Low_Priority"),
+])
+def test_multi_word_keywords(text, expected):
+    assert match_priority(text)[0] == expected
+
+
+def test_multi_word_keyword_is_consumed_whole():
+    priority, evidence = match_priority("This is not urgent")
+    assert priority == "Low_Priority"
+    assert [match["keyword"] for match in evidence] == ["not urgent"]
+    assert evidence[0]["span"] == (8, 18)
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("Please fix this immediately", "High_Priority"),
+    ("We need this urgently", "High_Priority"),
+    ("Two emergencies in production", "High_Priority"),
+    ("This is seriously broken", "High_Priority"),
+    ("It is moderately annoying", "Medium_Priority"),
+])
+def test_inflections_match(text, expected):
+    assert match_priority(text)[0] == expected
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("This isn't critical", None),
+    ("It is not that urgent", None),
+    ("non urgent request", None),
+    ("A non-critical issue", None),
+    ("Nothing works, urgent help", "High_Priority"),
+    ("never mind, critical outage", "High_Priority"),
+    ("not urgent, but critical", "High_Priority"),
+    ("No access but this is urgent", "High_Priority"),
+])
+def test_negation_stays_within_its_clause(text, expected):
+    assert match_priority(text)[0] == expected
+
+
+def test_batch_matches_per_ticket():
+    texts = [
+        "Nothing works, urgent help",
+        "This is not urgent",
+        "Fix it within a week",
+        "",
+        "How do I set up SSO?",
+        "Please fix this immediately, it is critical",
+    ]
+    assert match_priority_batch(texts) == [match_priority(text) for text in texts]
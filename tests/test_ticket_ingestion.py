@@ -0,0 +1,108 @@
+import io
+import json
+
+import pytest
+
+from helper_functions import ticket_ingestion
+from helper_functions.ticket_ingestion import TicketValidationError, iter_tickets
+
+
+def ticket(i, body=None):
+    return {"id": f"TICKET-{i}", "subject": f"Subject {i}", "body": body or f"Body of ticket {i}"}
+
+
+def parse(data, **kwargs):
+    return list(iter_tickets(data.encode("utf-8") if isinstance(data, str) else data, **kwargs))
+
+
+def test_json_array_round_trip():
+    tickets = [ticket(i) for i in range(3)]
+    assert parse(json.dumps(tickets)) == tickets
+
+
+def test_elements_split_across_reads(monkeypatch):
+    monkeypatch.setattr(ticket_ingestion, "READ_CHUNK_SIZE", 7)
+    tickets = [ticket(i) for i in range(20)]
+    assert parse(json.dumps(tickets, indent=2)) == tickets
+
+
+def test_element_larger_than_a_64k_read():
+    tickets = [ticket(0), ticket(1, body="x" * (3 * 64 * 1024)), ticket(2)]
+    assert parse(json.dumps(tickets)) == tickets
+
+
+def test_number_split_at_a_read_boundary(monkeypatch):
+    monkeypatch.setattr(ticket_ingestion, "READ_CHUNK_SIZE", 4)
+    stats = {}
+    # The ids are scalars: invalid tickets, but they must not break the separator check
+    assert parse("[12345, 67890]", stats=stats) == []
+    assert stats == {"tickets": 0, "invalid": 2}
+
+
+def test_utf8_bom():
+    data = b"\xef\xbb\xbf" + json.dumps([ticket(0)]).encode("utf-8")
+    assert parse(data) == [ticket(0)]
+
+
+@pytest.mark.parametrize("data", ["[]", "  [ ]  \n", "\ufeff[]"])
+def test_empty_array(data):
+    assert parse(data) == []
+
+
+@pytest.mark.parametrize("data", [
+    json.dumps([ticket(0), ticket(1)])[:-10],
+    json.dumps([ticket(0), ticket(1)])[:-1],
+    "[",
+    "",
+])
+def test_truncated_file_raises(data):
+    with pytest.raises(TicketValidationError):
+        parse(data, fmt="json")
+
+
+@pytest.mark.parametrize("data", [
+    '[{"id": "1", "subject": "a", "body": "b"} {"id": "2", "subject": "a", "body": "b"}]',
+    '[{"id": "1", "subject": "a", "body": "b"},, {"id": "2", "subject": "a", "body": "b"}]',
+    '[, {"id": "1", "subject": "a", "body": "b"}]',
+    '[{"id": "1", "subject": "a", "body": "b"},]',
+    '[{"id": "1", "subject": "a", "body": "b"}] garbage',
+    '[{"id": "1", "subject": "a", "body": "b"}][]',
+    '{"id": "1", "subject": "a", "body": "b"}',
+])
+def test_malformed_array_raises(data):
+    with pytest.raises(TicketValidationError):
+        parse(data, fmt="json")
+
+
+def test_trailing_whitespace_is_allowed():
+    assert parse(json.dumps([ticket(0)]) + " \r\n\t\n") == [ticket(0)]
+
+
+def test_invalid_tickets_are_counted_and_reported_once(capsys):
+    items = [ticket(0), {"id": "x"}, "not a ticket", ticket(3, body="   "), ticket(4)]
+    stats = {}
+    assert parse(json.dumps(items), stats=stats) == [ticket(0), ticket(4)]
+    assert stats == {"tickets": 2, "invalid": 3}
+    lines = capsys.readouterr().out.strip().splitlines()
+    assert len(lines) == 1
+    assert "3 invalid tickets" in lines[0]
+
+
+def test_invalid_ticket_raises_with_errors_raise():
+    with pytest.raises(TicketValidationError):
+        parse(json.dumps([ticket(0), {"id": "x"}]), errors="raise")
+
+
+def test_json_lines_and_csv():
+    tickets = [ticket(i) for i in range(3)]
+    jsonl = "\n".join(json.dumps(t) for t in tickets) + "\n\n"
+    assert parse(jsonl) == tickets
+
+    csv_data = "id,subject,body\r\n" + "".join(f'{t["id"]},{t["subject"]},"{t["body"]}, with a comma"\r\n' for t in tickets)
+    assert [t["body"] for t in parse(csv_data, fmt="csv")] == [t["body"] + ", with a comma" for t in tickets]
+
+
+def test_caller_file_object_is_left_open():
+    binary = io.BytesIO(json.dumps([ticket(0)]).encode("utf-8"))
+    assert parse(binary, fmt="json") == [ticket(0)]
+    assert not binary.closed